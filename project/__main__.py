@@ -1 +1,4 @@
-print("exec sources directory")
+from project.cli import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+from functools import partial
+from typing import Dict, List, Optional
+
+from pyformlang.cfg import CFG, Production, Terminal, Variable
+from pyformlang.finite_automaton import DeterministicFiniteAutomaton, State, Symbol
+
+from project.ecfg import ECFG, ECFGProduction
+from project.rfa import RFA, RFABox
+from project.wcnf import cfg_to_wcnf
+
+ARTIFACT_VERSION = 1
+
+GrammarArtifact = namedtuple(
+    "GrammarArtifact", ["source_hash", "kind", "wcnf", "ecfg", "rfa"]
+)
+
+
+def get_source_hash(text: str) -> str:
+    """
+    Hash of the grammar source text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def build_artifact(text: str, kind: str = "cfg") -> GrammarArtifact:
+    """
+    Runs all conversions for the grammar text
+    :param text: text of the grammar
+    :param kind: "cfg" - text is CFG, WCNF is built, "ecfg" - text is ECFG, WCNF isn't built
+    :return: GrammarArtifact with WCNF (or None), ECFG and RFA
+    """
+    if kind == "cfg":
+        cfg = CFG.from_text(text)
+        wcnf = cfg_to_wcnf(cfg)
+        ecfg = ECFG.from_cfg(cfg)
+    elif kind == "ecfg":
+        wcnf = None
+        ecfg = ECFG.from_text(text)
+    else:
+        raise ValueError(f'Unknown grammar kind: "{kind}"')
+
+    rfa = ecfg.to_rfa()
+    rfa.get_matrices()
+    return GrammarArtifact(get_source_hash(text), kind, wcnf, ecfg, rfa)
+
+
+def save_artifact(path: str, artifact: GrammarArtifact) -> None:
+    """
+    Saves artifact into a file
+    """
+    data = {
+        "version": ARTIFACT_VERSION,
+        "source_hash": artifact.source_hash,
+        "kind": artifact.kind,
+        "wcnf": None if artifact.wcnf is None else _wcnf_to_dict(artifact.wcnf),
+        "ecfg": _ecfg_to_dict(artifact.ecfg, artifact.rfa),
+    }
+    with open(path, "w") as file:
+        json.dump(data, file, separators=(",", ":"))
+
+
+def load_artifact(path: str) -> GrammarArtifact:
+    """
+    Loads artifact from a file
+    """
+    with open(path) as file:
+        data = json.load(file)
+    return _artifact_from_dict(data)
+
+
+def load_grammar(
+    source_path: str, artifact_path: Optional[str] = None, kind: str = "cfg"
+) -> GrammarArtifact:
+    """
+    Loads grammar with all its conversions.
+    Conversions are read from the artifact file if it was built from the same source text,
+    otherwise they are done again and the artifact file is rewritten
+    :param source_path: file with grammar text
+    :param artifact_path: (optional) artifact file, default is source_path + ".artifact.json"
+    :param kind: "cfg" or "ecfg", see build_artifact
+    """
+    if artifact_path is None:
+        artifact_path = source_path + ".artifact.json"
+
+    with open(source_path) as file:
+        text = file.read()
+    source_hash = get_source_hash(text)
+
+    if os.path.exists(artifact_path):
+        with open(artifact_path) as file:
+            try:
+                data = json.load(file)
+            except json.JSONDecodeError:
+                data = {}
+        if (
+            data.get("version") == ARTIFACT_VERSION
+            and data.get("source_hash") == source_hash
+            and data.get("kind") == kind
+        ):
+            return _artifact_from_dict(data)
+
+    artifact = build_artifact(text, kind)
+    save_artifact(artifact_path, artifact)
+    return artifact
+
+
+def _artifact_from_dict(data: dict) -> GrammarArtifact:
+    if data["version"] != ARTIFACT_VERSION:
+        raise RuntimeError(f"Unsupported artifact version: {data['version']}")
+
+    wcnf = None if data["wcnf"] is None else _wcnf_from_dict(data["wcnf"])
+    ecfg, rfa = _ecfg_from_dict(data["ecfg"])
+    return GrammarArtifact(data["source_hash"], data["kind"], wcnf, ecfg, rfa)
+
+
+def _wcnf_to_dict(wcnf: CFG) -> dict:
+    """
+    Symbols are stored once, productions refer to them by index
+    """
+    symbols: List[list] = []
+    idx: Dict[object, int] = {}
+
+    def code(sym) -> int:
+        if sym not in idx:
+            idx[sym] = len(symbols)
+            symbols.append(["v" if isinstance(sym, Variable) else "t", sym.value])
+        return idx[sym]
+
+    return {
+        "start": code(wcnf.start_symbol),
+        "productions": [
+            [code(prod.head)] + [code(sym) for sym in prod.body]
+            for prod in wcnf.productions
+        ],
+        "symbols": symbols,
+    }
+
+
+def _wcnf_from_dict(data: dict) -> CFG:
+    symbols = [
+        Variable(value) if kind == "v" else Terminal(value)
+        for kind, value in data["symbols"]
+    ]
+    return CFG(
+        start_symbol=symbols[data["start"]],
+        productions={
+            Production(symbols[head], [symbols[sym] for sym in body])
+            for head, *body in data["productions"]
+        },
+    )
+
+
+def _ecfg_to_dict(ecfg: ECFG, rfa: RFA) -> dict:
+    boxes = {box.var: box.dfa for box in rfa.boxes}
+    return {
+        "start": ecfg.start_symbol.value,
+        "variables": sorted(var.value for var in ecfg.vars),
+        "productions": [
+            {
+                "head": prod.head.value,
+                "body": str(prod.body),
+                "dfa": _dfa_to_dict(boxes[prod.head]),
+            }
+            for prod in ecfg.productions
+        ],
+    }
+
+
+def _ecfg_from_dict(data: dict):
+    productions = set()
+    boxes = []
+    for prod in data["productions"]:
+        head = Variable(prod["head"])
+        # the regex is parsed only if the body is used
+        productions.add(ECFGProduction(head, prod["body"]))
+        boxes.append(RFABox(head, _dfa_from_dict(prod["dfa"])))
+
+    start = Variable(data["start"])
+    ecfg = ECFG(start, {Variable(var) for var in data["variables"]}, productions)
+    return ecfg, RFA(start, boxes, partial(_matrices_from_dict, data["productions"]))
+
+
+def _dfa_to_dict(dfa: DeterministicFiniteAutomaton) -> dict:
+    """
+    States are renumbered, transitions are grouped by label,
+    so they are both the DFA and the adjacency matrices of the RFA box
+    """
+    state_idx = {state: idx for idx, state in enumerate(dfa.states)}
+    transitions: Dict[str, List[List[int]]] = {}
+    for state_from, transition in dfa.to_dict().items():
+        for label, state_to in transition.items():
+            transitions.setdefault(label.value, []).append(
+                [state_idx[state_from], state_idx[state_to]]
+            )
+
+    return {
+        "states": len(state_idx),
+        "start": None if dfa.start_state is None else state_idx[dfa.start_state],
+        "finals": [state_idx[state] for state in dfa.final_states],
+        "transitions": transitions,
+    }
+
+
+def _dfa_from_dict(data: dict) -> DeterministicFiniteAutomaton:
+    dfa = DeterministicFiniteAutomaton()
+    if data["start"] is not None:
+        dfa.add_start_state(State(data["start"]))
+    for state in data["finals"]:
+        dfa.add_final_state(State(state))
+    for label, pairs in data["transitions"].items():
+        symbol = Symbol(label)
+        dfa.add_transitions([(State(frm), symbol, State(to)) for frm, to in pairs])
+    return dfa
+
+
+def _matrices_from_dict(
+    productions: List[dict],
+) -> Dict[Variable, Dict[Symbol, "csr_matrix"]]:
+    """
+    Adjacency matrices of the RFA boxes, built from the transitions on the first use,
+    so loading the artifact doesn't import scipy
+    """
+    from scipy.sparse import csr_matrix
+
+    matrices = {}
+    for prod in productions:
+        n = prod["dfa"]["states"]
+        matrix = {}
+        for label, pairs in prod["dfa"]["transitions"].items():
+            rows, cols = zip(*pairs)
+            matrix[Symbol(label)] = csr_matrix(
+                ([True] * len(pairs), (rows, cols)), shape=(n, n), dtype=bool
+            )
+        matrices[Variable(prod["head"])] = matrix
+    return matrices
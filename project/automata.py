@@ -1,36 +1,41 @@
 import networkx as nt
 import project.utils
-from typing import Iterable, Union, Optional
+from project.projection import get_projection
+from project.regex import compile_regex, to_dfa
+from typing import AbstractSet, Iterable, Union, Optional
 from pyformlang.finite_automaton import (
     DeterministicFiniteAutomaton,
     NondeterministicFiniteAutomaton,
     State,
 )
-from pyformlang.regular_expression import Regex
 
 
 def get_dfa_from_regex(regex: str) -> DeterministicFiniteAutomaton:
     """
-    Builds DFA from regular expression passed as a string
+    Builds minimal DFA from regular expression passed as a string, compiled DFAs are cached
     """
-    return Regex(regex).to_epsilon_nfa().minimize()
+    return to_dfa(compile_regex(regex))
 
 
 def get_nfa_from_graph(
     graph: Union[nt.MultiDiGraph, str],
     start_states: Optional[Iterable[State]] = None,
     final_states: Optional[Iterable[State]] = None,
+    labels: Optional[AbstractSet[str]] = None,
 ) -> NondeterministicFiniteAutomaton:
     """
     Builds NFA from networkx grapg
     :param graph: networkx graph or name of the graph in CFPQ dataset
     :param (optional) start_states: any iterable that contains start states
     :param (optional) final_states: any iterable that contains final states
+    :param (optional) labels: only edges with these labels become transitions, all edges by default
     :return: NFA
     """
 
     if type(graph) == str:
         graph: nt.MultiDiGraph = project.utils.get_graph_by_name(graph)
+    if labels is not None:
+        graph = get_projection(graph, labels)
 
     if start_states is None:
         start_states = set(graph.nodes)
@@ -1,2 +1,90 @@
-from project.cfpq.hellings import *
-from project.cfpq.matrix import *
+"""
+CFPQ engines, the submodules are imported on the first access to their names,
+so importing the package doesn't load networkx, scipy and pyformlang
+"""
+import importlib
+import sys
+import types
+
+_EXPORTS = {
+    # grammar classes are re-exported, as the star imports of the engines did before
+    "pyformlang.cfg": ["CFG", "Variable"],
+    "project.cfpq.hellings": [
+        "hellings",
+        "query_graph_hellings",
+        "cfg_from_text_hellings",
+        "cfg_from_file_hellings",
+        "exists_path_hellings",
+    ],
+    "project.cfpq.matrix": [
+        "get_label_matrices",
+        "matrix_closure",
+        "matrix_alg",
+        "resume_matrix_alg",
+        "query_graph_matrix",
+        "cfg_from_text_matrix",
+        "cfg_from_file_matrix",
+        "exists_path_matrix",
+    ],
+    "project.cfpq.derivations": ["Edge", "NO_SPLIT", "Derivations"],
+    "project.cfpq.backends": [
+        "PackedBoolMatrix",
+        "BoolMatrix",
+        "MatrixBackend",
+        "SparseBackend",
+        "DenseBackend",
+        "AdaptiveBackend",
+    ],
+    "project.cfpq.exists": [
+        "Progress",
+        "Existence",
+        "get_nonterminal_distances",
+        "get_left_corners",
+    ],
+    "project.cfpq.budget": ["PartialResult", "get_rss", "Budget", "arun"],
+    "project.cfpq.checkpoint": [
+        "CHECKPOINT_VERSION",
+        "FixpointState",
+        "get_matrices_digest",
+        "get_fixpoint_key",
+        "get_nonterminal_name",
+        "Checkpointer",
+    ],
+    "project.cfpq.sharded": [
+        "Rule",
+        "PipeTransport",
+        "SocketTransport",
+        "serve",
+        "get_row_blocks",
+        "sharded_closure",
+        "sharded_matrix_alg",
+    ],
+}
+
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name: str):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_MODULES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # the import system binds submodules to the attributes of the package,
+        # the exported names take precedence as "hellings" function over the submodule
+        if isinstance(value, types.ModuleType) and name in _MODULES:
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
@@ -0,0 +1,201 @@
+from typing import Union
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class PackedBoolMatrix:
+    """
+    Dense boolean matrix, every row is packed into 64-bit words:
+    column c of the row is bit c % 64 of the word c // 64
+    """
+
+    def __init__(self, words: np.ndarray, n_cols: int):
+        self.words = words
+        self.shape = (words.shape[0], n_cols)
+
+    @staticmethod
+    def zeros(n_rows: int, n_cols: int) -> "PackedBoolMatrix":
+        return PackedBoolMatrix(
+            np.zeros((n_rows, (n_cols + 63) // 64), dtype=np.uint64), n_cols
+        )
+
+    @staticmethod
+    def from_csr(matrix: csr_matrix) -> "PackedBoolMatrix":
+        result = PackedBoolMatrix.zeros(*matrix.shape)
+        rows, cols = matrix.nonzero()
+        np.bitwise_or.at(
+            result.words,
+            (rows, cols >> 6),
+            np.left_shift(np.uint64(1), (cols & 63).astype(np.uint64)),
+        )
+        return result
+
+    def to_csr(self) -> csr_matrix:
+        return csr_matrix(self.to_array())
+
+    def to_array(self) -> np.ndarray:
+        """
+        Unpacks the matrix into numpy array of bools
+        """
+        as_bytes = np.ascontiguousarray(self.words, dtype="<u8").view(np.uint8)
+        bits = np.unpackbits(as_bytes, axis=1, bitorder="little")
+        return bits[:, : self.shape[1]].astype(bool)
+
+    @property
+    def nnz(self) -> int:
+        as_bytes = np.ascontiguousarray(self.words, dtype="<u8").view(np.uint8)
+        return int(_POPCOUNT[as_bytes].sum(dtype=np.int64))
+
+    def column(self, k: int) -> np.ndarray:
+        """
+        Column of the matrix as numpy array of bools
+        """
+        word = self.words[:, k >> 6]
+        return ((word >> np.uint64(k & 63)) & np.uint64(1)).astype(bool)
+
+    def nonempty_columns(self) -> np.ndarray:
+        """
+        Numpy array of bools, True for the columns with at least one set bit
+        """
+        return PackedBoolMatrix(
+            np.bitwise_or.reduce(self.words, axis=0, keepdims=True), self.shape[1]
+        ).to_array()[0]
+
+    def __or__(self, other: "PackedBoolMatrix") -> "PackedBoolMatrix":
+        return PackedBoolMatrix(self.words | other.words, self.shape[1])
+
+    def and_not(self, other: "PackedBoolMatrix") -> "PackedBoolMatrix":
+        return PackedBoolMatrix(self.words & ~other.words, self.shape[1])
+
+    def rmatmul_sparse(self, left: csr_matrix) -> "PackedBoolMatrix":
+        """
+        Product left @ self for sparse left: every row of the result is OR of the rows of self
+        """
+        result = PackedBoolMatrix.zeros(left.shape[0], self.shape[1])
+        starts = left.indptr[:-1]
+        nonempty = np.diff(left.indptr) > 0
+        if left.nnz:
+            result.words[nonempty] = np.bitwise_or.reduceat(
+                self.words[left.indices], starts[nonempty], axis=0
+            )
+        return result
+
+    def __matmul__(self, other: "PackedBoolMatrix") -> "PackedBoolMatrix":
+        """
+        Word-parallel product: row k of other is ORed into every row i with self[i, k]
+        """
+        result = PackedBoolMatrix.zeros(self.shape[0], other.shape[1])
+        other_nonempty = np.bitwise_or.reduce(other.words, axis=1) != 0
+        for k in np.flatnonzero(self.nonempty_columns() & other_nonempty):
+            result.words[self.column(k)] |= other.words[k]
+        return result
+
+
+BoolMatrix = Union[csr_matrix, PackedBoolMatrix]
+
+
+class MatrixBackend:
+    """
+    Storage and operations of the boolean matrices used by the CFPQ engines.
+    Subclasses choose the representation of the matrices in adapt and from_csr
+    """
+
+    name = "base"
+
+    def from_csr(self, matrix: csr_matrix) -> BoolMatrix:
+        return matrix
+
+    def to_csr(self, matrix: BoolMatrix) -> csr_matrix:
+        if isinstance(matrix, PackedBoolMatrix):
+            return matrix.to_csr()
+        return matrix
+
+    def nnz(self, matrix: BoolMatrix) -> int:
+        return matrix.nnz
+
+    def union(self, a: BoolMatrix, b: BoolMatrix) -> BoolMatrix:
+        if isinstance(a, PackedBoolMatrix) or isinstance(b, PackedBoolMatrix):
+            return self.adapt(_packed(a) | _packed(b))
+        return self.adapt(a + b)
+
+    def product(self, a: BoolMatrix, b: BoolMatrix) -> BoolMatrix:
+        if isinstance(a, csr_matrix) and isinstance(b, csr_matrix):
+            return a @ b
+        if isinstance(a, csr_matrix):
+            return _packed(b).rmatmul_sparse(a)
+        return a @ _packed(b)
+
+    def difference(self, a: BoolMatrix, b: BoolMatrix) -> csr_matrix:
+        """
+        Entries of a that are not in b as sparse matrix
+        """
+        if isinstance(a, PackedBoolMatrix) or isinstance(b, PackedBoolMatrix):
+            return _packed(a).and_not(_packed(b)).to_csr()
+        return a > b
+
+    def adapt(self, matrix: BoolMatrix) -> BoolMatrix:
+        """
+        Chooses representation of the matrix
+        """
+        return matrix
+
+
+class SparseBackend(MatrixBackend):
+    """
+    Keeps every matrix sparse
+    """
+
+    name = "sparse"
+
+
+class DenseBackend(MatrixBackend):
+    """
+    Keeps every matrix packed into 64-bit words
+    """
+
+    name = "dense"
+
+    def from_csr(self, matrix: csr_matrix) -> BoolMatrix:
+        return PackedBoolMatrix.from_csr(matrix)
+
+    def adapt(self, matrix: BoolMatrix) -> BoolMatrix:
+        return _packed(matrix)
+
+
+class AdaptiveBackend(MatrixBackend):
+    """
+    Switches every matrix between sparse and packed dense representation by its fill ratio
+    """
+
+    name = "adaptive"
+
+    def __init__(self, dense_fill: float = 0.05, sparse_fill: float = 0.02):
+        """
+        :param dense_fill: sparse matrix filled more than this becomes dense
+        :param sparse_fill: dense matrix filled less than this becomes sparse
+        """
+        self.dense_fill = dense_fill
+        self.sparse_fill = sparse_fill
+
+    def from_csr(self, matrix: csr_matrix) -> BoolMatrix:
+        return self.adapt(matrix)
+
+    def adapt(self, matrix: BoolMatrix) -> BoolMatrix:
+        size = matrix.shape[0] * matrix.shape[1]
+        if size == 0:
+            return matrix
+        fill = matrix.nnz / size
+        if isinstance(matrix, csr_matrix) and fill > self.dense_fill:
+            return PackedBoolMatrix.from_csr(matrix)
+        if isinstance(matrix, PackedBoolMatrix) and fill < self.sparse_fill:
+            return matrix.to_csr()
+        return matrix
+
+
+def _packed(matrix: BoolMatrix) -> PackedBoolMatrix:
+    if isinstance(matrix, PackedBoolMatrix):
+        return matrix
+    return PackedBoolMatrix.from_csr(matrix)
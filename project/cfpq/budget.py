@@ -0,0 +1,112 @@
+import asyncio
+import os
+import resource
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Executor
+from typing import Callable, Optional
+
+# result: facts (or matrices) computed before the stop, the same type as the complete result
+# reason: why the run was stopped: "cancelled", "time", "facts", "nnz" or "rss"
+# progress: Progress of the run, elapsed: seconds since the start of the run
+PartialResult = namedtuple("PartialResult", ["result", "reason", "progress", "elapsed"])
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def get_rss() -> int:
+    """
+    Resident set size of the process in bytes, peak RSS if the current one is unavailable
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Budget:
+    """
+    Limits of one CFPQ run
+
+    The engines check the budget cooperatively between worklist pops or matrix products
+    and return PartialResult when it is exhausted.
+    cancel() may be called from any thread, arun cancels the budget when its task is cancelled.
+    """
+
+    def __init__(
+        self,
+        time_limit: Optional[float] = None,
+        max_facts: Optional[int] = None,
+        max_nnz: Optional[int] = None,
+        max_rss: Optional[int] = None,
+        rss_check_every: int = 256,
+    ):
+        """
+        :param time_limit: (optional) wall time of the run in seconds
+        :param max_facts: (optional) maximal number of derived facts
+        :param max_nnz: (optional) maximal total number of nonzero entries of the matrices
+        :param max_rss: (optional) maximal resident set size of the process in bytes
+        :param rss_check_every: RSS is read once per this number of checks
+        """
+        self.time_limit = time_limit
+        self.max_facts = max_facts
+        self.max_nnz = max_nnz
+        self.max_rss = max_rss
+        self.rss_check_every = rss_check_every
+        self.started: Optional[float] = None
+        self._checks = 0
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def start(self) -> None:
+        """
+        Starts the clock, called by the engines, later calls don't restart it
+        """
+        if self.started is None:
+            self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return 0.0 if self.started is None else time.perf_counter() - self.started
+
+    def check(self, facts: int = 0, nnz: int = 0) -> Optional[str]:
+        """
+        :return: reason to stop or None if the budget isn't exhausted
+        """
+        self.start()
+        if self._cancelled.is_set():
+            return "cancelled"
+        if self.time_limit is not None and self.elapsed > self.time_limit:
+            return "time"
+        if self.max_facts is not None and facts > self.max_facts:
+            return "facts"
+        if self.max_nnz is not None and nnz > self.max_nnz:
+            return "nnz"
+        if self.max_rss is not None:
+            self._checks += 1
+            if self._checks % self.rss_check_every == 1 and get_rss() > self.max_rss:
+                return "rss"
+        return None
+
+
+async def arun(
+    budget: Budget, func: Callable, *args, executor: Optional[Executor] = None
+):
+    """
+    Runs func(*args) in the executor, the budget is cancelled if the awaiting task is cancelled,
+    so the engine stops at its next check
+    """
+    future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        budget.cancel()
+        raise
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+from typing import Dict, Hashable, Iterable, List, Optional
+
+import numpy as np
+from pyformlang.cfg import Production, Variable
+from scipy.sparse import csr_matrix
+
+CHECKPOINT_VERSION = 2
+
+# matrices: nonterminal names mapped to their matrices, steps: evaluated matrix products,
+# complete: whether the fixpoint was reached, key: description of the computation
+FixpointState = namedtuple("FixpointState", ["matrices", "steps", "complete", "key"])
+
+
+def get_matrices_digest(matrices: Dict[str, csr_matrix]) -> str:
+    """
+    Digest of the structure of the labeled boolean matrices
+    """
+    digest = hashlib.sha256()
+    for label in sorted(matrices, key=str):
+        matrix = matrices[label].tocsr()
+        if not matrix.has_canonical_format:
+            matrix = matrix.copy()
+            matrix.sum_duplicates()
+        digest.update(json.dumps(str(label)).encode("utf-8"))
+        digest.update(matrix.indptr.astype(np.int64).tobytes())
+        digest.update(matrix.indices.astype(np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def get_fixpoint_key(
+    n: int,
+    productions: Iterable[Production],
+    label_matrices: Dict[str, csr_matrix],
+    nodes: Optional[List[Hashable]] = None,
+) -> dict:
+    """
+    Description of the computation that the checkpoint must match to be resumed
+    :param label_matrices: adjacency matrices of the graph labels
+    :param nodes: (optional) vertices in the order of their ids
+    """
+    return {
+        "n": n,
+        "productions": sorted(str(p) for p in productions),
+        "labels": get_matrices_digest(label_matrices),
+        "vertices": None
+        if nodes is None
+        else hashlib.sha256(repr(list(nodes)).encode("utf-8")).hexdigest(),
+    }
+
+
+def get_nonterminal_name(nonterminal: Variable) -> str:
+    return str(nonterminal.value)
+
+
+class Checkpointer:
+    """
+    Periodically saves the matrices of the fixpoint to the npz file
+
+    Only indptr and indices arrays of the boolean CSR matrices are stored,
+    the file is written to a temporary path and then atomically replaces the previous checkpoint,
+    so a crash during saving leaves the last complete checkpoint.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        every_seconds: Optional[float] = 60.0,
+        every_steps: Optional[int] = None,
+    ):
+        """
+        :param path: path of the checkpoint file
+        :param every_seconds: (optional) minimal wall time between the checkpoints
+        :param every_steps: (optional) number of matrix products between the checkpoints
+        """
+        self.path = path
+        self.every_seconds = every_seconds
+        self.every_steps = every_steps
+        self.saves = 0
+        self._last_time = time.perf_counter()
+        self._last_steps = 0
+
+    def due(self, steps: int) -> bool:
+        """
+        Whether the next checkpoint should be saved after the given number of steps
+        """
+        if (
+            self.every_steps is not None
+            and steps - self._last_steps >= self.every_steps
+        ):
+            return True
+        return (
+            self.every_seconds is not None
+            and time.perf_counter() - self._last_time >= self.every_seconds
+        )
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def save(
+        self,
+        matrices: Dict[Variable, csr_matrix],
+        steps: int,
+        complete: bool,
+        key: dict,
+    ) -> None:
+        names: List[str] = []
+        arrays = {}
+        for i, (nonterminal, matrix) in enumerate(matrices.items()):
+            names.append(get_nonterminal_name(nonterminal))
+            arrays[f"indptr_{i}"] = matrix.indptr
+            arrays[f"indices_{i}"] = matrix.indices
+        meta = {
+            "version": CHECKPOINT_VERSION,
+            "names": names,
+            "steps": steps,
+            "complete": complete,
+            "key": key,
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            np.savez(file, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, self.path)
+
+        self.saves += 1
+        self._last_time = time.perf_counter()
+        self._last_steps = steps
+
+    def load(self) -> FixpointState:
+        """
+        :return: FixpointState with matrices of the last checkpoint
+        """
+        with np.load(self.path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["version"] != CHECKPOINT_VERSION:
+                raise ValueError(
+                    f"Unsupported checkpoint version {meta['version']} in {self.path}"
+                )
+            n = meta["key"]["n"]
+            matrices = {}
+            for i, name in enumerate(meta["names"]):
+                indices = data[f"indices_{i}"]
+                matrices[name] = csr_matrix(
+                    (np.ones(len(indices), dtype=bool), indices, data[f"indptr_{i}"]),
+                    shape=(n, n),
+                )
+        self._last_steps = meta["steps"]
+        return FixpointState(matrices, meta["steps"], meta["complete"], meta["key"])
@@ -0,0 +1,157 @@
+from array import array
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from project.vertices import VertexMap
+
+Edge = Tuple[Hashable, Hashable, Hashable]
+
+NO_SPLIT = -1
+
+
+class Derivations:
+    """
+    Compact derivation metadata of the facts (u, N, v) found by the CFPQ engines
+
+    For every recorded fact only the production id, the split vertex
+    and the length of the witnessing path are stored in arrays.
+    Paths are reconstructed lazily on request.
+    The engines record facts with vertex ids of their VertexMap (see bind),
+    the public methods take and return the original vertices.
+    """
+
+    def __init__(self, max_facts: Optional[int] = None, shortest: bool = False):
+        """
+        :param max_facts: (optional) maximal number of recorded facts, facts over the budget have no witness
+        :param shortest: keep derivation of the shortest path instead of the first found one
+        """
+        self.max_facts = max_facts
+        self.shortest = shortest
+        self._productions: List[Tuple[Hashable, tuple]] = []
+        self._index: Dict[Edge, int] = {}
+        self._prod = array("l")
+        self._split = array("q")
+        self._length = array("q")
+        self._vertices: List[Hashable] = []
+        self._vertex_idx: Dict[Hashable, int] = {}
+        self._vertex_map: Optional[VertexMap] = None
+
+    def bind(self, vertex_map: Optional[VertexMap]) -> None:
+        """
+        Sets the vertex ids used in the recorded facts, None if the facts contain vertices themselves
+        """
+        self._vertex_map = vertex_map
+
+    def _to_ids(self, fact: Edge) -> Optional[Edge]:
+        if self._vertex_map is None:
+            return fact
+        u, nonterminal, v = fact
+        index = self._vertex_map.index
+        if u not in index or v not in index:
+            return None
+        return index[u], nonterminal, index[v]
+
+    def add_production(self, head: Hashable, body: tuple) -> int:
+        """
+        Registers production used by the engine
+        :param head: nonterminal as it appears in the facts
+        :param body: () for epsilon, (label,) for terminal, (B, C) for nonterminals
+        :return: production id
+        """
+        self._productions.append((head, body))
+        return len(self._productions) - 1
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, fact: Edge) -> bool:
+        return self._to_ids(fact) in self._index
+
+    def is_full(self) -> bool:
+        return self.max_facts is not None and len(self._index) >= self.max_facts
+
+    def length(self, fact: Edge) -> Optional[int]:
+        """
+        Length of the recorded witness path, None if the fact isn't recorded
+        """
+        return self._get_length(self._to_ids(fact))
+
+    def _get_length(self, fact: Edge) -> Optional[int]:
+        idx = self._index.get(fact)
+        return None if idx is None else self._length[idx]
+
+    def _vertex_id(self, vertex: Hashable) -> int:
+        idx = self._vertex_idx.get(vertex)
+        if idx is None:
+            idx = len(self._vertices)
+            self._vertex_idx[vertex] = idx
+            self._vertices.append(vertex)
+        return idx
+
+    def record(
+        self, fact: Edge, prod_id: int, split: Optional[Hashable] = None
+    ) -> bool:
+        """
+        Records derivation of the fact
+        :param fact: derived fact (u, N, v)
+        :param prod_id: id of the production returned by add_production
+        :param split: middle vertex for the productions with two nonterminals
+        :return: True if the derivation was recorded, False if the fact is over the budget,
+                 is already recorded or (in shortest mode) the new path isn't shorter
+        """
+        u, _, v = fact
+        body = self._productions[prod_id][1]
+        if len(body) == 2:
+            left = self._get_length((u, body[0], split))
+            right = self._get_length((split, body[1], v))
+            if left is None or right is None:
+                return False
+            length = left + right
+            split_id = self._vertex_id(split)
+        else:
+            length = len(body)
+            split_id = NO_SPLIT
+
+        idx = self._index.get(fact)
+        if idx is None:
+            if self.is_full():
+                return False
+            self._index[fact] = len(self._prod)
+            self._prod.append(prod_id)
+            self._split.append(split_id)
+            self._length.append(length)
+            return True
+
+        if self.shortest and length < self._length[idx]:
+            self._prod[idx] = prod_id
+            self._split[idx] = split_id
+            self._length[idx] = length
+            return True
+        return False
+
+    def get_path(
+        self, u: Hashable, nonterminal: Hashable, v: Hashable
+    ) -> Optional[List[Edge]]:
+        """
+        Reconstructs the path that witnesses the fact
+        :return: list of edges (from, label, to) or None if the fact isn't recorded
+        """
+        fact = self._to_ids((u, nonterminal, v))
+        if fact not in self._index:
+            return None
+
+        path = []
+        stack = [fact]
+        while stack:
+            frm, head, to = stack.pop()
+            idx = self._index[(frm, head, to)]
+            body = self._productions[self._prod[idx]][1]
+            if len(body) == 1:
+                path.append((frm, body[0], to))
+            elif len(body) == 2:
+                split = self._vertices[self._split[idx]]
+                stack.append((split, body[1], to))
+                stack.append((frm, body[0], split))
+        if self._vertex_map is not None:
+            nodes = self._vertex_map.nodes
+            path = [(nodes[frm], label, nodes[to]) for frm, label, to in path]
+        return path
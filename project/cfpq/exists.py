@@ -0,0 +1,69 @@
+from collections import deque, namedtuple
+from typing import Dict, Hashable, Set
+
+from pyformlang.cfg import CFG, Variable
+
+# facts: number of derived facts (u, N, v)
+# steps: worklist pops of Hellings algorithm or evaluated matrix products
+# complete: False if the computation was stopped before the fixpoint
+Progress = namedtuple("Progress", ["facts", "steps", "complete"])
+
+# found: whether some start vertex reaches some final vertex
+# witness: such pair (start, final) or None
+Existence = namedtuple("Existence", ["found", "witness", "progress"])
+
+
+def get_nonterminal_distances(wcnf: CFG, nonterminal: Hashable) -> Dict[Variable, int]:
+    """
+    Nonterminals which facts can be used to derive facts of the given nonterminal
+    :return: dictionary that maps such nonterminals to their distance from the given one
+             in the graph of the productions (head -> body nonterminals)
+    """
+    uses: Dict[Variable, Set[Variable]] = {}
+    for p in wcnf.productions:
+        if len(p.body) == 2:
+            uses.setdefault(p.head, set()).update(p.body)
+
+    nonterminal = Variable(nonterminal) if type(nonterminal) == str else nonterminal
+    distances = {nonterminal: 0}
+    queue = deque([nonterminal])
+    while queue:
+        head = queue.popleft()
+        for var in uses.get(head, ()):
+            if var not in distances:
+                distances[var] = distances[head] + 1
+                queue.append(var)
+    return distances
+
+
+def get_left_corners(wcnf: CFG, nonterminal: Hashable) -> Set[Variable]:
+    """
+    Nonterminals that can start a derivation of the given nonterminal:
+    the nonterminal itself and B for every production A -> B C where A is a left corner
+    (and C if B derives the empty word)
+    """
+    nullable = {p.head for p in wcnf.productions if not p.body}
+    changed = True
+    while changed:
+        changed = False
+        for p in wcnf.productions:
+            if p.head not in nullable and p.body and all(s in nullable for s in p.body):
+                nullable.add(p.head)
+                changed = True
+
+    firsts: Dict[Variable, Set[Variable]] = {}
+    for p in wcnf.productions:
+        if len(p.body) == 2:
+            firsts.setdefault(p.head, set()).add(p.body[0])
+            if p.body[0] in nullable:
+                firsts[p.head].add(p.body[1])
+
+    nonterminal = Variable(nonterminal) if type(nonterminal) == str else nonterminal
+    corners = {nonterminal}
+    queue = deque(corners)
+    while queue:
+        for var in firsts.get(queue.popleft(), ()):
+            if var not in corners:
+                corners.add(var)
+                queue.append(var)
+    return corners
@@ -1,78 +1,145 @@
+from collections import defaultdict, deque
+
 import networkx as nt
-from pyformlang.cfg import CFG, Variable
-from pyformlang.cfg.terminal import Terminal
+from pyformlang.cfg import CFG, Production, Variable
+from project.cfpq.budget import Budget, PartialResult
+from project.cfpq.derivations import Derivations
+from project.cfpq.exists import (
+    Existence,
+    Progress,
+    get_left_corners,
+    get_nonterminal_distances,
+)
+from project.projection import get_alphabet, project_graph
+from project.vertices import VertexMap
 from project.wcnf import cfg_to_wcnf
 
-from typing import Set, Tuple, Dict, Iterable
+from typing import Callable, Hashable, Set, Tuple, Dict, Iterable, List, Optional, Union
 
 
-def hellings(graph: nt.MultiDiGraph, cfg: CFG) -> Set[Tuple[int, int, int]]:
+def hellings(
+    graph: nt.MultiDiGraph,
+    cfg: CFG,
+    derivations: Optional[Derivations] = None,
+    budget: Optional[Budget] = None,
+) -> Union[Set[Tuple[int, int, int]], PartialResult]:
     """
     Hellings algorithm to discover paths with the given parameters
     :param graph: the graph to be searched
     :param cfg: the context-free grammat
-    :return: Set of tuples (v1, nonterminal, v2), which describe edges (from, label, to)
+    :param derivations: (optional) Derivations object to record witnesses of the found facts into
+    :param budget: (optional) limits of the run, checked after every worklist pop
+    :return: Set of tuples (v1, nonterminal, v2), which describe edges (from, label, to),
+             or PartialResult with the facts derived so far if the budget is exhausted
     """
 
     wcnf = cfg_to_wcnf(cfg)
-    eps_head = {prod.head.value for prod in wcnf.productions if not prod.body}
-    term_head = {prod for prod in wcnf.productions if len(prod.body) == 1}
-    nonterm_head = {prod for prod in wcnf.productions if len(prod.body) == 2}
-
-    epsilon_edges = set()
-
-    for h in eps_head:
-        for v in range(graph.number_of_nodes()):
-            epsilon_edges.add((v, h, v))
-
-    terminal_edges = set()
+    vertices = VertexMap.from_graph(graph)
+    rules, progress, _, reason = _hellings(
+        graph, vertices, wcnf.productions, derivations, budget=budget
+    )
+    nodes = vertices.nodes
+    result = {(nodes[u], A, nodes[v]) for u, A, v in rules}
+    if reason is not None:
+        return PartialResult(result, reason, progress, budget.elapsed)
+    return result
+
+
+def _hellings(
+    graph: nt.MultiDiGraph,
+    vertices: VertexMap,
+    productions: Iterable[Production],
+    derivations: Optional[Derivations] = None,
+    goal: Optional[Callable[[Tuple], bool]] = None,
+    is_urgent: Optional[Callable[[Tuple], bool]] = None,
+    budget: Optional[Budget] = None,
+) -> Tuple[
+    Set[Tuple[int, str, int]], Progress, Optional[Tuple[int, str, int]], Optional[str]
+]:
+    """
+    Worklist of Hellings algorithm over vertex ids
+    :param productions: productions of the grammar in WCNF
+    :param goal: (optional) the computation stops as soon as a fact satisfying goal is derived
+    :param is_urgent: (optional) facts satisfying is_urgent are processed before the others
+    :param budget: (optional) limits of the run, checked after every worklist pop
+    :return: (derived facts, progress, fact satisfying goal or None, reason of the budget stop or None)
+    """
+    if budget is not None:
+        budget.start()
+    if derivations is not None:
+        derivations.bind(vertices)
+
+    def prod_id(head: str, body: tuple) -> int:
+        return -1 if derivations is None else derivations.add_production(head, body)
+
+    eps_head: List[Tuple[str, int]] = []
+    term_head: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+    # (B, C) -> heads of productions with body B C
+    nonterm_head: Dict[Tuple[str, str], List[Tuple[str, int]]] = defaultdict(list)
+    for p in productions:
+        head = p.head.value
+        body = tuple(sym.value for sym in p.body)
+        if not body:
+            eps_head.append((head, prod_id(head, body)))
+        elif len(body) == 1:
+            term_head[body[0]].append((head, prod_id(head, body)))
+        else:
+            nonterm_head[body].append((head, prod_id(head, body)))
+
+    rules: Set[Tuple] = set()
+    outgoing: Dict[int, Set[Tuple]] = defaultdict(set)
+    incoming: Dict[int, Set[Tuple]] = defaultdict(set)
+    worklist = deque()
+    urgent = deque()
+    found = []
+
+    def add(edge: Tuple, p_id: int, split=None):
+        recorded = derivations is not None and derivations.record(edge, p_id, split)
+        if edge not in rules:
+            u, A, v = edge
+            rules.add(edge)
+            outgoing[u].add((A, v))
+            incoming[v].add((u, A))
+            if goal is not None and not found and goal(edge):
+                found.append(edge)
+        elif not recorded:
+            return
+        # Shorter path may be found for the known fact, facts derived from it have to be updated
+        if is_urgent is not None and is_urgent(edge):
+            urgent.append(edge)
+        else:
+            worklist.append(edge)
+
+    for h, p_id in eps_head:
+        for v in range(len(vertices)):
+            add((v, h, v), p_id)
+
+    for u, v, label in vertices.edges(graph):
+        for h, p_id in term_head.get(label, []):
+            add((u, h, v), p_id)
 
-    for u, v, e_data in graph.edges(data=True):
-        for p in term_head:
-            if p.body[0] == Terminal(e_data["label"]):
-                terminal_edges.add((u, p.head.value, v))
+    # Add edges created with multiple rules
+    steps = 0
+    reason = None
+    while (urgent or worklist) and not found:
+        if budget is not None:
+            reason = budget.check(facts=len(rules))
+            if reason is not None:
+                break
+        u, A, v = urgent.popleft() if urgent else worklist.popleft()
+        steps += 1
 
-    rules = epsilon_edges.union(terminal_edges)
+        for frm, B in list(incoming[u]):
+            for h, p_id in nonterm_head.get((B, A), []):
+                add((frm, h, v), p_id, u)
 
-    rules_copy = rules.copy()
+        for B, to in list(outgoing[v]):
+            for h, p_id in nonterm_head.get((A, B), []):
+                add((u, h, to), p_id, v)
 
-    # Add edges created with multiple rules
-    while rules_copy:
-        u, A, v = rules_copy.pop()
-        step = set()
-
-        for frm, B, to in rules:
-            if to == u:
-                new_edges = set()
-                for p in nonterm_head:
-                    if (
-                        p.body[0].value == B
-                        and p.body[1].value == A
-                        and (frm, p.head.value, v) not in rules
-                    ):
-                        new_edges.add((frm, p.head.value, v))
-                step |= new_edges
-
-        rules |= step
-        rules_copy |= step
-        step.clear()
-
-        for frm, B, to in rules:
-            if frm == v:
-                new_edges = set()
-                for p in nonterm_head:
-                    if (
-                        p.body[0].value == A
-                        and p.body[1].value == B
-                        and (u, p.head.value, to) not in rules
-                    ):
-                        new_edges.add((u, p.head.value, to))
-                step |= new_edges
-
-        rules |= step
-        rules_copy |= step
-
-    return rules
+    complete = not urgent and not worklist
+    progress = Progress(len(rules), steps, complete)
+    return rules, progress, found[0] if found else None, reason
 
 
 def query_graph_hellings(
@@ -83,10 +150,15 @@ def query_graph_hellings(
     start_nonterminal: Variable,
 ) -> Dict[int, Set[int]]:
     """
-    This function executes a query on a graph using the Hellings algorithm
+    This function executes a query on a graph using the Hellings algorithm.
+    The graph is projected to the terminals of the grammar and to the vertices between start and final ones
     :return: the dictionary that maps starting vertices to the corresponding reachable vertices
     """
 
+    start_vertices, final_vertices = set(start_vertices), set(final_vertices)
+    graph = project_graph(
+        graph, get_alphabet(cfg), start_vertices, final_vertices, prune="reachability"
+    )
     ans = {u: set() for u in start_vertices}
     hellings_res = hellings(graph, cfg)
     for u, non, v in hellings_res:
@@ -109,3 +181,62 @@ def cfg_from_file_hellings(graph: nt.MultiDiGraph, cfg_file: str) -> Set[Tuple]:
     with open(cfg_file) as cfg_file:
         cfg_text = cfg_file.read()
         return cfg_from_text_hellings(graph, cfg_text)
+
+
+def exists_path_hellings(
+    graph: nt.MultiDiGraph,
+    cfg: CFG,
+    start_vertices: Iterable[Hashable],
+    final_vertices: Iterable[Hashable],
+    start_nonterminal: Hashable,
+    derivations: Optional[Derivations] = None,
+    budget: Optional[Budget] = None,
+) -> Union[Existence, PartialResult]:
+    """
+    Checks whether some start vertex reaches some final vertex via the nonterminal
+    using the Hellings algorithm that stops on the first such fact.
+    Only nonterminals that can be used to derive the start nonterminal are processed,
+    facts that extend derivations of it from the start vertices are processed first
+    :param derivations: (optional) Derivations object, the path of the witness can be obtained from it
+    :param budget: (optional) limits of the run
+    :return: Existence with the found (start, final) pair and the progress of the computation,
+             PartialResult with negative Existence if the budget is exhausted before the answer
+    """
+    start_vertices, final_vertices = set(start_vertices), set(final_vertices)
+    wcnf = cfg_to_wcnf(cfg)
+    relevant = get_nonterminal_distances(wcnf, start_nonterminal)
+    productions = [p for p in wcnf.productions if p.head in relevant]
+    alphabet = {p.body[0].value for p in productions if len(p.body) == 1}
+    graph = project_graph(
+        graph, alphabet, start_vertices, final_vertices, prune="reachability"
+    )
+    vertices = VertexMap.from_graph(graph)
+    corners = {var.value for var in get_left_corners(wcnf, start_nonterminal)}
+    head = (
+        start_nonterminal.value
+        if isinstance(start_nonterminal, Variable)
+        else start_nonterminal
+    )
+    start_ids = set(vertices.to_ids(start_vertices))
+    final_ids = set(vertices.to_ids(final_vertices))
+
+    _, progress, found, reason = _hellings(
+        graph,
+        vertices,
+        productions,
+        derivations,
+        goal=lambda edge: edge[1] == head
+        and edge[0] in start_ids
+        and edge[2] in final_ids,
+        is_urgent=lambda edge: edge[0] in start_ids and edge[1] in corners,
+        budget=budget,
+    )
+    if reason is not None:
+        return PartialResult(
+            Existence(False, None, progress), reason, progress, budget.elapsed
+        )
+    if found is None:
+        return Existence(False, None, progress)
+    return Existence(
+        True, (vertices.nodes[found[0]], vertices.nodes[found[2]]), progress
+    )
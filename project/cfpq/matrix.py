@@ -1,51 +1,366 @@
-from typing import AbstractSet, Iterable, Set, Tuple, Dict
+from typing import (
+    AbstractSet,
+    Callable,
+    Hashable,
+    Iterable,
+    List,
+    Set,
+    Tuple,
+    Dict,
+    Optional,
+    Union,
+)
 
 import networkx as nt
-from pyformlang.cfg import CFG, Terminal, Epsilon, Variable
+import numpy as np
+from pyformlang.cfg import CFG, Production, Terminal, Variable
+from project.cfpq.backends import (
+    AdaptiveBackend,
+    BoolMatrix,
+    MatrixBackend,
+    PackedBoolMatrix,
+)
+from project.cfpq.budget import Budget, PartialResult
+from project.cfpq.checkpoint import (
+    Checkpointer,
+    FixpointState,
+    get_fixpoint_key,
+    get_nonterminal_name,
+)
+from project.cfpq.derivations import Derivations
+from project.cfpq.exists import Existence, Progress, get_nonterminal_distances
+from project.projection import get_alphabet, project_graph
+from project.vertices import VertexMap
 from project.wcnf import cfg_to_wcnf
-from scipy.sparse import dok_matrix
+from scipy.sparse import csr_matrix, identity
+
+
+def get_label_matrices(
+    graph: nt.MultiDiGraph, node_idx: Optional[Dict[Hashable, int]] = None
+) -> Dict[str, csr_matrix]:
+    """
+    Builds boolean adjacency matrix for every label of the graph
+    :param node_idx: (optional) indices of the vertices, positions in graph.nodes by default
+    :return: dictionary that maps labels to the matrices
+    """
+    if node_idx is None:
+        node_idx = VertexMap.from_graph(graph).index
+    n = graph.number_of_nodes()
+    edges: Dict[str, Tuple[List[int], List[int]]] = {}
+    for u, v, label in graph.edges(data="label"):
+        rows, cols = edges.setdefault(label, ([], []))
+        rows.append(node_idx[u])
+        cols.append(node_idx[v])
+
+    return {
+        label: csr_matrix(
+            (np.ones(len(rows), dtype=bool), (rows, cols)), shape=(n, n), dtype=bool
+        )
+        for label, (rows, cols) in edges.items()
+    }
+
+
+def matrix_closure(
+    label_matrices: Dict[str, csr_matrix],
+    n: int,
+    wcnf: CFG,
+    derivations: Optional[Derivations] = None,
+    backend: Optional[MatrixBackend] = None,
+    budget: Optional[Budget] = None,
+    checkpoint: Optional[Checkpointer] = None,
+    resume: bool = False,
+    nodes: Optional[List[Hashable]] = None,
+) -> Union[Dict[Variable, csr_matrix], PartialResult]:
+    """
+    Computes matrices of all nonterminals of the grammar
+    :param label_matrices: adjacency matrices of the graph labels
+    :param n: number of vertices of the graph
+    :param wcnf: grammar in WCNF
+    :param derivations: (optional) Derivations object to record witnesses of the found facts into,
+                        the first found derivation is recorded for every fact
+    :param backend: (optional) representation of the matrices, AdaptiveBackend by default
+    :param budget: (optional) limits of the run, checked after every matrix product
+    :param checkpoint: (optional) Checkpointer to periodically save the matrices with
+    :param resume: continue the computation from the last checkpoint instead of starting it over
+    :param nodes: (optional) vertices in the order of their ids, the checkpoint made
+                  with another vertex order isn't resumed
+    :return: dictionary that maps nonterminals to their matrices,
+             or PartialResult with the matrices computed so far if the budget is exhausted
+    """
+
+    def get_nonterms(cfg: CFG) -> AbstractSet[Variable]:
+        return {var for var in cfg.variables if var not in cfg.terminals}
+
+    state = None
+    if resume:
+        if checkpoint is None:
+            raise ValueError("Resuming requires a checkpoint")
+        if derivations is not None:
+            raise ValueError("Derivations are not saved in checkpoints")
+        state = checkpoint.load()
+
+    T, progress, _, reason = _matrix_fixpoint(
+        label_matrices,
+        n,
+        get_nonterms(wcnf),
+        wcnf.productions,
+        derivations,
+        backend,
+        budget=budget,
+        checkpoint=checkpoint,
+        state=state,
+        nodes=nodes,
+    )
+    if reason is not None:
+        return PartialResult(T, reason, progress, budget.elapsed)
+    return T
+
+
+def _matrix_fixpoint(
+    label_matrices: Dict[str, csr_matrix],
+    n: int,
+    nonterminals: Iterable[Variable],
+    productions: Iterable[Production],
+    derivations: Optional[Derivations] = None,
+    backend: Optional[MatrixBackend] = None,
+    goal: Optional[Callable[[Variable, BoolMatrix], Optional[Tuple[int, int]]]] = None,
+    budget: Optional[Budget] = None,
+    checkpoint: Optional[Checkpointer] = None,
+    state: Optional[FixpointState] = None,
+    nodes: Optional[List[Hashable]] = None,
+) -> Tuple[
+    Dict[Variable, csr_matrix],
+    Progress,
+    Optional[Tuple[int, Variable, int]],
+    Optional[str],
+]:
+    """
+    Fixpoint of the matrices, binary productions are evaluated in the given order,
+    a production is skipped while its body matrices are unchanged since its last evaluation
+    :param goal: (optional) called for every changed matrix, the computation stops
+                 as soon as it returns (i, j) instead of None
+    :param budget: (optional) limits of the run, checked after every matrix product
+    :param checkpoint: (optional) Checkpointer to save the matrices with when it is due,
+                       on the budget stop and on completion
+    :param state: (optional) FixpointState of the checkpoint to continue from
+    :param nodes: (optional) vertices in the order of their ids for the key of the checkpoint
+    :return: (matrices of the nonterminals, progress, fact found by goal or None,
+              reason of the budget stop or None)
+    """
+    if backend is None:
+        backend = AdaptiveBackend()
+    if budget is not None:
+        budget.start()
+
+    def prod_id(production) -> int:
+        if derivations is None:
+            return -1
+        return derivations.add_production(
+            production.head,
+            tuple(
+                sym.value if isinstance(sym, Terminal) else sym
+                for sym in production.body
+            ),
+        )
+
+    def result(found, steps: int, complete: bool, reason: Optional[str] = None):
+        matrices = {nt: backend.to_csr(matrix) for nt, matrix in T.items()}
+        facts = sum(matrix.nnz for matrix in matrices.values())
+        return matrices, Progress(facts, steps, complete), found, reason
+
+    def save(steps: int, complete: bool) -> None:
+        matrices = {nt: backend.to_csr(matrix) for nt, matrix in T.items()}
+        checkpoint.save(matrices, steps, complete, key)
+
+    T = {nt: backend.from_csr(csr_matrix((n, n), dtype=bool)) for nt in nonterminals}
+    productions = [(production, prod_id(production)) for production in productions]
+    key = None
+    if checkpoint is not None or state is not None:
+        key = get_fixpoint_key(
+            n, [production for production, _ in productions], label_matrices, nodes
+        )
+    steps = 0
+    if state is not None:
+        names = {get_nonterminal_name(nt): nt for nt in T}
+        if state.key != key or set(state.matrices) != set(names):
+            raise ValueError(
+                "The checkpoint was made for another graph, grammar or vertex order"
+            )
+        for name, matrix in state.matrices.items():
+            T[names[name]] = backend.from_csr(matrix)
+        steps = state.steps
+        if state.complete:
+            return result(None, steps, True)
+    for production, p_id in productions:
+        if not production.body:
+            added = identity(n, dtype=bool, format="csr")
+        elif len(production.body) == 1 and production.body[0].value in label_matrices:
+            added = label_matrices[production.body[0].value]
+        else:
+            continue
+        T[production.head] = backend.union(T[production.head], added)
+        if derivations is not None:
+            for i, j in zip(*added.nonzero()):
+                derivations.record((int(i), production.head, int(j)), p_id)
+    if goal is not None:
+        for nt, matrix in T.items():
+            found = goal(nt, matrix)
+            if found is not None:
+                return result((found[0], nt, found[1]), steps, False)
+
+    total = sum(backend.nnz(matrix) for matrix in T.values())
+    if budget is not None:
+        reason = budget.check(facts=total, nnz=total)
+        if reason is not None:
+            if checkpoint is not None:
+                save(steps, False)
+            return result(None, steps, False, reason)
+
+    binary = [(p, p_id) for p, p_id in productions if len(p.body) == 2]
+    # versions of the matrices change on every update, evaluated[i] holds the versions
+    # of the body matrices of the i-th production at its last evaluation
+    versions = {nt: 0 for nt in T}
+    evaluated: List[Optional[Tuple[int, int]]] = [None] * len(binary)
+    changed = True
+    while changed:
+        changed = False
+        for i, (production, p_id) in enumerate(binary):
+            body_versions = (versions[production.body[0]], versions[production.body[1]])
+            if evaluated[i] == body_versions:
+                continue
+            evaluated[i] = body_versions
+            left, right = T[production.body[0]], T[production.body[1]]
+            old = T[production.head]
+            new = backend.union(old, backend.product(left, right))
+            steps += 1
+            added = backend.nnz(new) - backend.nnz(old)
+            if added != 0:
+                changed = True
+                total += added
+                versions[production.head] += 1
+                T[production.head] = new
+                if derivations is not None:
+                    _record_splits(
+                        derivations,
+                        production.head,
+                        p_id,
+                        backend.difference(new, old),
+                        backend.to_csr(left),
+                        backend.to_csr(right),
+                    )
+                if goal is not None:
+                    found = goal(production.head, new)
+                    if found is not None:
+                        return result(
+                            (found[0], production.head, found[1]), steps, False
+                        )
+            if budget is not None:
+                reason = budget.check(facts=total, nnz=total)
+                if reason is not None:
+                    if checkpoint is not None:
+                        save(steps, False)
+                    return result(None, steps, False, reason)
+            if checkpoint is not None and checkpoint.due(steps):
+                save(steps, False)
+    if checkpoint is not None:
+        save(steps, True)
+    return result(None, steps, True)
 
 
 def matrix_alg(
     graph: nt.MultiDiGraph,
     cfg: CFG,
-) -> Set[Tuple]:
+    derivations: Optional[Derivations] = None,
+    backend: Optional[MatrixBackend] = None,
+    order: Optional[str] = None,
+    budget: Optional[Budget] = None,
+    checkpoint: Optional[Checkpointer] = None,
+    resume: bool = False,
+) -> Union[Set[Tuple], PartialResult]:
     """
     This function searches the graph and identifies all vertex pairs where the first vertex can be
     reached from the second vertex via a path that belongs to the given context-free grammar,
     without considering the starting non-terminal.
-    :returns: Set of tuples (v1, nonterminal, v2), which describe edges (from, label, to)
+    :param derivations: (optional) Derivations object to record witnesses of the found facts into,
+                        the first found derivation is recorded for every fact
+    :param backend: (optional) representation of the matrices, AdaptiveBackend by default
+    :param order: (optional) order of the vertex ids, see VertexMap.from_graph
+    :param budget: (optional) limits of the run, checked after every matrix product
+    :param checkpoint: (optional) Checkpointer to periodically save the matrices with
+    :param resume: continue the computation from the last checkpoint, see resume_matrix_alg
+    :returns: Set of tuples (v1, nonterminal, v2), which describe edges (from, label, to),
+              or PartialResult with the facts derived so far if the budget is exhausted
     """
-    cfg = cfg_to_wcnf(cfg)
+    vertices = VertexMap.from_graph(graph, order)
+    if derivations is not None:
+        derivations.bind(vertices)
+    T = matrix_closure(
+        get_label_matrices(graph, vertices.index),
+        len(vertices),
+        cfg_to_wcnf(cfg),
+        derivations,
+        backend,
+        budget,
+        checkpoint,
+        resume,
+        vertices.nodes,
+    )
+    partial = T if isinstance(T, PartialResult) else None
+    if partial is not None:
+        T = partial.result
+    nodes = vertices.nodes
+    result = set()
+    for nt, matrix in T.items():
+        rows, cols = matrix.nonzero()
+        result.update((nodes[i], nt, nodes[j]) for i, j in zip(rows, cols))
+    if partial is not None:
+        return partial._replace(result=result)
+    return result
 
-    def get_nonterms(cfg: CFG) -> AbstractSet[Variable]:
-        return {var for var in cfg.variables if var not in cfg.terminals}
 
-    n = graph.number_of_nodes()
-    T = {nt: dok_matrix((n, n), dtype=bool) for nt in get_nonterms(cfg)}
-    for i, j, x in graph.edges(data="label"):
-        for production in cfg.productions:
-            t = production.body[0]
-            if isinstance(t, Epsilon):
-                T[production.head][i, j] = True
-            if isinstance(t, Terminal) and t.value == x:
-                T[production.head][i, j] = True
-    T_prev = T
-    while True:
-        T = T.copy()
-        for production in cfg.productions:
-            if not isinstance(production.body[0], (Epsilon, Terminal)):
-                T[production.head] += T[production.body[0]] @ T[production.body[1]]
-        if all((T[key] != T_prev[key]).nnz == 0 for key in T.keys() | T_prev.keys()):
-            break
-        T_prev = T
-    result = {
-        (i, nt, j)
-        for nt, matrix in T.items()
-        for (i, j), value in matrix.todok().items()
-        if value
-    }
-    return result
+def resume_matrix_alg(
+    graph: nt.MultiDiGraph,
+    cfg: CFG,
+    checkpoint: Checkpointer,
+    backend: Optional[MatrixBackend] = None,
+    order: Optional[str] = None,
+    budget: Optional[Budget] = None,
+) -> Union[Set[Tuple], PartialResult]:
+    """
+    Continues matrix_alg from the last checkpoint, the result is the same as of the uninterrupted run.
+    The graph, the grammar and the order must be the same as in the interrupted run,
+    the checkpoint can be moved to another machine
+    :param checkpoint: Checkpointer of the interrupted run, new checkpoints are saved with it
+    :raises ValueError: if the checkpoint was made for another graph, grammar or vertex order
+    """
+    return matrix_alg(
+        graph,
+        cfg,
+        backend=backend,
+        order=order,
+        budget=budget,
+        checkpoint=checkpoint,
+        resume=True,
+    )
+
+
+def _record_splits(
+    derivations: Derivations,
+    head: Variable,
+    p_id: int,
+    added: csr_matrix,
+    left: csr_matrix,
+    right: csr_matrix,
+) -> None:
+    """
+    Finds split vertex for every added entry: k such that left[i, k] and right[k, j]
+    """
+    right = right.tocsc()
+    for i, j in zip(*added.nonzero()):
+        row = left.indices[left.indptr[i] : left.indptr[i + 1]]
+        col = right.indices[right.indptr[j] : right.indptr[j + 1]]
+        k = np.intersect1d(row, col, assume_unique=True)[0]
+        derivations.record((int(i), head, int(j)), p_id, int(k))
 
 
 def query_graph_matrix(
@@ -56,10 +371,15 @@ def query_graph_matrix(
     start_nonterminal: Variable,
 ) -> Dict[int, Set[int]]:
     """
-    This function executes a query on a graph using the matrix algorithm
+    This function executes a query on a graph using the matrix algorithm.
+    The graph is projected to the terminals of the grammar and to the vertices between start and final ones
     :return: the dictionary that maps starting vertices to the corresponding reachable vertices
     """
 
+    start_vertices, final_vertices = set(start_vertices), set(final_vertices)
+    graph = project_graph(
+        graph, get_alphabet(cfg), start_vertices, final_vertices, prune="reachability"
+    )
     ans = {u: set() for u in start_vertices}
     hellings_res = matrix_alg(graph, cfg)
     for u, non, v in hellings_res:
@@ -82,3 +402,78 @@ def cfg_from_file_matrix(graph: nt.MultiDiGraph, cfg_file: str) -> Set[Tuple]:
     with open(cfg_file) as cfg_file:
         cfg_text = cfg_file.read()
         return cfg_from_text_matrix(graph, cfg_text)
+
+
+def _find_entry(
+    matrix: BoolMatrix, rows: np.ndarray, cols: np.ndarray
+) -> Optional[Tuple[int, int]]:
+    """
+    Some (i, j) with matrix[i, j] for i in rows and j in cols, None if there is no such entry
+    """
+    if isinstance(matrix, PackedBoolMatrix):
+        sub = PackedBoolMatrix(matrix.words[rows], matrix.shape[1]).to_array()[:, cols]
+    else:
+        sub = matrix[rows][:, cols]
+    i, j = sub.nonzero()
+    if len(i) == 0:
+        return None
+    return int(rows[i[0]]), int(cols[j[0]])
+
+
+def exists_path_matrix(
+    graph: nt.MultiDiGraph,
+    cfg: CFG,
+    start_vertices: Iterable[Hashable],
+    final_vertices: Iterable[Hashable],
+    start_nonterminal: Hashable,
+    backend: Optional[MatrixBackend] = None,
+    budget: Optional[Budget] = None,
+) -> Union[Existence, PartialResult]:
+    """
+    Checks whether some start vertex reaches some final vertex via the nonterminal
+    using the matrix algorithm that stops as soon as such entry appears.
+    Only nonterminals that can be used to derive the start nonterminal are computed,
+    productions farther from it are evaluated first, so every sweep propagates facts towards it
+    :param backend: (optional) representation of the matrices, AdaptiveBackend by default
+    :param budget: (optional) limits of the run
+    :return: Existence with the found (start, final) pair and the progress of the computation,
+             PartialResult with negative Existence if the budget is exhausted before the answer
+    """
+    start_vertices, final_vertices = set(start_vertices), set(final_vertices)
+    wcnf = cfg_to_wcnf(cfg)
+    distances = get_nonterminal_distances(wcnf, start_nonterminal)
+    productions = sorted(
+        (p for p in wcnf.productions if p.head in distances),
+        key=lambda p: -distances[p.head],
+    )
+    alphabet = {p.body[0].value for p in productions if len(p.body) == 1}
+    graph = project_graph(
+        graph, alphabet, start_vertices, final_vertices, prune="reachability"
+    )
+    vertices = VertexMap.from_graph(graph)
+    head = (
+        start_nonterminal
+        if isinstance(start_nonterminal, Variable)
+        else Variable(start_nonterminal)
+    )
+    rows = np.array(sorted(vertices.to_ids(start_vertices)), dtype=np.int64)
+    cols = np.array(sorted(vertices.to_ids(final_vertices)), dtype=np.int64)
+
+    _, progress, found, reason = _matrix_fixpoint(
+        get_label_matrices(graph, vertices.index),
+        len(vertices),
+        distances,
+        productions,
+        backend=backend,
+        goal=lambda nt, matrix: _find_entry(matrix, rows, cols) if nt == head else None,
+        budget=budget,
+    )
+    if reason is not None:
+        return PartialResult(
+            Existence(False, None, progress), reason, progress, budget.elapsed
+        )
+    if found is None:
+        return Existence(False, None, progress)
+    return Existence(
+        True, (vertices.nodes[found[0]], vertices.nodes[found[2]]), progress
+    )
@@ -0,0 +1,325 @@
+import os
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+import networkx as nt
+import numpy as np
+from pyformlang.cfg import CFG, Variable
+from scipy.sparse import csr_matrix, vstack
+
+from project.cfpq.matrix import get_label_matrices
+from project.vertices import VertexMap
+from project.wcnf import cfg_to_wcnf
+
+# Productions sent to the workers: (head, ()) for epsilon, (head, (label,)) for terminal,
+# (head, (B, C)) for nonterminals, nonterminals are given by their indices
+Rule = Tuple[int, tuple]
+
+
+class PipeTransport:
+    """
+    Workers are local processes connected to the coordinator with pipes
+    """
+
+    def __init__(self):
+        self._processes: List[Process] = []
+
+    def connect(self, workers: int) -> List[Connection]:
+        """
+        Starts the workers
+        :return: connections to the workers
+        """
+        connections = []
+        for _ in range(workers):
+            parent, child = Pipe()
+            process = Process(target=_serve, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self._processes.append(process)
+            connections.append(parent)
+        return connections
+
+    def close(self) -> None:
+        for process in self._processes:
+            process.join()
+        self._processes = []
+
+
+class SocketTransport:
+    """
+    Workers connect to the coordinator over TCP, so they can run on other machines:
+    every remote worker runs serve(address, authkey) with the address of the coordinator.
+    Messages are pickled, so anyone who knows the key can run code on the coordinator and the workers:
+    keep the key secret and don't expose the port to untrusted networks
+    """
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("localhost", 0),
+        authkey: Optional[bytes] = None,
+        spawn: bool = True,
+    ):
+        """
+        :param address: address the coordinator listens on, port 0 picks a free port
+        :param authkey: (optional) key that the workers must present,
+                        random key by default, required for remote workers
+        :param spawn: start the workers as local processes, otherwise wait for remote ones
+        :raises ValueError: if no key is given for remote workers
+        """
+        if authkey is None:
+            if not spawn:
+                raise ValueError("Remote workers require an explicit authkey")
+            authkey = os.urandom(32)
+        self.address = address
+        self.authkey = authkey
+        self.spawn = spawn
+        self._processes: List[Process] = []
+
+    def connect(self, workers: int) -> List[Connection]:
+        with Listener(self.address, authkey=self.authkey) as listener:
+            self.address = listener.address
+            if self.spawn:
+                for _ in range(workers):
+                    process = Process(
+                        target=serve, args=(listener.address, self.authkey), daemon=True
+                    )
+                    process.start()
+                    self._processes.append(process)
+            return [listener.accept() for _ in range(workers)]
+
+    def close(self) -> None:
+        for process in self._processes:
+            process.join()
+        self._processes = []
+
+
+def serve(address: Tuple[str, int], authkey: bytes) -> None:
+    """
+    Runs the worker for the coordinator listening on the address, see SocketTransport
+    :param authkey: key of the coordinator
+    """
+    with Client(address, authkey=authkey) as connection:
+        _serve(connection)
+
+
+def get_row_blocks(
+    label_matrices: Dict[str, csr_matrix], n: int, parts: int
+) -> List[int]:
+    """
+    Splits rows into contiguous blocks with close numbers of edges
+    :return: bounds of the blocks, block i is rows bounds[i]..bounds[i + 1]-1
+    """
+    degrees = np.ones(n, dtype=np.int64)
+    for matrix in label_matrices.values():
+        degrees += np.diff(matrix.indptr)
+    cumulative = np.cumsum(degrees)
+    total = cumulative[-1] if n else 0
+    targets = total * np.arange(1, parts) / parts
+    inner = np.searchsorted(cumulative, targets, side="right")
+    return [0] + [int(bound) for bound in inner] + [n]
+
+
+def _pad(block: csr_matrix, start: int, n: int) -> csr_matrix:
+    """
+    n x n matrix with the rows of the block placed from the start row
+    """
+    above = csr_matrix((start, n), dtype=bool)
+    below = csr_matrix((n - start - block.shape[0], n), dtype=bool)
+    return vstack([above, block, below], format="csr", dtype=bool)
+
+
+def _scatter(rows: np.ndarray, block: csr_matrix, n: int) -> csr_matrix:
+    """
+    n x n matrix with the i-th row of the block placed to the rows[i] row
+    """
+    coo = block.tocoo()
+    return csr_matrix(
+        (np.ones(coo.nnz, dtype=bool), (rows[coo.row], coo.col)),
+        shape=(n, n),
+        dtype=bool,
+    )
+
+
+def _serve(connection: Connection) -> None:
+    """
+    Worker loop: owns one row block of every nonterminal matrix and keeps only the rows
+    of the other blocks it reads, i.e. the rows whose indices are columns of its own blocks.
+    After the local fixpoint the worker sends the new facts of its rows and the indices
+    of the rows it started to read, and receives the new facts of the rows it reads
+    """
+    _, start, stop, n, label_blocks, nonterminals, rules = connection.recv()
+    empty = csr_matrix((stop - start, n), dtype=bool)
+    own = [empty] * nonterminals
+    for head, body in rules:
+        if not body:
+            rows = np.arange(stop - start)
+            own[head] = own[head] + csr_matrix(
+                (np.ones(len(rows), dtype=bool), (rows, rows + start)),
+                shape=(stop - start, n),
+            )
+        elif len(body) == 1 and body[0] in label_blocks:
+            own[head] = own[head] + label_blocks[body[0]]
+    binary = [(head, body) for head, body in rules if len(body) == 2]
+    lefts = sorted({left for _, (left, _) in binary})
+    # rows of the other blocks, only the read ones are filled
+    remote = [csr_matrix((n, n), dtype=bool)] * nonterminals
+    reading = np.zeros(n, dtype=bool)
+    reading[start:stop] = True
+    before = [empty] * nonterminals
+
+    while True:
+        changed = True
+        while changed:
+            changed = False
+            for head, (left, right) in binary:
+                rows = remote[right] + _pad(own[right], start, n)
+                new = own[head] + own[left] @ rows
+                if new.nnz == own[head].nnz:
+                    continue
+                changed = True
+                own[head] = new
+        delta = [new > old for new, old in zip(own, before)]
+        before = list(own)
+        columns = np.unique(
+            np.concatenate(
+                [own[left].indices for left in lefts] + [np.zeros(0, dtype=np.int64)]
+            )
+        ).astype(np.int64)
+        new_rows = columns[~reading[columns]]
+        reading[new_rows] = True
+        connection.send(("delta", delta, new_rows))
+
+        message = connection.recv()
+        if message[0] == "done":
+            return
+        _, rows, blocks = message
+        for nt, block in blocks.items():
+            remote[nt] = remote[nt] + _scatter(rows, block, n)
+
+
+def sharded_closure(
+    label_matrices: Dict[str, csr_matrix],
+    n: int,
+    wcnf: CFG,
+    workers: int = 2,
+    transport=None,
+) -> Dict[Variable, csr_matrix]:
+    """
+    Computes matrices of all nonterminals of the grammar on several workers.
+    Rows are split into blocks, every worker owns the rows of its block and derives their facts
+    until its local fixpoint, then the new facts are exchanged in one batch:
+    a worker receives only the rows of the other blocks it reads,
+    the new facts of the rows it already reads and the whole rows it started to read.
+    The computation stops when a round brings no new facts to any worker.
+    The coordinator merges the facts of all workers, so it holds the whole result
+    :param workers: number of the workers
+    :param transport: (optional) PipeTransport or SocketTransport, PipeTransport by default
+    :return: dictionary that maps nonterminals to their matrices, the same as matrix_closure
+    """
+    if transport is None:
+        transport = PipeTransport()
+    nonterminals = [var for var in wcnf.variables if var not in wcnf.terminals]
+    ids = {var: i for i, var in enumerate(nonterminals)}
+    rules: List[Rule] = []
+    for production in wcnf.productions:
+        if len(production.body) == 1:
+            body = (production.body[0].value,)
+        else:
+            body = tuple(ids[var] for var in production.body)
+        rules.append((ids[production.head], body))
+    # only the right operands of the products are read from the other blocks
+    rights = sorted({body[1] for _, body in rules if len(body) == 2})
+
+    T = [csr_matrix((n, n), dtype=bool) for _ in nonterminals]
+    bounds = get_row_blocks(label_matrices, n, workers)
+    reading = [np.zeros(0, dtype=np.int64) for _ in range(workers)]
+    connections = transport.connect(workers)
+    try:
+        for i, connection in enumerate(connections):
+            start, stop = bounds[i], bounds[i + 1]
+            label_blocks = {
+                label: matrix[start:stop] for label, matrix in label_matrices.items()
+            }
+            connection.send(
+                ("init", start, stop, n, label_blocks, len(nonterminals), rules)
+            )
+        while True:
+            messages = [connection.recv() for connection in connections]
+            changes = [
+                sum(
+                    (
+                        _pad(delta[nt], bounds[i], n)
+                        for i, (_, delta, _) in enumerate(messages)
+                    ),
+                    csr_matrix((n, n), dtype=bool),
+                )
+                for nt in range(len(nonterminals))
+            ]
+            for nt, change in enumerate(changes):
+                T[nt] = T[nt] + change
+            changed_rows = np.zeros(n, dtype=bool)
+            for nt in rights:
+                changed_rows[np.diff(changes[nt].indptr) > 0] = True
+
+            updates = []
+            for i, (_, _, new_rows) in enumerate(messages):
+                old_rows = reading[i][changed_rows[reading[i]]]
+                reading[i] = np.concatenate([reading[i], new_rows])
+                rows = np.concatenate([old_rows, new_rows])
+                blocks = {
+                    nt: vstack(
+                        [changes[nt][old_rows], T[nt][new_rows]],
+                        format="csr",
+                        dtype=bool,
+                    )
+                    for nt in rights
+                }
+                updates.append((rows, blocks))
+            if all(
+                sum(block.nnz for block in blocks.values()) == 0
+                for _, blocks in updates
+            ):
+                break
+            for connection, (rows, blocks) in zip(connections, updates):
+                connection.send(("update", rows, blocks))
+
+        for connection in connections:
+            connection.send(("done",))
+    finally:
+        for connection in connections:
+            connection.close()
+        transport.close()
+
+    return {var: T[i] for var, i in ids.items()}
+
+
+def sharded_matrix_alg(
+    graph: nt.MultiDiGraph,
+    cfg: CFG,
+    workers: int = 2,
+    transport=None,
+    order: Optional[str] = None,
+) -> Set[Tuple[Hashable, Variable, Hashable]]:
+    """
+    Matrix algorithm on several worker processes, the result is the same as of matrix_alg
+    :param workers: number of the workers
+    :param transport: (optional) PipeTransport or SocketTransport, PipeTransport by default
+    :param order: (optional) order of the vertex ids, see VertexMap.from_graph,
+                  orders that keep neighbours close make the row blocks more independent
+    :returns: Set of tuples (v1, nonterminal, v2), which describe edges (from, label, to)
+    """
+    vertices = VertexMap.from_graph(graph, order)
+    T = sharded_closure(
+        get_label_matrices(graph, vertices.index),
+        len(vertices),
+        cfg_to_wcnf(cfg),
+        workers,
+        transport,
+    )
+    nodes = vertices.nodes
+    result = set()
+    for var, matrix in T.items():
+        rows, cols = matrix.nonzero()
+        result.update((nodes[i], var, nodes[j]) for i, j in zip(rows, cols))
+    return result
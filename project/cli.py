@@ -0,0 +1,262 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from typing import IO, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+import networkx as nt
+import numpy as np
+from pyformlang.cfg import CFG, Variable
+
+import project.utils
+from project.cfpq.hellings import hellings
+from project.graphs import COMPACT_MAGIC, read_compact, to_networkx
+from project.session import GraphSession, Query
+from project.wcnf import load_cfg
+
+ENGINES = ("matrix", "hellings", "rpq")
+FORMATS = ("jsonl", "npy")
+
+Pairs = List[Tuple[Hashable, Hashable]]
+
+
+def load_graph(source: str) -> nt.MultiDiGraph:
+    """
+    Loads graph from a compact graph file, a CSV file with "from to label" lines
+    or by name from CFPQ dataset
+    """
+    if not os.path.exists(source):
+        return project.utils.get_graph_by_name(source)
+    with open(source, "rb") as file:
+        magic = file.read(len(COMPACT_MAGIC))
+    if magic == COMPACT_MAGIC:
+        return to_networkx(read_compact(source))
+    import cfpq_data as cfpq
+
+    return cfpq.graph_from_csv(source)
+
+
+class BatchEngine:
+    """
+    Graph and grammar loaded once to answer a stream of queries
+
+    A query is a dictionary with optional "id", "starts" and "finals" (all vertices by default),
+    CFPQ engines take optional "nonterminal" (the start symbol of the grammar by default),
+    RPQ engine requires "regex".
+    """
+
+    def __init__(
+        self, graph: nt.MultiDiGraph, engine: str = "matrix", cfg: Optional[CFG] = None
+    ):
+        """
+        :param graph: the graph to be queried
+        :param engine: "matrix", "hellings" or "rpq"
+        :param cfg: context-free grammar, required by "matrix" and "hellings"
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if engine != "rpq" and cfg is None:
+            raise ValueError(f"Engine {engine} requires a grammar")
+
+        self.engine = engine
+        self.cfg = cfg
+        self.session = GraphSession(graph)
+        # nonterminal name -> start -> reachable vertices
+        self._facts: Dict[str, Dict[Hashable, Set[Hashable]]] = {}
+        if engine == "matrix":
+            self.session.closure(cfg)
+        elif engine == "hellings":
+            for u, nonterminal, v in hellings(graph, cfg):
+                self._facts.setdefault(str(nonterminal), {}).setdefault(u, set()).add(v)
+
+    def __getstate__(self):
+        # grammar is pickled as text, see GraphSession.__getstate__
+        state = dict(self.__dict__)
+        if self.cfg is not None:
+            state["cfg"] = (self.cfg.start_symbol.value, self.cfg.to_text())
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.cfg is not None:
+            start, text = self.cfg
+            self.cfg = CFG.from_text(text, Variable(start))
+
+    def _vertices(self, query: dict, key: str) -> List[Hashable]:
+        vertices = query.get(key)
+        if vertices is None:
+            return self.session.nodes
+        if not isinstance(vertices, list):
+            raise ValueError(f"{key} must be a list of vertices")
+        index = self.session.vertices.index
+        for vertex in vertices:
+            if vertex not in index:
+                raise ValueError(f"Unknown vertex: {vertex!r}")
+        return list(dict.fromkeys(vertices))
+
+    def answer(self, query: dict) -> Pairs:
+        """
+        :return: pairs (start, final) such that final is reachable from start,
+                 ordered by the start vertices of the query and the vertex ids
+        """
+        starts = self._vertices(query, "starts")
+        finals = self._vertices(query, "finals")
+        if self.engine == "rpq":
+            if not isinstance(query.get("regex"), str):
+                raise ValueError("RPQ query requires regex")
+            ans = self.session.query_rpq(query["regex"], starts, finals)
+        else:
+            nonterminal = query.get("nonterminal", self.cfg.start_symbol.value)
+            if not isinstance(nonterminal, str):
+                raise ValueError("nonterminal must be a string")
+            if self.engine == "matrix":
+                query = Query(starts, finals, nonterminal)
+                ans = self.session.query(self.cfg, [query])[0]
+            else:
+                reachable = self._facts.get(nonterminal, {})
+                finals = set(finals)
+                ans = {u: reachable.get(u, set()) & finals for u in starts}
+
+        index = self.session.vertices.index
+        return [(u, v) for u in starts for v in sorted(ans[u], key=index.get)]
+
+
+def _to_json(vertex: Hashable):
+    return vertex.item() if isinstance(vertex, np.generic) else vertex
+
+
+def answer_line(engine: BatchEngine, line: str) -> dict:
+    """
+    Answers the query given as a JSON line, malformed queries give error records
+    instead of stopping the batch
+    :return: {"id": ..., "pairs": [[start, final], ...]} or {"id": ..., "error": message}
+    """
+    query_id = None
+    try:
+        query = json.loads(line)
+        if not isinstance(query, dict):
+            raise ValueError("Query must be a JSON object")
+        query_id = query.get("id")
+        pairs = engine.answer(query)
+    except (ValueError, TypeError, KeyError) as e:
+        return {"id": query_id, "error": str(e)}
+    return {"id": query_id, "pairs": [[_to_json(u), _to_json(v)] for u, v in pairs]}
+
+
+_worker_engine: Optional[BatchEngine] = None
+
+
+def _init_worker(engine: BatchEngine) -> None:
+    global _worker_engine
+    _worker_engine = engine
+
+
+def _worker_answer(line: str) -> dict:
+    return answer_line(_worker_engine, line)
+
+
+def run_batch(
+    engine: BatchEngine,
+    lines: Iterable[str],
+    processes: int = 1,
+    chunk_size: int = 16,
+    context: Optional[str] = None,
+) -> Iterator[dict]:
+    """
+    Answers the queries lazily in the order of the lines, empty lines are skipped
+    :param processes: number of worker processes, the queries are answered in this process if 1
+    :param chunk_size: number of queries sent to a worker at once
+    :param context: (optional) start method of the workers, the default of the platform by default,
+                    the engine is pickled for every worker unless it is "fork"
+    """
+    lines = (line for line in lines if line.strip())
+    if processes <= 1:
+        for line in lines:
+            yield answer_line(engine, line)
+        return
+
+    pool = multiprocessing.get_context(context).Pool(
+        processes, initializer=_init_worker, initargs=(engine,)
+    )
+    with pool:
+        yield from pool.imap(_worker_answer, lines, chunk_size)
+
+
+def write_jsonl(out: IO[str], results: Iterable[dict]) -> None:
+    """
+    Writes every result as a JSON line, the output is flushed after every line
+    """
+    for result in results:
+        out.write(json.dumps(result, separators=(",", ":")) + "\n")
+        out.flush()
+
+
+def _is_integer(vertex: Hashable) -> bool:
+    return isinstance(vertex, (int, np.integer)) and not isinstance(vertex, bool)
+
+
+def write_arrays(out: IO[bytes], results: Iterable[dict]) -> None:
+    """
+    Writes pairs of every result as (k, 2) int64 array in npy format,
+    the arrays can be read back one by one with numpy.load from the same stream.
+    Errors are written to stderr and give empty arrays, so the arrays match the queries
+    :raises ValueError: if a vertex isn't an integer
+    """
+    for result in results:
+        pairs = result.get("pairs")
+        if pairs is None:
+            print(f"query {result['id']}: {result['error']}", file=sys.stderr)
+            pairs = []
+        for pair in pairs:
+            if not all(_is_integer(vertex) for vertex in pair):
+                raise ValueError(f"npy format requires integer vertices, got {pair}")
+        np.save(out, np.array(pairs, dtype=np.int64).reshape(-1, 2))
+        out.flush()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m project",
+        description="Answers path queries read as JSON lines, the graph and the grammar are loaded once",
+    )
+    parser.add_argument(
+        "graph",
+        help="compact graph file, CSV file or name of the graph in CFPQ dataset",
+    )
+    parser.add_argument("-g", "--grammar", help="file with the context-free grammar")
+    parser.add_argument("-e", "--engine", choices=ENGINES, default="matrix")
+    parser.add_argument(
+        "-q", "--queries", default="-", help="file with the queries, stdin by default"
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="file for the results, stdout by default"
+    )
+    parser.add_argument("-f", "--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("-j", "--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.engine != "rpq" and args.grammar is None:
+        parser.error(f"engine {args.engine} requires --grammar")
+    cfg = None if args.grammar is None else load_cfg(args.grammar)
+    engine = BatchEngine(load_graph(args.graph), args.engine, cfg)
+    if args.format == "npy" and not all(map(_is_integer, engine.session.nodes)):
+        parser.error("npy format requires a graph with integer vertices, use jsonl")
+
+    queries = sys.stdin if args.queries == "-" else open(args.queries)
+    binary = args.format == "npy"
+    if args.output == "-":
+        out = sys.stdout.buffer if binary else sys.stdout
+    else:
+        out = open(args.output, "wb" if binary else "w")
+    try:
+        results = run_batch(engine, queries, args.workers)
+        if binary:
+            write_arrays(out, results)
+        else:
+            write_jsonl(out, results)
+    finally:
+        if queries is not sys.stdin:
+            queries.close()
+        if args.output != "-":
+            out.close()
@@ -0,0 +1,193 @@
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pyformlang.cfg import CFG
+
+from project.wcnf import cfg_to_wcnf, load_cfg
+
+Word = Sequence[str]
+
+
+class CYKGrammar:
+    """
+    Grammar preprocessed for CYK membership checks
+
+    Variables are numbered and every table cell is a bitset (int) of variables.
+    Binary productions are indexed by the left variable of the body,
+    so the cell combination only touches productions that can fire.
+    The object holds only ints and strings and can be sent to other processes.
+    """
+
+    def __init__(self, cfg: CFG):
+        wcnf = cfg_to_wcnf(cfg)
+        variables = sorted(wcnf.variables | {wcnf.start_symbol}, key=str)
+        idx = {var: i for i, var in enumerate(variables)}
+
+        self._start = 1 << idx[wcnf.start_symbol]
+        # terminal -> bitset of heads
+        self._terminals: Dict[str, int] = {}
+        # left variable -> [(right variable bitset, bitset of heads)]
+        self._pairs: Dict[int, List[Tuple[int, int]]] = {}
+
+        nullable = 0
+        binary: List[Tuple[int, int, int]] = []
+        for prod in wcnf.productions:
+            head = idx[prod.head]
+            if not prod.body:
+                nullable |= 1 << head
+            elif len(prod.body) == 1:
+                term = prod.body[0].value
+                self._terminals[term] = self._terminals.get(term, 0) | 1 << head
+            else:
+                binary.append((head, idx[prod.body[0]], idx[prod.body[1]]))
+
+        changed = True
+        while changed:
+            changed = False
+            for head, left, right in binary:
+                if nullable >> left & 1 and nullable >> right & 1:
+                    if not nullable >> head & 1:
+                        nullable |= 1 << head
+                        changed = True
+        self._nullable = nullable
+
+        pairs: Dict[Tuple[int, int], int] = {}
+        # B -> heads which derive the same span as B because the sibling is nullable
+        lifts: List[int] = [1 << i for i in range(len(variables))]
+        for head, left, right in binary:
+            pairs[(left, right)] = pairs.get((left, right), 0) | 1 << head
+            if nullable >> right & 1:
+                lifts[left] |= 1 << head
+            if nullable >> left & 1:
+                lifts[right] |= 1 << head
+        for (left, right), heads in pairs.items():
+            self._pairs.setdefault(left, []).append((1 << right, heads))
+
+        # Transitive closure of lifts
+        changed = True
+        while changed:
+            changed = False
+            for i, lift in enumerate(lifts):
+                new = lift
+                for j in _bits(lift):
+                    new |= lifts[j]
+                if new != lift:
+                    lifts[i] = new
+                    changed = True
+        self._lifts = lifts
+
+    def _close(self, cell: int) -> int:
+        closed = cell
+        for i in _bits(cell):
+            closed |= self._lifts[i]
+        return closed
+
+    def accepts(self, word: Word) -> bool:
+        """
+        Checks if the word belongs to the language of the grammar
+        :param word: sequence of terminals, string is treated as sequence of characters
+        """
+        n = len(word)
+        if n == 0:
+            return bool(self._nullable & self._start)
+
+        # table[i][l] - variables that derive word[i : i + l + 1]
+        table: List[List[int]] = []
+        for term in word:
+            cell = self._terminals.get(term, 0)
+            if cell == 0:
+                return False
+            table.append([self._close(cell)])
+
+        pairs = self._pairs
+        for length in range(2, n + 1):
+            for i in range(n - length + 1):
+                cell = 0
+                for split in range(1, length):
+                    left = table[i][split - 1]
+                    right = table[i + split][length - split - 1]
+                    if not left or not right:
+                        continue
+                    for b in _bits(left):
+                        for c_mask, heads in pairs.get(b, ()):
+                            if right & c_mask:
+                                cell |= heads
+                if cell:
+                    cell = self._close(cell)
+                table[i].append(cell)
+
+        return bool(table[0][n - 1] & self._start)
+
+    def accepts_many(
+        self,
+        words: Iterable[Word],
+        processes: Optional[int] = None,
+        chunk_size: int = 256,
+    ) -> List[bool]:
+        """
+        Checks many words against the grammar
+        :param words: words to check
+        :param processes: number of worker processes, words are checked in this process if None
+        :param chunk_size: number of words sent to a worker at once
+        :return: list of results in the order of the words
+        """
+        if processes is None:
+            return [self.accepts(word) for word in words]
+
+        with Pool(processes, initializer=_init_worker, initargs=(self,)) as pool:
+            return pool.map(_worker_accepts, words, chunksize=chunk_size)
+
+
+def _bits(mask: int) -> Iterable[int]:
+    """
+    Indices of set bits of the mask
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+_worker_grammar: Optional[CYKGrammar] = None
+
+
+def _init_worker(grammar: CYKGrammar) -> None:
+    global _worker_grammar
+    _worker_grammar = grammar
+
+
+def _worker_accepts(word: Word) -> bool:
+    return _worker_grammar.accepts(word)
+
+
+def cyk(cfg: CFG, word: Word) -> bool:
+    """
+    Checks if the word is derivable in the grammar using CYK algorithm
+    :param cfg: context-free grammar
+    :param word: sequence of terminals, string is treated as sequence of characters
+    """
+    return CYKGrammar(cfg).accepts(word)
+
+
+def cyk_many(
+    cfg: CFG, words: Iterable[Word], processes: Optional[int] = None
+) -> List[bool]:
+    """
+    Checks many words against one grammar, grammar is preprocessed only once
+    """
+    return CYKGrammar(cfg).accepts_many(words, processes)
+
+
+def cyk_from_file(cfg_file: str, word: Word) -> bool:
+    """
+    Checks the word against the grammar loaded from file
+    """
+    return cyk(load_cfg(cfg_file), word)
+
+
+def read_words(path: str) -> List[List[str]]:
+    """
+    Reads words from file, one word per line, terminals are separated by whitespace
+    """
+    with open(path) as file:
+        return [line.split() for line in file.read().splitlines()]
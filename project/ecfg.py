@@ -1,23 +1,35 @@
 import re
 from collections import defaultdict
-from typing import Set, Optional, Dict, List, AbstractSet
+from typing import Set, Optional, Dict, List, AbstractSet, Union
 from pyformlang.cfg import CFG, Variable
 from pyformlang.finite_automaton import EpsilonNFA, DeterministicFiniteAutomaton
 from pyformlang.regular_expression import Regex
 
+from project.regex import compile_regex, to_dfa
 from project.rfa import RFA, RFABox
 
 
 class ECFGProduction:
-    def __init__(self, head: Variable, body: Regex):
+    def __init__(self, head: Variable, body: Union[Regex, str]):
+        """
+        :param body: regex or its text, the text is parsed on the first access to the body
+        """
         self.head: Variable = head
-        self.body: Regex = body
+        self._body: Optional[Regex] = None if isinstance(body, str) else body
+        self._text: Optional[str] = body if isinstance(body, str) else None
+
+    @property
+    def body(self) -> Regex:
+        if self._body is None:
+            self._body = Regex(self._text)
+        return self._body
 
     def __repr__(self):
         return f"ECFGProduction({self.head!r}, {self.body!r})"
 
     def __str__(self):
-        return f"{self.head!s} -> {self.body!s}"
+        body = self._text if self._body is None else self._body
+        return f"{self.head!s} -> {body!s}"
 
     def __eq__(self, other: "ECFGProduction"):
         if not isinstance(self, ECFGProduction):
@@ -28,7 +40,8 @@ class ECFGProduction:
         return self.head == other.head and nfaThis.is_equivalent_to(nfaThat)
 
     def __hash__(self):
-        return hash((self.head, self.body))
+        # equal productions may have different regexes of the same language
+        return hash(self.head)
 
 
 class ECFG:
@@ -134,15 +147,13 @@ class ECFG:
 
     def to_rfa(self) -> RFA:
         """
-        Converts Extended CFG into Recursive Finite Automaton
+        Converts Extended CFG into Recursive Finite Automaton, DFAs of the boxes are taken from the regex cache
         :return:
         """
         return RFA(
             start_symbol=self.start_symbol,
-            boxes={
-                RFABox(
-                    prod.head, prod.body.to_epsilon_nfa().to_deterministic().minimize()
-                )
+            boxes=[
+                RFABox(prod.head, to_dfa(compile_regex(prod.body)))
                 for prod in self.productions
-            },
+            ],
         )
@@ -0,0 +1,231 @@
+import json
+import re
+from collections import namedtuple
+from typing import TYPE_CHECKING, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import networkx as nt
+
+# Edge i goes from src[i] to dst[i] and has label labels[label[i]], vertices are 0..nodes_count-1
+GraphArrays = namedtuple(
+    "GraphArrays", ["nodes_count", "src", "dst", "label", "labels"]
+)
+
+COMPACT_MAGIC = b"CGRAPH1\n"
+_ALIGN = 8
+_DOT_ID = re.compile(r"[A-Za-z_][A-Za-z_0-9]*|-?[0-9]+")
+# keywords aren't IDs in any case
+_DOT_KEYWORDS = {"node", "edge", "graph", "digraph", "subgraph", "strict"}
+
+
+def _make_arrays(
+    nodes_count: int, src, dst, label, labels: Sequence[str]
+) -> GraphArrays:
+    vertex_dtype = np.int32 if nodes_count < 2**31 else np.int64
+    label_dtype = np.uint16 if len(labels) < 2**16 else np.int32
+    return GraphArrays(
+        nodes_count,
+        np.asarray(src, dtype=vertex_dtype),
+        np.asarray(dst, dtype=vertex_dtype),
+        np.asarray(label, dtype=label_dtype),
+        tuple(labels),
+    )
+
+
+def two_cycles_arrays(
+    n: int, m: int, labels: Tuple[str, str] = ("a", "b")
+) -> GraphArrays:
+    """
+    Two cycles connected by the vertex 0, the same graph as cfpq_data.labeled_two_cycles_graph
+    :param n: nodes in 1st cycle (besides the common one)
+    :param m: nodes in 2nd cycle (besides the common one)
+    :param labels: tuple of labels: (1st cycle, 2nd cycle)
+    """
+    first = np.arange(n + 1)
+    second = np.concatenate(([0], np.arange(n + 1, n + m + 1)))
+    src = np.concatenate((first, second))
+    dst = np.concatenate((np.roll(first, -1), np.roll(second, -1)))
+    label = np.concatenate((np.zeros(n + 1), np.ones(m + 1)))
+    return _make_arrays(n + m + 1, src, dst, label, labels)
+
+
+def random_arrays(
+    nodes_count: int,
+    edges_count: int,
+    labels: Sequence[str] = ("a", "b"),
+    seed: Optional[int] = None,
+    exponent: Optional[float] = None,
+) -> GraphArrays:
+    """
+    Random labeled graph, labels are chosen uniformly
+    :param nodes_count: number of vertices
+    :param edges_count: number of edges
+    :param labels: labels of the edges
+    :param seed: (optional) seed of the random generator
+    :param exponent: (optional) ends of the edges are chosen uniformly (Erdős–Rényi) if None,
+                     otherwise the weight of the k-th vertex is k ** -exponent (power-law degrees)
+    """
+    rng = np.random.default_rng(seed)
+    if exponent is None:
+        src = rng.integers(nodes_count, size=edges_count)
+        dst = rng.integers(nodes_count, size=edges_count)
+    else:
+        weights = np.arange(1, nodes_count + 1, dtype=np.float64) ** -exponent
+        cdf = np.cumsum(rng.permutation(weights))
+        cdf /= cdf[-1]
+        src = np.minimum(np.searchsorted(cdf, rng.random(edges_count)), nodes_count - 1)
+        dst = np.minimum(np.searchsorted(cdf, rng.random(edges_count)), nodes_count - 1)
+    label = rng.integers(len(labels), size=edges_count)
+    return _make_arrays(nodes_count, src, dst, label, labels)
+
+
+def grid_arrays(
+    rows: int, cols: int, labels: Tuple[str, str] = ("right", "down")
+) -> GraphArrays:
+    """
+    Grid graph, vertex (r, c) has id r * cols + c
+    :param labels: tuple of labels: (edges (r, c) -> (r, c + 1), edges (r, c) -> (r + 1, c))
+    """
+    ids = np.arange(rows * cols).reshape(rows, cols)
+    right_src, right_dst = ids[:, :-1].ravel(), ids[:, 1:].ravel()
+    down_src, down_dst = ids[:-1, :].ravel(), ids[1:, :].ravel()
+    return _make_arrays(
+        rows * cols,
+        np.concatenate((right_src, down_src)),
+        np.concatenate((right_dst, down_dst)),
+        np.concatenate((np.zeros(len(right_src)), np.ones(len(down_src)))),
+        labels,
+    )
+
+
+def chain_arrays(nodes_count: int, label: str = "a") -> GraphArrays:
+    """
+    Chain 0 -> 1 -> ... -> nodes_count - 1
+    """
+    src = np.arange(max(nodes_count - 1, 0))
+    return _make_arrays(nodes_count, src, src + 1, np.zeros(len(src)), (label,))
+
+
+def to_networkx(graph: GraphArrays) -> "nt.MultiDiGraph":
+    """
+    Builds networkx graph, should be used only for graphs of moderate size
+    """
+    import networkx as nt
+
+    result = nt.MultiDiGraph()
+    result.add_nodes_from(range(graph.nodes_count))
+    result.add_edges_from(
+        (int(u), int(v), {"label": graph.labels[l]})
+        for u, v, l in zip(graph.src, graph.dst, graph.label)
+    )
+    return result
+
+
+def write_compact(path: str, graph: GraphArrays) -> None:
+    """
+    Writes graph in the compact format: magic line, JSON header line, then src, dst and label arrays.
+    Arrays are aligned, so they can be memory-mapped by read_compact
+    """
+    header = {
+        "nodes": int(graph.nodes_count),
+        "edges": int(len(graph.src)),
+        "labels": list(graph.labels),
+        "vertex_dtype": graph.src.dtype.newbyteorder("<").str,
+        "label_dtype": graph.label.dtype.newbyteorder("<").str,
+    }
+    with open(path, "wb") as file:
+        file.write(COMPACT_MAGIC)
+        file.write(json.dumps(header).encode("utf-8") + b"\n")
+        file.write(b"\0" * (-file.tell() % _ALIGN))
+        for array, dtype in [
+            (graph.src, header["vertex_dtype"]),
+            (graph.dst, header["vertex_dtype"]),
+            (graph.label, header["label_dtype"]),
+        ]:
+            file.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+            file.write(b"\0" * (-file.tell() % _ALIGN))
+
+
+def read_compact(path: str) -> GraphArrays:
+    """
+    Reads graph in the compact format, arrays are memory-mapped and not loaded into memory
+    """
+    with open(path, "rb") as file:
+        if file.readline() != COMPACT_MAGIC:
+            raise RuntimeError(f'"{path}" is not a compact graph file')
+        header = json.loads(file.readline())
+        offset = file.tell() + (-file.tell() % _ALIGN)
+
+    edges = header["edges"]
+    arrays = []
+    for dtype in [
+        header["vertex_dtype"],
+        header["vertex_dtype"],
+        header["label_dtype"],
+    ]:
+        dtype = np.dtype(dtype)
+        if edges:
+            arrays.append(
+                np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(edges,))
+            )
+        else:
+            arrays.append(np.empty(0, dtype=dtype))
+        offset += edges * dtype.itemsize
+        offset += -offset % _ALIGN
+
+    return GraphArrays(header["nodes"], *arrays, tuple(header["labels"]))
+
+
+def iter_chunks(
+    graph: GraphArrays, chunk_size: int = 1 << 20
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Yields (src, dst, label) slices of at most chunk_size edges
+    """
+    for start in range(0, len(graph.src), chunk_size):
+        end = start + chunk_size
+        yield graph.src[start:end], graph.dst[start:end], graph.label[start:end]
+
+
+def _dot_id(name: str) -> str:
+    if _DOT_ID.fullmatch(name) and name.lower() not in _DOT_KEYWORDS:
+        return name
+    return '"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def write_dot(path: str, graph: GraphArrays, chunk_size: int = 1 << 16) -> None:
+    """
+    Writes graph in DOT format chunk by chunk
+    """
+    labels = [_dot_id(label) for label in graph.labels]
+    with open(path, "w") as file:
+        file.write("digraph {\n")
+        for start in range(0, graph.nodes_count, chunk_size):
+            end = min(start + chunk_size, graph.nodes_count)
+            file.write("".join(f"{v};\n" for v in range(start, end)))
+        for src, dst, label in iter_chunks(graph, chunk_size):
+            file.write(
+                "".join(
+                    f"{u} -> {v} [label={labels[l]}];\n"
+                    for u, v, l in zip(src.tolist(), dst.tolist(), label.tolist())
+                )
+            )
+        file.write("}\n")
+
+
+def write_csv(path: str, graph: GraphArrays, chunk_size: int = 1 << 16) -> None:
+    """
+    Writes graph in CFPQ dataset CSV format ("from to label" lines) chunk by chunk.
+    Isolated vertices are lost in this format
+    """
+    labels = graph.labels
+    with open(path, "w") as file:
+        for src, dst, label in iter_chunks(graph, chunk_size):
+            file.write(
+                "".join(
+                    f"{u} {v} {labels[l]}\n"
+                    for u, v, l in zip(src.tolist(), dst.tolist(), label.tolist())
+                )
+            )
@@ -1,7 +1,5 @@
 import sys
-from antlr4 import *
-from project.language.language import DOTBuilder
-import pydot
+from project.language.dot import DOTBuilder
 
 
 def main(argv):
@@ -0,0 +1,413 @@
+import hashlib
+import sys
+import types
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
+from functools import partial
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from antlr4 import ParserRuleContext
+
+# Pattern of the bind: name of the variable or list of the nested patterns
+Pattern = Union[str, list]
+
+# kind: "bind" or "print", pattern: Pattern of the bind or None for print,
+# uses: names of the free variables of the expression,
+# evaluate: function that takes the dictionary of the used variables and returns the value,
+# text: (optional) source of the statement, statements without text aren't memoized
+Statement = namedtuple(
+    "Statement", ["kind", "pattern", "uses", "evaluate", "text"], defaults=[None]
+)
+
+
+def get_pattern_names(pattern: Pattern) -> List[str]:
+    """
+    Names of the variables of the pattern in the order of appearance
+    """
+    if isinstance(pattern, str):
+        return [pattern]
+    return [name for item in pattern for name in get_pattern_names(item)]
+
+
+def match_pattern(pattern: Pattern, value: Any) -> Dict[str, Any]:
+    """
+    Binds the variables of the pattern to the value, lists destructure sequences
+    :raises ValueError: if the value doesn't match the pattern
+    """
+    if isinstance(pattern, str):
+        return {pattern: value}
+    items = list(value)
+    if len(items) != len(pattern):
+        raise ValueError(
+            f"Cannot bind {len(items)} values to pattern of {len(pattern)} elements"
+        )
+    env = {}
+    for item_pattern, item in zip(pattern, items):
+        env.update(match_pattern(item_pattern, item))
+    return env
+
+
+def _rule_name(node) -> Optional[str]:
+    if not isinstance(node, ParserRuleContext):
+        return None
+    return node.parser.ruleNames[node.getRuleIndex()]
+
+
+def _rule_children(node: ParserRuleContext, name: str) -> List[ParserRuleContext]:
+    return [child for child in node.getChildren() if _rule_name(child) == name]
+
+
+def get_pattern(ctx: ParserRuleContext) -> Pattern:
+    """
+    Pattern of the pattern rule of the parse tree
+    """
+    items = _rule_children(ctx, "pattern")
+    if not items:
+        return _rule_children(ctx, "var")[0].getText()
+    return [get_pattern(item) for item in items]
+
+
+def get_free_variables(ctx: ParserRuleContext) -> Set[str]:
+    """
+    Names of the variables used in the expression, except the ones bound by its lambdas
+    """
+    name = _rule_name(ctx)
+    if name == "var":
+        return {ctx.getText()}
+    if name == "lambda":
+        bound = set(get_pattern_names(get_pattern(_rule_children(ctx, "pattern")[0])))
+        return get_free_variables(_rule_children(ctx, "expr")[0]) - bound
+    names = set()
+    for child in ctx.getChildren():
+        if _rule_name(child) is not None:
+            names |= get_free_variables(child)
+    return names
+
+
+def get_statements(
+    program: ParserRuleContext,
+    evaluate: Callable[[ParserRuleContext, Dict[str, Any]], Any],
+) -> List[Statement]:
+    """
+    Statements of the parsed program
+    :param program: parse tree of the program rule
+    :param evaluate: interpreter of the expressions, called with the expr context
+                     and the dictionary of its free variables
+    """
+    statements = []
+    for stmt in _rule_children(program, "stmt"):
+        node = next(c for c in stmt.getChildren() if _rule_name(c) is not None)
+        expr = _rule_children(node, "expr")[0]
+        pattern = None
+        if _rule_name(node) == "bind":
+            pattern = get_pattern(_rule_children(node, "pattern")[0])
+        statements.append(
+            Statement(
+                _rule_name(node),
+                pattern,
+                sorted(get_free_variables(expr)),
+                partial(evaluate, expr),
+                stmt.getText(),
+            )
+        )
+    return statements
+
+
+def get_dependencies(statements: List[Statement]) -> List[Dict[str, int]]:
+    """
+    Dataflow graph of the program: every used variable is mapped to the index
+    of the last previous statement that binds it
+    :raises NameError: if a statement uses variable that isn't bound before it
+    """
+    producers: Dict[str, int] = {}
+    dependencies = []
+    for i, statement in enumerate(statements):
+        deps = {}
+        for name in statement.uses:
+            if name not in producers:
+                raise NameError(
+                    f"Variable {name} is used in statement {i} before binding"
+                )
+            deps[name] = producers[name]
+        dependencies.append(deps)
+        if statement.kind == "bind":
+            for name in get_pattern_names(statement.pattern):
+                producers[name] = i
+    return dependencies
+
+
+def get_statement_keys(
+    statements: List[Statement], dependencies: List[Dict[str, int]]
+) -> List[Optional[str]]:
+    """
+    Memoization keys: hash of the statement text and the keys of the statements binding its variables,
+    so the key changes whenever the statement or anything it depends on is edited
+    :return: key of every statement, None for the statements without text and their dependents
+    """
+    keys: List[Optional[str]] = []
+    for statement, deps in zip(statements, dependencies):
+        inputs = [(name, keys[j]) for name, j in sorted(deps.items())]
+        if statement.text is None or any(key is None for _, key in inputs):
+            keys.append(None)
+            continue
+        source = "\n".join([statement.text] + [f"{name}={key}" for name, key in inputs])
+        keys.append(hashlib.sha256(source.encode("utf-8")).hexdigest())
+    return keys
+
+
+# Larger containers are weighed by this number of their first items
+_SIZE_SAMPLE = 16
+# Deeper objects are weighed without their contents
+_SIZE_DEPTH = 16
+# Objects that belong to the program rather than to the value
+_NOT_WEIGHED = (
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    type,
+)
+
+
+def get_size(value: Any) -> int:
+    """
+    Estimated size of the value in bytes: numpy arrays and sparse matrices are weighed
+    by their buffers, containers and attributes of objects are traversed,
+    but containers larger than _SIZE_SAMPLE are extrapolated from their first items,
+    so the time doesn't depend on the size of the value.
+    Modules, functions and classes aren't weighed, shared objects are weighed once
+    """
+    seen: Set[int] = set()
+    numpy = sys.modules.get("numpy")
+    sparse = sys.modules.get("scipy.sparse")
+
+    def sample(items: Iterable, count: int, depth: int) -> int:
+        if count <= _SIZE_SAMPLE:
+            return sum(weigh(item, depth) for item in items)
+        sampled = sum(weigh(item, depth) for item in islice(items, _SIZE_SAMPLE))
+        return sampled * count // _SIZE_SAMPLE
+
+    def weigh(item: Any, depth: int) -> int:
+        if id(item) in seen or isinstance(item, _NOT_WEIGHED):
+            return 0
+        seen.add(id(item))
+        size = sys.getsizeof(item)
+        if numpy is not None and isinstance(item, numpy.ndarray):
+            return max(size, item.nbytes)
+        if sparse is not None and sparse.issparse(item):
+            buffers = ["data", "indices", "indptr", "row", "col", "offsets"]
+            return size + sum(
+                getattr(item, name).nbytes for name in buffers if hasattr(item, name)
+            )
+        if depth == _SIZE_DEPTH or isinstance(
+            item, (str, bytes, bytearray, int, float, complex)
+        ):
+            return size
+        if isinstance(item, dict):
+            size += sample(chain.from_iterable(item.items()), 2 * len(item), depth + 1)
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            size += sample(item, len(item), depth + 1)
+        if hasattr(item, "__dict__"):
+            size += weigh(vars(item), depth + 1)
+        return size
+
+    return weigh(value, 0)
+
+
+class StatementCache:
+    """
+    LRU cache of the statement results for the incremental re-evaluation of edited programs
+
+    Entries are keyed by get_statement_keys, so unchanged statements with unchanged inputs
+    reuse their values, and only the edited statements and their dependents are evaluated again.
+    Cached values are shared by the runs, so the evaluators must not mutate the values they use
+    unless copy is given.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1 << 28,
+        weigh: Optional[Callable[[Any], int]] = None,
+        copy: Optional[Callable[[Any], Any]] = None,
+    ):
+        """
+        :param max_size: maximal total weight of the entries, the least recently used entries are evicted
+        :param weigh: (optional) weight of the value, get_size in bytes by default
+        :param copy: (optional) applied to the value on every hit, e.g. copy.deepcopy
+                     for the evaluators that mutate values
+        """
+        self.max_size = max_size
+        self.weigh = get_size if weigh is None else weigh
+        self.copy = copy
+        self.hits = 0
+        self.misses = 0
+        self.weight = 0
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        :return: (True, value) on hit, (False, None) on miss
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        if self.copy is not None:
+            return True, self.copy(entry[0])
+        return True, entry[0]
+
+    def put(self, key: str, value: Any) -> None:
+        weight = self.weigh(value)
+        if key in self._entries:
+            self.weight -= self._entries.pop(key)[1]
+        self._entries[key] = (value, weight)
+        self.weight += weight
+        while self.weight > self.max_size and self._entries:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.weight -= evicted
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.weight = 0
+
+
+def _run_statement(statement: Statement, env: Dict[str, Any]) -> Any:
+    value = statement.evaluate(env)
+    if statement.kind == "bind":
+        return match_pattern(statement.pattern, value)
+    return value
+
+
+def run_statements(
+    statements: Iterable[Statement],
+    output: Optional[Callable[[Any], None]] = None,
+    executor: Optional[Executor] = None,
+    max_workers: Optional[int] = None,
+    cache: Optional[StatementCache] = None,
+) -> List[Any]:
+    """
+    Runs the program concurrently: a statement is started as soon as the statements
+    binding its variables are finished, so the wall time is the critical path of the dataflow graph.
+    Printed values are passed to output in the program order as soon as all previous prints are done.
+    If a statement fails, the statements before it are finished, their prints are output,
+    and the exception of the first failed statement is raised, as in the sequential execution
+    :param output: (optional) called with every printed value
+    :param executor: (optional) executor of the statements, ThreadPoolExecutor by default,
+                     the evaluate functions and the values must be picklable for process pools
+    :param max_workers: (optional) number of threads of the default executor
+    :param cache: (optional) StatementCache, statements found in it aren't evaluated
+                  and the results of the evaluated ones are put into it
+    :return: printed values in the program order
+    """
+    statements = list(statements)
+    dependencies = get_dependencies(statements)
+    keys = get_statement_keys(statements, dependencies)
+    dependents: List[List[int]] = [[] for _ in statements]
+    waiting = []
+    for i, deps in enumerate(dependencies):
+        producers = set(deps.values())
+        for j in producers:
+            dependents[j].append(i)
+        waiting.append(len(producers))
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers)
+
+    results: Dict[int, Any] = {}
+    printed: List[Any] = []
+    failed: Optional[int] = None
+    error: Optional[BaseException] = None
+    running = {}
+    ready = deque(i for i, count in enumerate(waiting) if count == 0)
+    next_print = 0
+
+    def start(i: int) -> None:
+        if failed is not None and i > failed:
+            return
+        if cache is not None and keys[i] is not None:
+            found, value = cache.get(keys[i])
+            if found:
+                finish(i, value)
+                return
+        env = {name: results[j][name] for name, j in dependencies[i].items()}
+        running[executor.submit(_run_statement, statements[i], env)] = i
+
+    def finish(i: int, value: Any) -> None:
+        results[i] = value
+        for j in dependents[i]:
+            waiting[j] -= 1
+            if waiting[j] == 0 and (failed is None or j < failed):
+                ready.append(j)
+
+    def flush() -> None:
+        nonlocal next_print
+        limit = len(statements) if failed is None else failed
+        while next_print < limit and next_print in results:
+            if statements[next_print].kind == "print":
+                printed.append(results[next_print])
+                if output is not None:
+                    output(results[next_print])
+            next_print += 1
+
+    try:
+        while ready or running:
+            while ready:
+                start(ready.popleft())
+            flush()
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                try:
+                    value = future.result()
+                except Exception as e:
+                    if failed is None or i < failed:
+                        failed, error = i, e
+                    continue
+                if cache is not None and keys[i] is not None:
+                    cache.put(keys[i], value)
+                finish(i, value)
+            flush()
+    finally:
+        # statements after the failed one aren't needed, cancel_futures of shutdown requires Python 3.9
+        for future in running:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=True)
+
+    if error is not None:
+        raise error
+    return printed
+
+
+def run_program(
+    prog: str,
+    evaluate: Callable[[ParserRuleContext, Dict[str, Any]], Any],
+    output: Optional[Callable[[Any], None]] = None,
+    max_workers: Optional[int] = None,
+    cache: Optional[StatementCache] = None,
+) -> List[Any]:
+    """
+    Parses the program and runs it with run_statements on a thread pool,
+    parse trees can't be sent to other processes.
+    Running edited versions of the program with the same cache re-evaluates
+    only the changed statements and the statements that depend on them
+    :param evaluate: interpreter of the expressions, see get_statements
+    :param cache: (optional) StatementCache shared by the runs of the program versions
+    :return: printed values in the program order
+    """
+    from project.language.language import get_parser
+
+    statements = get_statements(get_parser(prog).program(), evaluate)
+    return run_statements(statements, output, max_workers=max_workers, cache=cache)
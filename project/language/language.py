@@ -1,12 +1,20 @@
-from typing import List
-from antlr4 import *
-from project.language.antlr_out.LanguageParser import LanguageParser
-from project.language.antlr_out.LanguageLexer import LanguageLexer
-from project.language.antlr_out.LanguageListener import LanguageListener
-import pydot
+from typing import TYPE_CHECKING
 
+from antlr4 import CommonTokenStream, InputStream
+
+if TYPE_CHECKING:
+    from project.language.antlr_out.LanguageParser import LanguageParser
+
+__all__ = ["get_parser", "does_belong_to_language", "DOTBuilder"]
+
+
+def get_parser(prog: str) -> "LanguageParser":
+    """
+    Parser of the program, the generated lexer and parser are imported on the first call
+    """
+    from project.language.antlr_out.LanguageLexer import LanguageLexer
+    from project.language.antlr_out.LanguageParser import LanguageParser
 
-def get_parser(prog: str) -> LanguageParser:
     input_stream = InputStream(prog)
     lexer = LanguageLexer(input_stream)
     stream = CommonTokenStream(lexer)
@@ -20,61 +28,10 @@ def does_belong_to_language(prog: str):
     return parser.getNumberOfSyntaxErrors() == 0
 
 
-class DOTBuilder(LanguageListener):
-    def __init__(self):
-        self._dot = pydot.Dot("Program")
-        self._stack: List[pydot.Node] = []
-        self._last_id = 0
-
-    def _id(self):
-        self._last_id += 1
-        return self._last_id
-
-    def _link_to_parent(self, node: pydot.Node):
-        if len(self._stack) > 0:
-            parent = self._stack[-1]
-            edge = pydot.Edge(parent.get_name(), node.get_name())
-            self._dot.add_edge(edge)
-
-    def _new_node(self, name: str, type: str = "terminal") -> pydot.Node:
-        if name == ",":
-            name = f'"{name}"'
-        elif name == "\\":
-            name += name
-
-        if type == "error":
-            new_node = pydot.Node(self._id(), label=name, color="red")
-        elif type == "terminal":
-            new_node = pydot.Node(self._id(), label=name)
-        elif type == "rule":
-            new_node = pydot.Node(self._id(), label=name, color="darkgray")
-
-        self._dot.add_node(new_node)
-        self._link_to_parent(new_node)
-        return new_node
-
-    def visitTerminal(self, node: TerminalNode):
-        super().visitTerminal(node)
-        self._new_node(str(node))
-
-    def visitErrorNode(self, node: ErrorNode):
-        super().visitErrorNode(node)
-        self._new_node(f'ERROR: "{node!s}"', "error")
-
-    def enterEveryRule(self, ctx: ParserRuleContext):
-        super().enterEveryRule(ctx)
-        ruleName = LanguageParser.ruleNames[ctx.getRuleIndex()]
-        node = self._new_node(f"rule: {ruleName}", "rule")
-        self._stack.append(node)
-
-    def exitEveryRule(self, ctx: ParserRuleContext):
-        super().exitEveryRule(ctx)
-        self._stack.pop()
+def __getattr__(name: str):
+    # DOTBuilder needs pydot and the generated listener, so it is imported on the first use
+    if name == "DOTBuilder":
+        from project.language.dot import DOTBuilder
 
-    @staticmethod
-    def build(prog: str) -> pydot.Dot:
-        parser = get_parser(prog)
-        dotBuilder = DOTBuilder()
-        walker = ParseTreeWalker()
-        walker.walk(dotBuilder, parser.program())
-        return dotBuilder._dot
+        return DOTBuilder
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,186 @@
+import weakref
+from collections import OrderedDict, deque
+from typing import (
+    AbstractSet,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import networkx as nt
+from pyformlang.cfg import CFG
+from pyformlang.finite_automaton import FiniteAutomaton
+
+from project.regex import CompiledRegex
+from project.rfa import RFA
+from project.wcnf import cfg_to_wcnf
+
+# graph -> (numbers of vertices and edges at the moment of projecting,
+#           fingerprint of the graph or None if it wasn't verified, LRU of alphabet -> projection)
+_projections = weakref.WeakKeyDictionary()
+
+# Number of alphabets with cached projections per graph
+MAX_PROJECTIONS = 8
+
+
+def get_fingerprint(graph: nt.MultiDiGraph) -> Tuple[int, int, int]:
+    """
+    Fingerprint of the vertices and the labeled edges of the graph,
+    any addition, removal or relabelling changes it. Takes time of the whole graph
+    """
+    return (
+        graph.number_of_nodes(),
+        graph.number_of_edges(),
+        hash((tuple(graph.nodes), tuple(graph.edges(data="label")))),
+    )
+
+
+def invalidate_projections(graph: nt.MultiDiGraph) -> None:
+    """
+    Drops cached projections of the graph, must be called after the changes
+    that keep the numbers of vertices and edges, e.g. relabelling of the edges
+    """
+    _projections.pop(graph, None)
+
+
+def get_alphabet(
+    language: Union[CFG, FiniteAutomaton, CompiledRegex, RFA]
+) -> FrozenSet[str]:
+    """
+    Labels that can occur in the words of the language: terminals of the WCNF,
+    symbols of the automaton or symbols of the RFA boxes that aren't nonterminals
+    """
+    if isinstance(language, CompiledRegex):
+        return frozenset(label for _, label in language.delta)
+    if isinstance(language, CFG):
+        return frozenset(term.value for term in cfg_to_wcnf(language).terminals)
+    if isinstance(language, RFA):
+        variables = {box.var.value for box in language.boxes}
+        return frozenset(
+            symbol.value
+            for box in language.boxes
+            for symbol in box.dfa.symbols
+            if symbol.value not in variables
+        )
+    return frozenset(symbol.value for symbol in language.symbols)
+
+
+def get_projection(
+    graph: nt.MultiDiGraph, alphabet: AbstractSet[str], verify: bool = False
+) -> nt.MultiDiGraph:
+    """
+    Graph with all vertices of the original graph and only edges with the labels of the alphabet.
+    Projections of the last MAX_PROJECTIONS alphabets are cached per graph,
+    the cache of the graph is dropped when its number of vertices or edges changes
+    or by invalidate_projections, so a cache hit doesn't touch the graph
+    :param verify: also compare the fingerprint of the graph, which detects the changes
+                   that weren't invalidated at the cost of reading the whole graph
+    """
+    alphabet = frozenset(alphabet)
+    size = (graph.number_of_nodes(), graph.number_of_edges())
+    fingerprint = get_fingerprint(graph) if verify else None
+    cached = _projections.get(graph)
+    if cached is None or cached[0] != size or (verify and cached[1] != fingerprint):
+        cached = (size, fingerprint, OrderedDict())
+        _projections[graph] = cached
+    projections = cached[2]
+
+    projection = projections.get(alphabet)
+    if projection is not None:
+        projections.move_to_end(alphabet)
+    else:
+        projection = nt.MultiDiGraph()
+        projection.add_nodes_from(graph.nodes(data=True))
+        projection.add_edges_from(
+            (u, v, key, data)
+            for u, v, key, data in graph.edges(keys=True, data=True)
+            if data.get("label") in alphabet
+        )
+        projections[alphabet] = projection
+        if len(projections) > MAX_PROJECTIONS:
+            projections.popitem(last=False)
+    return projection
+
+
+def _reachable(
+    graph: nt.MultiDiGraph, sources: Iterable[Hashable], reverse: bool = False
+) -> Set[Hashable]:
+    adj = graph.pred if reverse else graph.succ
+    visited = set(sources)
+    queue = deque(visited)
+    while queue:
+        for w in adj[queue.popleft()]:
+            if w not in visited:
+                visited.add(w)
+                queue.append(w)
+    return visited
+
+
+def project_graph(
+    graph: nt.MultiDiGraph,
+    alphabet: AbstractSet[str],
+    start_vertices: Optional[Iterable[Hashable]] = None,
+    final_vertices: Optional[Iterable[Hashable]] = None,
+    prune: Optional[str] = None,
+    verify: bool = False,
+) -> nt.MultiDiGraph:
+    """
+    Projects the graph to the labels of the alphabet and removes edges
+    that can't be on a path from the start vertices to the final vertices.
+    All vertices are kept, so the vertices of the result are the same as of the original graph
+    :param graph: the graph
+    :param alphabet: labels to keep
+    :param (optional) start_vertices: start vertices of the query, all vertices by default
+    :param (optional) final_vertices: final vertices of the query, all vertices by default
+    :param (optional) prune: None to keep all edges of the alphabet,
+                             "degree" to drop edges of vertices that can't be inner vertices of a path
+                             (vertices without incoming or without outgoing edges that aren't start or final),
+                             "reachability" to keep only edges between vertices
+                             that are reachable from the start vertices and from which the final vertices are reachable
+    :param verify: compare the fingerprint of the graph with the cached one, see get_projection
+    :return: projected graph, shouldn't be modified since it may be cached
+    """
+    projection = get_projection(graph, alphabet, verify)
+    if prune is None:
+        return projection
+
+    if start_vertices is not None:
+        start_vertices = set(start_vertices)
+    if final_vertices is not None:
+        final_vertices = set(final_vertices)
+
+    if prune == "degree":
+        ends = (start_vertices or set()) | (final_vertices or set())
+        useful = {
+            v
+            for v in projection.nodes
+            if v in ends
+            or (
+                (start_vertices is None or projection.in_degree(v) > 0)
+                and (final_vertices is None or projection.out_degree(v) > 0)
+            )
+        }
+    elif prune == "reachability":
+        useful = set(projection.nodes)
+        if start_vertices is not None:
+            useful &= _reachable(projection, start_vertices)
+        if final_vertices is not None:
+            useful &= _reachable(projection, final_vertices, reverse=True)
+    else:
+        raise ValueError(f"Unknown pruning: {prune}")
+
+    if len(useful) == projection.number_of_nodes():
+        return projection
+
+    result = nt.MultiDiGraph()
+    result.add_nodes_from(projection.nodes(data=True))
+    result.add_edges_from(
+        (u, v, key, data)
+        for u, v, key, data in projection.edges(keys=True, data=True)
+        if u in useful and v in useful
+    )
+    return result
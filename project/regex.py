@@ -0,0 +1,512 @@
+import json
+import os
+import threading
+from collections import OrderedDict, deque, namedtuple
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+from pyformlang.finite_automaton import DeterministicFiniteAutomaton, State, Symbol
+from pyformlang.regular_expression import Regex
+from pyformlang.regular_expression import regex_objects
+
+# Automaton as arrays: states are 0..states_count-1, delta maps (state, label) to state.
+# Same tuple as returned by index_dfa
+CompiledRegex = namedtuple(
+    "CompiledRegex", ["states_count", "delta", "start", "finals"]
+)
+
+CACHE_VERSION = 1
+
+# Parsed regex, n-ary nodes are flattened:
+# ("sym", label), ("eps",), ("empty",), ("alt", children), ("cat", children), ("star", child)
+Node = tuple
+
+_SPECIAL = set(".|+*$()")
+_ESCAPED = _SPECIAL | set(" \\{}")
+
+
+class _ParseError(Exception):
+    pass
+
+
+def _tokenize(regex: str) -> List[str]:
+    tokens = []
+    current = []
+    for c in regex:
+        if c == " " or c in _SPECIAL:
+            if current:
+                tokens.append("".join(current))
+                current = []
+            if c != " ":
+                tokens.append(c)
+        else:
+            current.append(c)
+    if current:
+        tokens.append("".join(current))
+    return tokens
+
+
+def _make(kind: str, children: List[Node]) -> Node:
+    if len(children) == 1:
+        return children[0]
+    flat = []
+    for child in children:
+        if child[0] == kind:
+            flat.extend(child[1])
+        else:
+            flat.append(child)
+    return kind, tuple(flat)
+
+
+class _Parser:
+    """
+    Recursive descent parser of pyformlang regex syntax:
+    union by "|" or "+", concatenation by "." or juxtaposition, "*", parentheses,
+    "$" and "epsilon" for the empty word
+    """
+
+    def __init__(self, tokens: List[str]):
+        self._tokens = tokens
+        self._pos = 0
+
+    def _peek(self) -> Optional[str]:
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else None
+
+    def parse(self) -> Node:
+        if not self._tokens:
+            return ("empty",)
+        node = self._union()
+        if self._peek() is not None:
+            raise _ParseError()
+        return node
+
+    def _union(self) -> Node:
+        children = [self._concat()]
+        while self._peek() in ("|", "+"):
+            self._pos += 1
+            children.append(self._concat())
+        return _make("alt", children)
+
+    def _concat(self) -> Node:
+        children = [self._star()]
+        while True:
+            token = self._peek()
+            if token == ".":
+                self._pos += 1
+            elif token is None or token in ("|", "+", ")"):
+                break
+            children.append(self._star())
+        return _make("cat", children)
+
+    def _star(self) -> Node:
+        node = self._atom()
+        while self._peek() == "*":
+            self._pos += 1
+            if node[0] != "star":
+                node = ("star", node)
+        return node
+
+    def _atom(self) -> Node:
+        token = self._peek()
+        if token is None or token in ("|", "+", ".", "*", ")"):
+            raise _ParseError()
+        self._pos += 1
+        if token == "(":
+            node = self._union()
+            if self._peek() != ")":
+                raise _ParseError()
+            self._pos += 1
+            return node
+        if token in ("$", "epsilon"):
+            return ("eps",)
+        return "sym", token
+
+
+def _from_pyformlang(regex: Regex) -> Node:
+    """
+    Converts pyformlang regex tree, chains of the same operator are flattened without recursion
+    """
+    head = regex.head
+    # Epsilon and Empty are subclasses of Symbol
+    if isinstance(head, regex_objects.Epsilon):
+        return ("eps",)
+    if isinstance(head, regex_objects.Empty):
+        return ("empty",)
+    if isinstance(head, regex_objects.Symbol):
+        return "sym", head.value
+    if isinstance(head, regex_objects.KleeneStar):
+        child = _from_pyformlang(regex.sons[0])
+        return child if child[0] == "star" else ("star", child)
+    if isinstance(head, (regex_objects.Union, regex_objects.Concatenation)):
+        kind = "alt" if isinstance(head, regex_objects.Union) else "cat"
+        children = []
+        node = regex
+        while type(node.head) == type(head):
+            children.append(_from_pyformlang(node.sons[0]))
+            node = node.sons[1]
+        children.append(_from_pyformlang(node))
+        return _make(kind, children)
+    return ("empty",)
+
+
+def parse_regex(regex: Union[str, Regex]) -> Node:
+    """
+    Parses regex text in pyformlang syntax or converts pyformlang Regex.
+    Escaped symbols and malformed text are left to pyformlang
+    """
+    if isinstance(regex, Regex):
+        return _from_pyformlang(regex)
+    if "\\" not in regex:
+        try:
+            return _Parser(_tokenize(regex)).parse()
+        except _ParseError:
+            pass
+    return _from_pyformlang(Regex(regex))
+
+
+def get_regex_key(node: Node) -> str:
+    """
+    Text that is the same for the same parsed regexes, used as a key of the cache
+    """
+    kind = node[0]
+    if kind == "sym":
+        return "".join("\\" + c if c in _ESCAPED else c for c in node[1])
+    if kind == "eps":
+        return "$"
+    if kind == "empty":
+        return "{}"
+    if kind == "star":
+        return "(" + get_regex_key(node[1]) + ")*"
+    separator = "|" if kind == "alt" else "."
+    return "(" + separator.join(get_regex_key(child) for child in node[1]) + ")"
+
+
+def _glushkov(node: Node) -> Tuple[List[str], List[List[FrozenSet[int]]], Set[int]]:
+    """
+    Position automaton without epsilon transitions: state 0 is initial,
+    state p > 0 is the p-th symbol occurrence and is entered only by its label.
+    Follow set of a position is kept as a list of shared first sets of the subexpressions,
+    so the automaton is built in linear time even for (a1 | ... | an)* with n^2 transitions
+    :return: (labels of the states, follow sets, final states)
+    """
+    labels = [""]
+    follow: List[List[FrozenSet[int]]] = [[]]
+    empty = frozenset()
+
+    def visit(node: Node) -> Tuple[bool, FrozenSet[int], FrozenSet[int]]:
+        kind = node[0]
+        if kind == "sym":
+            labels.append(node[1])
+            follow.append([])
+            p = frozenset([len(labels) - 1])
+            return False, p, p
+        if kind == "eps":
+            return True, empty, empty
+        if kind == "empty":
+            return False, empty, empty
+        if kind == "star":
+            _, first, last = visit(node[1])
+            for p in last:
+                follow[p].append(first)
+            return True, first, last
+        children = [visit(child) for child in node[1]]
+        if kind == "alt":
+            return (
+                any(nullable for nullable, _, _ in children),
+                empty.union(*(first for _, first, _ in children)),
+                empty.union(*(last for _, _, last in children)),
+            )
+        nullable, first, last = True, empty, empty
+        for child_nullable, child_first, child_last in children:
+            if child_first:
+                for p in last:
+                    follow[p].append(child_first)
+            if nullable:
+                first = first | child_first
+            last = last | child_last if child_nullable else child_last
+            nullable = nullable and child_nullable
+        return nullable, first, last
+
+    nullable, first, last = visit(node)
+    follow[0].append(first)
+    if nullable:
+        last = last | {0}
+    return labels, follow, set(last)
+
+
+def _determinize(
+    labels: List[str], follow: List[List[FrozenSet[int]]], finals: Set[int]
+) -> CompiledRegex:
+    """
+    Subset construction over classes of positions: positions with the same follow sets
+    and finality have the same future, so they are merged before the construction
+    """
+    class_idx: Dict[tuple, int] = {}
+    position_class = []
+    class_follow: List[List[FrozenSet[int]]] = []
+    class_final = []
+    for p in range(len(labels)):
+        key = (p == 0, p in finals, frozenset(map(id, follow[p])))
+        c = class_idx.get(key)
+        if c is None:
+            c = class_idx[key] = len(class_follow)
+            class_follow.append(list({id(f): f for f in follow[p]}.values()))
+            class_final.append(p in finals)
+        position_class.append(c)
+
+    subsets = [frozenset([position_class[0]])]
+    subset_idx = {subsets[0]: 0}
+    delta: Dict[Tuple[int, str], int] = {}
+    i = 0
+    while i < len(subsets):
+        moves: Dict[str, Set[int]] = {}
+        seen = set()
+        for c in subsets[i]:
+            for first in class_follow[c]:
+                if id(first) in seen:
+                    continue
+                seen.add(id(first))
+                for q in first:
+                    moves.setdefault(labels[q], set()).add(position_class[q])
+        for label, targets in moves.items():
+            targets = frozenset(targets)
+            j = subset_idx.get(targets)
+            if j is None:
+                j = subset_idx[targets] = len(subsets)
+                subsets.append(targets)
+            delta[(i, label)] = j
+        i += 1
+    return CompiledRegex(
+        len(subsets),
+        delta,
+        0,
+        [i for i, subset in enumerate(subsets) if any(class_final[c] for c in subset)],
+    )
+
+
+def minimize(automaton: CompiledRegex) -> CompiledRegex:
+    """
+    Minimizes DFA: removes states from which no final state is reachable
+    and merges equivalent states by partition refinement.
+    States of the result are numbered in BFS order from the start state
+    """
+    k, delta, start, finals = automaton
+    if start is None:
+        return CompiledRegex(1, {}, None, [])
+
+    reverse: List[List[int]] = [[] for _ in range(k)]
+    for (q, _), q_to in delta.items():
+        reverse[q_to].append(q)
+    live = set(finals)
+    queue = deque(finals)
+    while queue:
+        for q in reverse[queue.popleft()]:
+            if q not in live:
+                live.add(q)
+                queue.append(q)
+    if start not in live:
+        return CompiledRegex(1, {}, 0, [])
+
+    out: Dict[int, List[Tuple[str, int]]] = {q: [] for q in live}
+    for (q, label), q_to in delta.items():
+        if q in live and q_to in live:
+            out[q].append((label, q_to))
+
+    final_set = set(finals)
+    cls = {q: int(q in final_set) for q in live}
+    classes_count = len(set(cls.values()))
+    while True:
+        signatures: Dict[tuple, int] = {}
+        new_cls = {}
+        for q in live:
+            signature = (
+                cls[q],
+                tuple(sorted((label, cls[q_to]) for label, q_to in out[q])),
+            )
+            new_cls[q] = signatures.setdefault(signature, len(signatures))
+        cls = new_cls
+        if len(signatures) == classes_count:
+            break
+        classes_count = len(signatures)
+
+    # Renumber classes in BFS order
+    idx = {cls[start]: 0}
+    representative = [start]
+    result_delta: Dict[Tuple[int, str], int] = {}
+    i = 0
+    while i < len(representative):
+        for label, q_to in sorted(out[representative[i]]):
+            j = idx.get(cls[q_to])
+            if j is None:
+                j = idx[cls[q_to]] = len(representative)
+                representative.append(q_to)
+            result_delta[(i, label)] = j
+        i += 1
+    result_finals = sorted(idx[cls[q]] for q in final_set if q in live)
+    return CompiledRegex(len(representative), result_delta, 0, result_finals)
+
+
+def compile_node(node: Node) -> CompiledRegex:
+    """
+    Builds minimal DFA of the parsed regex by the Glushkov construction
+    """
+    return minimize(_determinize(*_glushkov(node)))
+
+
+def index_dfa(dfa: DeterministicFiniteAutomaton) -> CompiledRegex:
+    """
+    Numbers states of the DFA
+    :return: (number of states, transitions (state, label) -> state, start state, final states)
+    """
+    state_idx = {state: idx for idx, state in enumerate(dfa.states)}
+
+    delta: Dict[Tuple[int, str], int] = {}
+    for state_from, transition in dfa.to_dict().items():
+        for symbol, state_to in transition.items():
+            delta[(state_idx[state_from], symbol.value)] = state_idx[state_to]
+
+    start = None if dfa.start_state is None else state_idx[dfa.start_state]
+    finals = [state_idx[state] for state in dfa.final_states]
+    return CompiledRegex(max(len(state_idx), 1), delta, start, finals)
+
+
+def to_dfa(automaton: CompiledRegex) -> DeterministicFiniteAutomaton:
+    """
+    Builds pyformlang DFA with states 0..states_count-1
+    """
+    dfa = DeterministicFiniteAutomaton()
+    if automaton.start is not None:
+        dfa.add_start_state(State(automaton.start))
+    for state in automaton.finals:
+        dfa.add_final_state(State(state))
+    dfa.add_transitions(
+        [
+            (State(q), Symbol(label), State(q_to))
+            for (q, label), q_to in automaton.delta.items()
+        ]
+    )
+    return dfa
+
+
+class RegexCache:
+    """
+    LRU cache of the compiled regexes
+
+    Keys are normalized regexes (see get_regex_key), so regexes that differ only
+    in spaces, parentheses or operator spelling share the entry.
+    The cache can be saved into a JSON file and loaded back.
+    """
+
+    def __init__(self, max_size: int = 1024, path: Optional[str] = None):
+        """
+        :param max_size: maximal number of entries, the least recently used entry is evicted
+        :param path: (optional) file to load the entries from and to save them into
+        """
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CompiledRegex]" = OrderedDict()
+        # Regex texts seen before -> their keys, so exact repeats aren't parsed
+        self._keys: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, regex: Union[str, Regex]) -> bool:
+        return get_regex_key(parse_regex(regex)) in self._entries
+
+    def get(self, regex: Union[str, Regex]) -> CompiledRegex:
+        """
+        Returns minimal DFA of the regex, compiles it on miss
+        """
+        node = None
+        key = self._keys.get(regex) if isinstance(regex, str) else None
+        if key is None:
+            node = parse_regex(regex)
+            key = get_regex_key(node)
+            if isinstance(regex, str):
+                if len(self._keys) >= 4 * self.max_size:
+                    self._keys.clear()
+                self._keys[regex] = key
+        with self._lock:
+            automaton = self._entries.get(key)
+            if automaton is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return automaton
+        if node is None:
+            node = parse_regex(regex)
+        automaton = compile_node(node)
+        with self._lock:
+            self.misses += 1
+            self._put(key, automaton)
+        return automaton
+
+    def _put(self, key: str, automaton: CompiledRegex) -> None:
+        self._entries[key] = automaton
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Saves entries into the file, path of the cache is used by default
+        """
+        path = path or self.path
+        with self._lock:
+            entries = [
+                {
+                    "key": key,
+                    "states": automaton.states_count,
+                    "start": automaton.start,
+                    "finals": automaton.finals,
+                    "delta": [
+                        [q, label, q_to] for (q, label), q_to in automaton.delta.items()
+                    ],
+                }
+                for key, automaton in self._entries.items()
+            ]
+        with open(path, "w") as file:
+            json.dump({"version": CACHE_VERSION, "entries": entries}, file)
+
+    def load(self, path: str) -> None:
+        """
+        Adds entries from the file, files of other versions are ignored
+        """
+        with open(path) as file:
+            data = json.load(file)
+        if data.get("version") != CACHE_VERSION:
+            return
+        with self._lock:
+            for entry in data["entries"]:
+                self._put(
+                    entry["key"],
+                    CompiledRegex(
+                        entry["states"],
+                        {(q, label): q_to for q, label, q_to in entry["delta"]},
+                        entry["start"],
+                        entry["finals"],
+                    ),
+                )
+
+
+default_cache = RegexCache()
+
+
+def compile_regex(
+    regex: Union[str, Regex], cache: Optional[RegexCache] = None
+) -> CompiledRegex:
+    """
+    Minimal DFA of the regex as arrays
+    :param regex: regex text in pyformlang syntax or pyformlang Regex
+    :param cache: (optional) cache of the compiled regexes, default_cache by default
+    """
+    return (default_cache if cache is None else cache).get(regex)
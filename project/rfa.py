@@ -1,8 +1,11 @@
-from typing import Optional, Iterable, List
+from typing import TYPE_CHECKING, Callable, Optional, Iterable, List, Dict, Union
 from pyformlang.cfg import Variable
-from pyformlang.finite_automaton import DeterministicFiniteAutomaton
+from pyformlang.finite_automaton import DeterministicFiniteAutomaton, Symbol
 
-from scipy.sparse import csr_matrix
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
+
+Matrices = Dict[Variable, Dict[Symbol, "csr_matrix"]]
 
 
 class RFABox:
@@ -43,9 +46,19 @@ class RFA:
     RFA - Recursive Finite Automaton
     """
 
-    def __init__(self, start_symbol: Variable, boxes: Iterable[RFABox]):
+    def __init__(
+        self,
+        start_symbol: Variable,
+        boxes: Iterable[RFABox],
+        matrices: Union[None, Matrices, Callable[[], Matrices]] = None,
+    ):
+        """
+        :param matrices: (optional) precomputed adjacency matrices of the boxes
+                         or function that builds them on the first get_matrices call
+        """
         self.start_symbol = start_symbol
         self.boxes = boxes
+        self._matrices = matrices
 
     def minimize(self) -> "RFA":
         """
@@ -53,20 +66,28 @@ class RFA:
         """
         return RFA(self.start_symbol, [box.minimize() for box in self.boxes])
 
-    def get_matrices(self):
+    def get_matrices(self) -> Matrices:
         """
-        Returns adjacency matrices for the RFA
+        Returns adjacency matrices for the RFA, matrices are computed only once
         """
-        return {box.var: RFA.__dfa_get_matrix(box.dfa) for box in self.boxes}
+        if callable(self._matrices):
+            self._matrices = self._matrices()
+        if self._matrices is None:
+            self._matrices = {
+                box.var: RFA.__dfa_get_matrix(box.dfa) for box in self.boxes
+            }
+        return self._matrices
 
     @staticmethod
     def __dfa_get_matrix(dfa: DeterministicFiniteAutomaton):
         """
         Returns adjacency matrices for single DFA
         """
+        from scipy.sparse import dok_matrix
+
         matrix = dict()
         dfa_dict = dfa.to_dict()
-        states_len = len(dfa.final_states)
+        states_len = len(dfa.states)
 
         state_idx = {state: idx for idx, state in enumerate(dfa.states)}
 
@@ -79,6 +100,6 @@ class RFA:
                     index_from = state_idx[state_from]
                     index_to = state_idx[state_to]
                     if label not in matrix:
-                        matrix[label] = csr_matrix((states_len, states_len), dtype=bool)
+                        matrix[label] = dok_matrix((states_len, states_len), dtype=bool)
                     matrix[label][index_from, index_to] = True
-        return matrix
+        return {label: m.tocsr() for label, m in matrix.items()}
@@ -0,0 +1,202 @@
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+import networkx as nt
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix, kron
+
+import project.utils
+from project.cfpq.matrix import get_label_matrices
+from project.projection import get_alphabet, project_graph
+from project.regex import compile_regex, index_dfa
+from project.vertices import VertexMap
+
+Edge = Tuple[Hashable, Hashable, Hashable]
+
+
+class ShortestPaths:
+    """
+    Result of the shortest path regular query
+
+    Holds minimal path lengths for every reachable (start, final) pair
+    and predecessors of the product states visited by the BFS over the product of the graph and the DFA,
+    so the memory is proportional to the visited states rather than to the size of the product.
+    Product state of vertex v and DFA state q has index v * states_count + q
+    """
+
+    def __init__(
+        self,
+        nodes: List[Hashable],
+        states_count: int,
+        delta: Dict[Tuple[int, str], int],
+        graph: nt.MultiDiGraph,
+    ):
+        self._nodes = nodes
+        self._k = states_count
+        self._delta = delta
+        self._graph = graph
+        self._ends: Dict[Tuple[Hashable, Hashable], int] = {}
+        self._lengths: Dict[Tuple[Hashable, Hashable], int] = {}
+        # start -> (sorted visited product states, their predecessors)
+        self._preds: Dict[Hashable, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @property
+    def lengths(self) -> Dict[Tuple[Hashable, Hashable], int]:
+        """
+        Dictionary that maps pairs (start, final) to the minimal length of the path
+        """
+        return self._lengths
+
+    def _add_source(
+        self, start: Hashable, states: np.ndarray, preds: np.ndarray
+    ) -> None:
+        order = np.argsort(states)
+        self._preds[start] = (states[order], preds[order])
+
+    def _add_pair(self, start: Hashable, final: Hashable, length: int, end: int):
+        self._lengths[(start, final)] = length
+        self._ends[(start, final)] = end
+
+    def get_path(self, start: Hashable, final: Hashable) -> Optional[List[Edge]]:
+        """
+        Reconstructs one shortest path
+        :return: list of edges (from, label, to) or None if final isn't reachable from start
+        """
+        end = self._ends.get((start, final))
+        if end is None:
+            return None
+
+        states, preds = self._preds[start]
+        path = []
+        while True:
+            frm = int(preds[np.searchsorted(states, end)])
+            if frm < 0:
+                break
+            u, q = divmod(frm, self._k)
+            v, q_to = divmod(end, self._k)
+            u, v = self._nodes[u], self._nodes[v]
+            for label in {data.get("label") for data in self._graph[u][v].values()}:
+                if self._delta.get((q, label)) == q_to:
+                    path.append((u, label, v))
+                    break
+            end = frm
+        path.reverse()
+        return path
+
+
+def get_shortest_paths(
+    graph: Union[nt.MultiDiGraph, str],
+    regex: str,
+    start_vertices: Optional[Iterable[Hashable]] = None,
+    final_vertices: Optional[Iterable[Hashable]] = None,
+    max_length: Optional[int] = None,
+) -> ShortestPaths:
+    """
+    Finds minimal lengths of the paths which labels form a word of the regular expression.
+    Level-synchronous BFS over the product of the graph and the DFA is run from every start vertex
+    :param graph: networkx graph or name of the graph in CFPQ dataset
+    :param regex: regular expression
+    :param (optional) start_vertices: start vertices, all vertices by default
+    :param (optional) final_vertices: final vertices, all vertices by default
+    :param (optional) max_length: paths longer than max_length aren't searched
+    :return: ShortestPaths
+    """
+    if type(graph) == str:
+        graph: nt.MultiDiGraph = project.utils.get_graph_by_name(graph)
+
+    if start_vertices is not None:
+        start_vertices = list(start_vertices)
+    if final_vertices is not None:
+        final_vertices = list(final_vertices)
+
+    dfa = compile_regex(regex)
+    graph = project_graph(
+        graph, get_alphabet(dfa), start_vertices, final_vertices, prune="reachability"
+    )
+    vertices = VertexMap.from_graph(graph)
+    nodes, node_idx = vertices.nodes, vertices.index
+    n = len(nodes)
+
+    k, delta, start, finals = dfa
+
+    result = ShortestPaths(nodes, k, delta, graph)
+    if start is None or n == 0:
+        return result
+
+    matrix = get_product_matrix(get_label_matrices(graph, node_idx), n, delta, k)
+    finals = np.array(finals, dtype=np.int64)
+
+    if start_vertices is None:
+        start_vertices = nodes
+    if final_vertices is None:
+        final_vertices = nodes
+    final_idx = np.array(
+        sorted({node_idx[node] for node in final_vertices}), dtype=np.int64
+    )
+    # Product states which end a path
+    is_final = np.zeros(n * k, dtype=bool)
+    is_final[(final_idx[:, None] * k + finals[None, :]).ravel()] = True
+
+    # shared by the sources and cleared after every BFS
+    visited = np.zeros(n * k, dtype=bool)
+    for source in start_vertices:
+        begin = node_idx[source] * k + start
+        visited[begin] = True
+        frontier = np.array([begin], dtype=np.int64)
+        states, preds = [frontier], [np.array([-1], dtype=np.int64)]
+        found = set()
+
+        length = 0
+        while True:
+            for end in frontier[is_final[frontier]]:
+                final = nodes[end // k]
+                if final not in found:
+                    found.add(final)
+                    result._add_pair(source, final, length, int(end))
+            if len(found) == len(final_idx) or len(frontier) == 0:
+                break
+            if max_length is not None and length >= max_length:
+                break
+
+            step = matrix[frontier].tocoo()
+            targets = step.col.astype(np.int64)
+            sources = frontier[step.row]
+            fresh = ~visited[targets]
+            targets, first = np.unique(targets[fresh], return_index=True)
+            visited[targets] = True
+            states.append(targets)
+            preds.append(sources[fresh][first])
+            frontier = targets
+            length += 1
+
+        states = np.concatenate(states)
+        visited[states] = False
+        result._add_source(source, states, np.concatenate(preds))
+
+    return result
+
+
+def get_product_matrix(
+    label_matrices: Dict[str, csr_matrix],
+    n: int,
+    delta: Dict[Tuple[int, str], int],
+    k: int,
+) -> csr_matrix:
+    """
+    Adjacency matrix of the product of the graph and the DFA
+    :param label_matrices: adjacency matrices of the graph labels
+    :param n: number of vertices of the graph
+    :param delta: transitions of the DFA: (state, label) -> state
+    :param k: number of states of the DFA
+    """
+    dfa_edges: Dict[str, Tuple[List[int], List[int]]] = {}
+    for (q, label), q_to in delta.items():
+        rows, cols = dfa_edges.setdefault(label, ([], []))
+        rows.append(q)
+        cols.append(q_to)
+
+    matrix = csr_matrix((n * k, n * k), dtype=bool)
+    for label in label_matrices.keys() & dfa_edges.keys():
+        d_rows, d_cols = dfa_edges[label]
+        d = coo_matrix(([True] * len(d_rows), (d_rows, d_cols)), shape=(k, k))
+        matrix = matrix + kron(label_matrices[label], d, format="csr")
+    return matrix.tocsr()
@@ -0,0 +1,209 @@
+import asyncio
+import threading
+from collections import namedtuple
+from concurrent.futures import Executor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import networkx as nt
+import numpy as np
+from pyformlang.cfg import CFG, Variable
+from scipy.sparse import csr_matrix
+
+import project.utils
+from project.cfpq.matrix import get_label_matrices, matrix_closure
+from project.regex import compile_regex
+from project.rpq import get_product_matrix
+from project.vertices import VertexMap
+from project.wcnf import cfg_to_wcnf
+
+Query = namedtuple("Query", ["start_vertices", "final_vertices", "start_nonterminal"])
+
+Answer = Dict[Hashable, Set[Hashable]]
+
+
+def get_grammar_key(cfg: CFG) -> str:
+    """
+    Text that is the same for the same grammars, used as a key of the caches
+    """
+    return "\n".join([cfg.start_symbol.value] + sorted(cfg.to_text().splitlines()))
+
+
+class GraphSession:
+    """
+    Graph loaded once to answer many queries
+
+    The graph is kept as adjacency matrices of its labels.
+    Closures of the grammars (matrices of all nonterminals) and
+    products with the regex automata are computed once and cached,
+    so queries which differ only in start/final vertices and nonterminal are cheap.
+    Every cache entry has its own lock, so only the threads computing the same closure
+    or product wait for each other, different grammars and regexes are computed concurrently.
+    """
+
+    def __init__(self, graph: Union[nt.MultiDiGraph, str], order: Optional[str] = None):
+        """
+        :param graph: networkx graph or name of the graph in CFPQ dataset
+        :param order: (optional) order of the vertex ids, see VertexMap.from_graph
+        """
+        if type(graph) == str:
+            graph: nt.MultiDiGraph = project.utils.get_graph_by_name(graph)
+
+        self.vertices = VertexMap.from_graph(graph, order)
+        self.nodes: List[Hashable] = self.vertices.nodes
+        self._node_idx = self.vertices.index
+        self._label_matrices = get_label_matrices(graph, self._node_idx)
+        self._closures: Dict[str, Dict[Variable, csr_matrix]] = {}
+        self._products: Dict[str, Tuple[csr_matrix, int, Optional[int], List[int]]] = {}
+        # guards _key_locks only, never held during the computations
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def __getstate__(self):
+        # locks and futures can't be pickled, e.g. for the workers started with spawn,
+        # nonterminals are pickled by values since pyformlang keeps their string hashes
+        # that differ between processes
+        state = dict(self.__dict__)
+        del state["_lock"], state["_key_locks"], state["_pending"]
+        state["_closures"] = {
+            key: {var.value: matrix for var, matrix in closure.items()}
+            for key, closure in self._closures.items()
+        }
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._closures = {
+            key: {Variable(value): matrix for value, matrix in closure.items()}
+            for key, closure in self._closures.items()
+        }
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._pending = {}
+
+    def closure(self, cfg: CFG) -> Dict[Variable, csr_matrix]:
+        """
+        Returns matrices of all nonterminals of the grammar, computes them on the first call
+        """
+        return self._compute_once(
+            "closure",
+            self._closures,
+            get_grammar_key(cfg),
+            lambda: matrix_closure(
+                self._label_matrices, len(self.nodes), cfg_to_wcnf(cfg)
+            ),
+        )
+
+    def _compute_once(
+        self, kind: str, cache: Dict[str, Any], key: str, compute: Callable[[], Any]
+    ) -> Any:
+        value = cache.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            lock = self._key_locks.setdefault((kind, key), threading.Lock())
+        with lock:
+            if key not in cache:
+                cache[key] = compute()
+            return cache[key]
+
+    def query(self, cfg: CFG, queries: Iterable[Query]) -> List[Answer]:
+        """
+        Answers batch of queries with the same grammar
+        :return: for every query, the dictionary that maps starting vertices to the corresponding reachable vertices
+        """
+        closure = self.closure(cfg)
+        return [self._answer(closure, query) for query in queries]
+
+    async def aquery(
+        self, cfg: CFG, query: Query, executor: Optional[Executor] = None
+    ) -> Answer:
+        """
+        Answers the query, the closure is computed in the executor.
+        Concurrent queries with the same grammar wait for the same computation
+        """
+        key = get_grammar_key(cfg)
+        closure = self._closures.get(key)
+        if closure is None:
+            future = self._pending.get(key)
+            if future is None:
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(executor, self.closure, cfg)
+                self._pending[key] = future
+                future.add_done_callback(lambda _: self._pending.pop(key, None))
+            closure = await future
+        return self._answer(closure, query)
+
+    def _answer(self, closure: Dict[Variable, csr_matrix], query: Query) -> Answer:
+        nonterminal = query.start_nonterminal
+        if not isinstance(nonterminal, Variable):
+            nonterminal = Variable(nonterminal)
+
+        ans = {u: set() for u in query.start_vertices}
+        matrix = closure.get(nonterminal)
+        if matrix is None:
+            return ans
+
+        finals = set(query.final_vertices)
+        for u in ans:
+            i = self._node_idx[u]
+            for j in matrix.indices[matrix.indptr[i] : matrix.indptr[i + 1]]:
+                v = self.nodes[j]
+                if v in finals:
+                    ans[u].add(v)
+        return ans
+
+    def _product(self, regex: str) -> Tuple[csr_matrix, int, Optional[int], List[int]]:
+        def compute():
+            k, delta, start, finals = compile_regex(regex)
+            matrix = get_product_matrix(self._label_matrices, len(self.nodes), delta, k)
+            return matrix, k, start, finals
+
+        return self._compute_once("product", self._products, regex, compute)
+
+    def query_rpq(
+        self,
+        regex: str,
+        start_vertices: Iterable[Hashable],
+        final_vertices: Iterable[Hashable],
+    ) -> Answer:
+        """
+        Regular path query, the product of the graph and the regex automaton is cached
+        :return: the dictionary that maps starting vertices to the corresponding reachable vertices
+        """
+        matrix, k, start, finals = self._product(regex)
+        starts = list(dict.fromkeys(start_vertices))
+        ans = {u: set() for u in starts}
+        if start is None or not starts:
+            return ans
+
+        # Level-synchronous BFS from all start vertices at once, one row per start vertex
+        rows = np.arange(len(starts))
+        cols = np.array([self._node_idx[u] * k + start for u in starts])
+        frontier = csr_matrix(
+            (np.ones(len(starts), dtype=bool), (rows, cols)),
+            shape=(len(starts), matrix.shape[0]),
+        )
+        visited = frontier
+        while frontier.nnz:
+            frontier = (frontier @ matrix) > visited
+            visited = visited + frontier
+
+        final_states = set(finals)
+        final_idx = {self._node_idx[v] for v in final_vertices}
+        for row, col in zip(*visited.nonzero()):
+            v, q = divmod(int(col), k)
+            if q in final_states and v in final_idx:
+                ans[starts[row]].add(self.nodes[v])
+        return ans
@@ -0,0 +1,228 @@
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from project.graphs import COMPACT_MAGIC, iter_chunks, read_compact
+
+GraphStats = namedtuple(
+    "GraphStats",
+    [
+        "nodes_count",
+        "edges_count",
+        "label_counts",
+        "out_degrees",
+        "in_degrees",
+        "co_occurrence",
+    ],
+)
+# label_counts: label -> number of edges
+# out_degrees, in_degrees: degree -> number of vertices with this degree
+# co_occurrence: (l1, l2) -> number of vertices with incoming l1 edge and outgoing l2 edge
+
+
+# Vertices of a block are unpacked at once when the co-occurrence is counted
+_BLOCK = 1 << 14
+
+
+class _StatsAccumulator:
+    """
+    Collects statistics chunk by chunk in one pass.
+    Memory depends only on the number of vertices and labels, not on the number of edges:
+    every vertex has degrees and bitmasks of its incoming and outgoing labels,
+    which are updated in place, co-occurrence is counted from the bitmasks at the end
+    """
+
+    def __init__(self, nodes_count: Optional[int] = None):
+        """
+        :param nodes_count: (optional) number of vertices if it is known,
+                            the vertex ids must be less than it
+        """
+        self.labels: List[str] = []
+        self._label_idx: Dict[str, int] = {}
+        self._nodes_count = nodes_count
+        self._edges = 0
+        self._label_counts = np.zeros(0, dtype=np.int64)
+        self._seen = np.zeros(0, dtype=bool)
+        self._out = np.zeros(0, dtype=np.int64)
+        self._in = np.zeros(0, dtype=np.int64)
+        # vertex x word: bit l % 64 of word l // 64 is set if vertex has incoming/outgoing edge with label l
+        self._in_labels = np.zeros((0, 0), dtype=np.uint64)
+        self._out_labels = np.zeros((0, 0), dtype=np.uint64)
+        if nodes_count is not None:
+            self._reserve(nodes_count)
+
+    def label_codes(self, labels: Iterable[str]) -> np.ndarray:
+        """
+        Global codes of the labels, new labels get new codes
+        """
+        codes = []
+        for label in labels:
+            if label not in self._label_idx:
+                self._label_idx[label] = len(self.labels)
+                self.labels.append(label)
+            codes.append(self._label_idx[label])
+        return np.array(codes, dtype=np.int64)
+
+    def _reserve(self, vertices: int) -> None:
+        labels = len(self.labels)
+        words = (labels + 63) // 64
+        if vertices <= len(self._seen) and words <= self._in_labels.shape[1]:
+            if len(self._label_counts) < labels:
+                self._label_counts = _grow(self._label_counts, labels)
+            return
+        if vertices > len(self._seen):
+            vertices = max(vertices, 2 * len(self._seen))
+            if self._nodes_count is not None:
+                vertices = max(vertices, self._nodes_count)
+        else:
+            vertices = len(self._seen)
+        words = max(words, self._in_labels.shape[1])
+
+        self._seen = _grow(self._seen, vertices)
+        self._out = _grow(self._out, vertices)
+        self._in = _grow(self._in, vertices)
+        self._in_labels = _grow(self._in_labels, (vertices, words))
+        self._out_labels = _grow(self._out_labels, (vertices, words))
+        self._label_counts = _grow(self._label_counts, labels)
+
+    def add(self, src: np.ndarray, dst: np.ndarray, label: np.ndarray) -> None:
+        """
+        Adds chunk of edges, vertices are non-negative integer ids, labels are global codes
+        """
+        if len(src) == 0:
+            return
+        low = int(min(src.min(), dst.min()))
+        high = int(max(src.max(), dst.max()))
+        limit = self._nodes_count
+        if low < 0 or (limit is not None and high >= limit):
+            raise ValueError(f"Vertex ids must be in [0, {limit or 'inf'})")
+        self._reserve(high + 1)
+        self._edges += len(src)
+        self._seen[src] = True
+        self._seen[dst] = True
+        self._out += np.bincount(src, minlength=len(self._out))
+        self._in += np.bincount(dst, minlength=len(self._in))
+        self._label_counts += np.bincount(label, minlength=len(self._label_counts))
+
+        words = label >> 6
+        bits = np.left_shift(np.uint64(1), (label & 63).astype(np.uint64))
+        np.bitwise_or.at(self._out_labels, (src, words), bits)
+        np.bitwise_or.at(self._in_labels, (dst, words), bits)
+
+    def _co_occurrence(self) -> np.ndarray:
+        labels = len(self.labels)
+        counts = np.zeros((labels, labels), dtype=np.int64)
+        for start in range(0, len(self._seen), _BLOCK):
+            ins = _unpack(self._in_labels[start : start + _BLOCK], labels)
+            outs = _unpack(self._out_labels[start : start + _BLOCK], labels)
+            counts += ins.T @ outs
+        return counts
+
+    def result(self) -> GraphStats:
+        seen = self._seen
+        co_occurrence = self._co_occurrence()
+        return GraphStats(
+            int(seen.sum()),
+            self._edges,
+            {label: int(self._label_counts[i]) for i, label in enumerate(self.labels)},
+            _histogram(self._out[seen]),
+            _histogram(self._in[seen]),
+            {
+                (self.labels[i], self.labels[j]): int(co_occurrence[i, j])
+                for i, j in zip(*co_occurrence.nonzero())
+            },
+        )
+
+
+def _grow(array: np.ndarray, shape) -> np.ndarray:
+    grown = np.zeros(shape, dtype=array.dtype)
+    grown[tuple(slice(0, size) for size in array.shape)] = array
+    return grown
+
+
+def _unpack(masks: np.ndarray, labels: int) -> np.ndarray:
+    """
+    Bitmasks of the vertices as vertex x label int64 matrix of zeros and ones
+    """
+    octets = masks.astype("<u8").view(np.uint8).reshape(len(masks), -1)
+    bits = np.unpackbits(octets, axis=1, bitorder="little")[:, :labels]
+    return bits.astype(np.int64)
+
+
+def _histogram(degrees: np.ndarray) -> Dict[int, int]:
+    counts = np.bincount(degrees)
+    return {int(degree): int(counts[degree]) for degree in np.flatnonzero(counts)}
+
+
+def get_csv_stats(path: str, chunk_size: int = 1 << 20) -> GraphStats:
+    """
+    Statistics of the graph in CFPQ dataset CSV format ("from to label" lines),
+    the file is read in chunks of chunk_size lines.
+    Vertices must be non-negative integers, the memory is proportional to the maximal id
+    :raises ValueError: if a vertex isn't a non-negative integer
+    """
+    import pandas as pd
+
+    acc = _StatsAccumulator()
+
+    def vertex_codes(column: "pd.Series") -> np.ndarray:
+        if not pd.api.types.is_integer_dtype(column):
+            raise ValueError(f'Vertices in "{path}" must be integers')
+        return column.to_numpy(dtype=np.int64)
+
+    chunks = pd.read_csv(
+        path,
+        sep=" ",
+        header=None,
+        names=["from", "to", "label"],
+        dtype={"label": str},
+        chunksize=chunk_size,
+    )
+    for chunk in chunks:
+        codes, uniques = pd.factorize(chunk["label"])
+        acc.add(
+            vertex_codes(chunk["from"]),
+            vertex_codes(chunk["to"]),
+            acc.label_codes(uniques)[codes],
+        )
+    return acc.result()
+
+
+def get_compact_stats(path: str, chunk_size: int = 1 << 20) -> GraphStats:
+    """
+    Statistics of the graph in the compact format, the arrays are read in chunks of chunk_size edges
+    """
+    graph = read_compact(path)
+    acc = _StatsAccumulator(graph.nodes_count)
+    codes = acc.label_codes(graph.labels)
+    for src, dst, label in iter_chunks(graph, chunk_size):
+        acc.add(
+            np.asarray(src, dtype=np.int64),
+            np.asarray(dst, dtype=np.int64),
+            codes[np.asarray(label, dtype=np.int64)],
+        )
+    stats = acc.result()
+    # Isolated vertices are stored in the compact format
+    isolated = graph.nodes_count - stats.nodes_count
+    if isolated > 0:
+        out_degrees, in_degrees = dict(stats.out_degrees), dict(stats.in_degrees)
+        out_degrees[0] = out_degrees.get(0, 0) + isolated
+        in_degrees[0] = in_degrees.get(0, 0) + isolated
+        stats = stats._replace(
+            nodes_count=graph.nodes_count,
+            out_degrees=out_degrees,
+            in_degrees=in_degrees,
+        )
+    return stats
+
+
+def get_file_stats(path: str, chunk_size: int = 1 << 20) -> GraphStats:
+    """
+    Statistics of the graph in the compact format or CSV, format is detected by the file content
+    """
+    with open(path, "rb") as file:
+        is_compact = file.read(len(COMPACT_MAGIC)) == COMPACT_MAGIC
+    if is_compact:
+        return get_compact_stats(path, chunk_size)
+    return get_csv_stats(path, chunk_size)
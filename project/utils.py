@@ -1,9 +1,9 @@
-from typing import Tuple, Set
+from typing import TYPE_CHECKING, Tuple, Set
 
-import cfpq_data as cfpq
-import networkx as nt
-import pydot
+if TYPE_CHECKING:
+    import networkx as nt
 
+import project.graphs
 from collections import namedtuple
 
 GraphData = namedtuple("GraphData", ["nodes_count", "edges_count", "labels"])
@@ -11,21 +11,27 @@ GraphData = namedtuple("GraphData", ["nodes_count", "edges_count", "labels"])
 
 def get_graph_data_by_name(name: str) -> GraphData:
     """
-    Return count of nodes, edges and list of labels of graph from CFPQ dataset
+    Return count of nodes, edges and list of labels of graph from CFPQ dataset.
+    The graph file is read in chunks, the graph itself isn't built
     """
-    graph = get_graph_by_name(name)
-    return get_graph_data(graph)
+    import cfpq_data as cfpq
+    import project.stats
 
+    stats = project.stats.get_csv_stats(cfpq.download(name))
+    return GraphData(stats.nodes_count, stats.edges_count, set(stats.label_counts))
 
-def get_graph_by_name(name: str) -> nt.classes.MultiDiGraph:
+
+def get_graph_by_name(name: str) -> "nt.classes.MultiDiGraph":
     """
     Returns graph from CFPQ dataset
     """
+    import cfpq_data as cfpq
+
     path = cfpq.download(name)
     return cfpq.graph_from_csv(path)
 
 
-def get_graph_data(graph: nt.classes.MultiDiGraph) -> GraphData:
+def get_graph_data(graph: "nt.classes.MultiDiGraph") -> GraphData:
     """
     Extracts graph info from the graph
     """
@@ -34,11 +40,11 @@ def get_graph_data(graph: nt.classes.MultiDiGraph) -> GraphData:
     )
 
 
-def get_labels(graph: nt.classes.MultiDiGraph) -> Set[str]:
+def get_labels(graph: "nt.classes.MultiDiGraph") -> Set[str]:
     """
     Extracts set of labels from the graph
     """
-    return set([label for (_, _, label) in graph.edges(data="label")])
+    return {label for (_, _, label) in graph.edges(data="label")}
 
 
 def write_two_cycles_graph(
@@ -52,6 +58,4 @@ def write_two_cycles_graph(
     :param path: path to the file to write the graph
     :return:
     """
-    graph = cfpq.labeled_two_cycles_graph(n, m, labels=labels)
-    graph_pd: pydot.Dot = nt.drawing.nx_pydot.to_pydot(graph)
-    graph_pd.write_raw(path)
+    project.graphs.write_dot(path, project.graphs.two_cycles_arrays(n, m, labels))
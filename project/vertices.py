@@ -0,0 +1,106 @@
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+import networkx as nt
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import breadth_first_order, reverse_cuthill_mckee
+
+ORDERS = (None, "rcm", "bfs")
+
+
+class VertexMap:
+    """
+    Compact integer ids 0..n-1 of the graph vertices
+
+    The engines work with ids only, vertices of the results are translated back,
+    so vertices may be any hashable objects
+    """
+
+    def __init__(self, nodes: Iterable[Hashable]):
+        """
+        :param nodes: vertices in order of their ids
+        """
+        self.nodes: List[Hashable] = list(nodes)
+        self.index: Dict[Hashable, int] = {
+            node: idx for idx, node in enumerate(self.nodes)
+        }
+
+    @staticmethod
+    def from_graph(graph: nt.MultiDiGraph, order: Optional[str] = None) -> "VertexMap":
+        """
+        Numbers vertices of the graph
+        :param order: (optional) None to keep order of graph.nodes,
+                      "rcm" for reverse Cuthill-McKee order, "bfs" for breadth-first order.
+                      Both make ids of adjacent vertices close, which improves locality of the sparse matrices
+        """
+        vertices = VertexMap(graph.nodes)
+        if order is None:
+            return vertices
+        if order not in ORDERS:
+            raise ValueError(f"Unknown vertex order: {order}")
+
+        n = len(vertices)
+        rows, cols = vertices.edge_ids(graph)
+        adjacency = csr_matrix(
+            (np.ones(2 * len(rows), dtype=bool), (rows + cols, cols + rows)),
+            shape=(n, n),
+        )
+        if order == "rcm":
+            permutation = reverse_cuthill_mckee(adjacency, symmetric_mode=True)
+        else:
+            permutation = _bfs_order(adjacency)
+        return VertexMap(vertices.nodes[i] for i in permutation)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node: Hashable) -> bool:
+        return node in self.index
+
+    def to_ids(self, nodes: Iterable[Hashable]) -> List[int]:
+        return [self.index[node] for node in nodes]
+
+    def to_nodes(self, ids: Iterable[int]) -> List[Hashable]:
+        return [self.nodes[i] for i in ids]
+
+    def edges(self, graph: nt.MultiDiGraph) -> Iterator[Tuple[int, int, Hashable]]:
+        """
+        Yields edges (from id, to id, label) of the graph
+        """
+        index = self.index
+        for u, v, label in graph.edges(data="label"):
+            yield index[u], index[v], label
+
+    def edge_ids(self, graph: nt.MultiDiGraph) -> Tuple[List[int], List[int]]:
+        """
+        Ids of the ends of all edges of the graph: (from ids, to ids)
+        """
+        index = self.index
+        rows, cols = [], []
+        for u, v in graph.edges():
+            rows.append(index[u])
+            cols.append(index[v])
+        return rows, cols
+
+
+def _bfs_order(adjacency: csr_matrix) -> np.ndarray:
+    """
+    Breadth-first order of the symmetric graph, every component is traversed
+    from its vertex of the maximal degree, isolated vertices go last
+    """
+    n = adjacency.shape[0]
+    degrees = np.diff(adjacency.indptr)
+    visited = np.zeros(n, dtype=bool)
+    order = []
+    for root in np.argsort(-degrees, kind="stable"):
+        if visited[root]:
+            continue
+        if degrees[root] == 0:
+            break
+        component = breadth_first_order(
+            adjacency, root, directed=False, return_predecessors=False
+        )
+        visited[component] = True
+        order.append(component)
+    order.append(np.flatnonzero(~visited))
+    return np.concatenate(order)
@@ -1,7 +1,11 @@
-from typing import AbstractSet
+from collections import namedtuple
+from typing import AbstractSet, Dict, Iterable, List, Set, Tuple
 
 from pyformlang import cfg  # type: ignore
 
+GrammarSize = namedtuple("GrammarSize", ["variables", "terminals", "productions"])
+WCNFReport = namedtuple("WCNFReport", ["wcnf", "before", "after"])
+
 
 def load_cfg(name: str) -> cfg.CFG:
     """
@@ -23,23 +27,189 @@ def save_cfg(name: str, g: cfg.CFG) -> None:
         file.write(g.to_text())
 
 
+def get_grammar_size(g: cfg.CFG) -> GrammarSize:
+    """
+    Counts variables, terminals and productions of the grammar
+    """
+    return GrammarSize(len(g.variables), len(g.terminals), len(g.productions))
+
+
 def cfg_to_wcnf(g: cfg.CFG) -> cfg.CFG:
     """
     Transforms grammar into WCNF
 
-    Gets productions like *non-terminal* -> eps (1)
-    Gets prodcutions like A -> *start_symbol*   (2)
-    Gets CGF in CNF
-
-    Constructs new CFG by adding productions of CNF with (1) and (2)
+    Eliminates unit productions, removes useless symbols,
+    replaces terminals in long bodies with shared wrapper variables
+    and binarizes long bodies sharing common tails.
+    Epsilon productions are kept as they are.
 
     :param g: grammar
     :return: grammar in WCNF
     """
+    return cfg_to_wcnf_report(g).wcnf
 
-    new_cfg = g.eliminate_unit_productions().remove_useless_symbols()
-    prods = new_cfg._decompose_productions(
-        new_cfg._get_productions_with_only_single_terminals()
+
+def cfg_to_wcnf_report(g: cfg.CFG) -> WCNFReport:
+    """
+    Transforms grammar into WCNF and reports sizes of the grammar before and after
+    :param g: grammar
+    :return: WCNFReport(wcnf, before, after)
+    """
+    bodies = _eliminate_unit_productions(g)
+    bodies = _remove_useless_symbols(g.start_symbol, bodies)
+    productions = _decompose_productions(
+        _get_productions_with_only_single_terminals(bodies), g.variables
     )
 
-    return cfg.CFG(start_symbol=new_cfg.start_symbol, productions=prods)
+    wcnf = cfg.CFG(start_symbol=g.start_symbol, productions=productions)
+    return WCNFReport(wcnf, get_grammar_size(g), get_grammar_size(wcnf))
+
+
+Body = Tuple[cfg.cfg_object.CFGObject, ...]
+
+
+def _is_unit(body: Body) -> bool:
+    return len(body) == 1 and isinstance(body[0], cfg.Variable)
+
+
+def _eliminate_unit_productions(g: cfg.CFG) -> Dict[cfg.Variable, Set[Body]]:
+    """
+    Replaces every unit production A -> B with non-unit productions of B
+    :return: dictionary that maps head to the set of its bodies
+    """
+    bodies: Dict[cfg.Variable, Set[Body]] = {}
+    units: Dict[cfg.Variable, Set[cfg.Variable]] = {}
+    for prod in g.productions:
+        body = tuple(prod.body)
+        if _is_unit(body):
+            units.setdefault(prod.head, set()).add(body[0])
+        else:
+            bodies.setdefault(prod.head, set()).add(body)
+
+    result: Dict[cfg.Variable, Set[Body]] = {}
+    for head in set(bodies) | set(units):
+        reachable = {head}
+        to_process = [head]
+        while to_process:
+            for var in units.get(to_process.pop(), ()):
+                if var not in reachable:
+                    reachable.add(var)
+                    to_process.append(var)
+
+        head_bodies = set()
+        for var in reachable:
+            head_bodies |= bodies.get(var, set())
+        if head_bodies:
+            result[head] = head_bodies
+    return result
+
+
+def _remove_useless_symbols(
+    start_symbol: cfg.Variable, bodies: Dict[cfg.Variable, Set[Body]]
+) -> Dict[cfg.Variable, Set[Body]]:
+    """
+    Removes non-generating and unreachable symbols in time linear to the grammar size
+    """
+    prods: List[Tuple[cfg.Variable, Body]] = [
+        (head, body) for head, head_bodies in bodies.items() for body in head_bodies
+    ]
+
+    # Every production waits for its variables to become generating
+    remaining: List[int] = []
+    impacts: Dict[cfg.Variable, List[int]] = {}
+    generating: Set[cfg.Variable] = set()
+    to_process: List[cfg.Variable] = []
+    for idx, (head, body) in enumerate(prods):
+        variables = [sym for sym in body if isinstance(sym, cfg.Variable)]
+        remaining.append(len(variables))
+        for var in variables:
+            impacts.setdefault(var, []).append(idx)
+        if not variables and head not in generating:
+            generating.add(head)
+            to_process.append(head)
+
+    while to_process:
+        for idx in impacts.get(to_process.pop(), ()):
+            remaining[idx] -= 1
+            head = prods[idx][0]
+            if remaining[idx] == 0 and head not in generating:
+                generating.add(head)
+                to_process.append(head)
+
+    useful: Dict[cfg.Variable, Set[Body]] = {}
+    for idx, (head, body) in enumerate(prods):
+        if remaining[idx] == 0:
+            useful.setdefault(head, set()).add(body)
+
+    reachable = {start_symbol}
+    to_process = [start_symbol]
+    while to_process:
+        for body in useful.get(to_process.pop(), ()):
+            for sym in body:
+                if isinstance(sym, cfg.Variable) and sym not in reachable:
+                    reachable.add(sym)
+                    to_process.append(sym)
+
+    return {head: useful[head] for head in useful if head in reachable}
+
+
+def _get_productions_with_only_single_terminals(
+    bodies: Dict[cfg.Variable, Set[Body]]
+) -> List[Tuple[cfg.Variable, Body]]:
+    """
+    Replaces terminals in bodies longer than 1 with wrapper variables.
+    Single wrapper is shared by all occurrences of the terminal
+    """
+    term_to_var: Dict[cfg.Terminal, cfg.Variable] = {}
+    result = []
+    for head, head_bodies in bodies.items():
+        for body in head_bodies:
+            if len(body) > 1:
+                new_body = []
+                for sym in body:
+                    if isinstance(sym, cfg.Terminal):
+                        if sym not in term_to_var:
+                            term_to_var[sym] = cfg.Variable(f"{sym.value}#CNF#")
+                        sym = term_to_var[sym]
+                    new_body.append(sym)
+                body = tuple(new_body)
+            result.append((head, body))
+
+    for term, var in term_to_var.items():
+        result.append((var, (term,)))
+    return result
+
+
+def _decompose_productions(
+    prods: Iterable[Tuple[cfg.Variable, Body]], taken: AbstractSet[cfg.Variable]
+) -> Set[cfg.Production]:
+    """
+    Binarizes bodies longer than 2, the same tail of the body always gets the same variable
+    :param prods: pairs (head, body)
+    :param taken: variables which names can't be used for new variables
+    """
+    # Sort to keep the names of new variables stable between runs
+    prods = sorted(prods, key=lambda p: (str(p[0]), [str(sym) for sym in p[1]]))
+    tails: Dict[Body, cfg.Variable] = {}
+    idx = 0
+    result = set()
+
+    for head, body in prods:
+        for i in range(len(body) - 2):
+            tail = body[i + 1 :]
+            if tail in tails:
+                result.add(cfg.Production(head, [body[i], tails[tail]]))
+                break
+
+            idx += 1
+            var = cfg.Variable(f"C#CNF#{idx}")
+            while var in taken:
+                idx += 1
+                var = cfg.Variable(f"C#CNF#{idx}")
+
+            tails[tail] = var
+            result.add(cfg.Production(head, [body[i], var]))
+            head = var
+        else:
+            result.add(cfg.Production(head, list(body[-2:])))
+    return result
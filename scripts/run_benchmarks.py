@@ -0,0 +1,169 @@
+import os
+import random
+import subprocess
+import sys
+import time
+
+import shared
+
+shared.configure_python_path()
+sys.path.append(str(shared.ROOT))
+
+from pyformlang.cfg import CFG
+
+from scipy.sparse import random as sparse_random
+
+from project.artifacts import build_artifact, load_artifact, save_artifact
+from project.cfpq.backends import PackedBoolMatrix
+from project.cyk import CYKGrammar
+from project.graphs import random_arrays, two_cycles_arrays, write_compact
+from project.regex import RegexCache
+
+LOG_GRAMMAR = """
+    S -> R | R S
+    R -> get P status | post P body status
+    P -> slash | slash id | slash P
+"""
+
+
+def random_log_word(rng: random.Random, requests: int):
+    """
+    Random sequence of request tokens, some of them are not in the LOG_GRAMMAR language
+    """
+    word = []
+    for _ in range(requests):
+        method = rng.choice(["get", "post"])
+        word.append(method)
+        word += ["slash"] * rng.randint(1, 3)
+        if rng.random() < 0.5:
+            word.append("id")
+        if method == "post" or rng.random() < 0.1:
+            word.append("body")
+        word.append("status")
+    return word
+
+
+def bench_cyk(words_count: int = 2000, processes=None):
+    rng = random.Random(42)
+    words = [random_log_word(rng, rng.randint(1, 4)) for _ in range(words_count)]
+    grammar = CYKGrammar(CFG.from_text(LOG_GRAMMAR))
+
+    start = time.perf_counter()
+    grammar.accepts_many(words, processes)
+    elapsed = time.perf_counter() - start
+    print(
+        f"cyk (processes={processes}): {words_count / elapsed:.0f} words/s",
+        f"({elapsed:.3f}s)",
+    )
+
+
+def bench_artifacts(path: str = "bench_artifact.json"):
+    start = time.perf_counter()
+    artifact = build_artifact(LOG_GRAMMAR)
+    built = time.perf_counter() - start
+    save_artifact(path, artifact)
+
+    start = time.perf_counter()
+    load_artifact(path)
+    loaded = time.perf_counter() - start
+    os.remove(path)
+    print(f"artifacts: build {built * 1000:.1f}ms, load {loaded * 1000:.1f}ms")
+
+
+def bench_backends(n: int = 2000, fills=(0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2)):
+    """
+    Boolean matrix product: scipy sparse vs packed dense, shows the crossover fill ratio
+    """
+    for fill in fills:
+        a = sparse_random(n, n, density=fill, format="csr", random_state=1)
+        b = sparse_random(n, n, density=fill, format="csr", random_state=2)
+        a, b = a.astype(bool), b.astype(bool)
+        packed_a, packed_b = PackedBoolMatrix.from_csr(a), PackedBoolMatrix.from_csr(b)
+
+        start = time.perf_counter()
+        a @ b
+        sparse_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        packed_a @ packed_b
+        dense_time = time.perf_counter() - start
+
+        winner = "dense" if dense_time < sparse_time else "sparse"
+        print(
+            f"backends (n={n}, fill={fill}): sparse {sparse_time * 1000:.1f}ms,",
+            f"dense {dense_time * 1000:.1f}ms -> {winner}",
+        )
+
+
+def bench_generators(nodes: int = 1_000_000, path: str = "bench_graph.cgraph"):
+    for name, generate in [
+        ("two cycles", lambda: two_cycles_arrays(nodes // 2, nodes // 2)),
+        ("power-law", lambda: random_arrays(nodes, 4 * nodes, seed=1, exponent=1.2)),
+    ]:
+        start = time.perf_counter()
+        write_compact(path, generate())
+        elapsed = time.perf_counter() - start
+        print(f"generators ({name}, {nodes} nodes): {elapsed * 1000:.1f}ms")
+    os.remove(path)
+
+
+def bench_regex(labels: int = 1000):
+    regex = "(" + " | ".join(f"label{i}" for i in range(labels)) + ")*"
+    cache = RegexCache()
+    for name in ["compile", "cached"]:
+        start = time.perf_counter()
+        cache.get(regex)
+        elapsed = time.perf_counter() - start
+        print(f"regex ({labels}-way alternation, {name}): {elapsed * 1000:.1f}ms")
+
+
+IMPORT_MODULES = [
+    "project.cfpq",
+    "project.utils",
+    "project.regex",
+    "project.artifacts",
+    "project.language.dataflow",
+    "project.cfpq.matrix",
+    "project.session",
+]
+HEAVY_MODULES = ["networkx", "scipy", "pandas", "cfpq_data", "pydot"]
+
+
+def bench_imports(modules=IMPORT_MODULES, repeats: int = 3):
+    """
+    Import time of the modules in a fresh interpreter and the heavy dependencies they load
+    """
+    code = (
+        "import sys, time; start = time.perf_counter(); import {module}; "
+        "print(time.perf_counter() - start); "
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    for module in modules:
+        times = []
+        for _ in range(repeats):
+            output = subprocess.check_output(
+                [sys.executable, "-c", code.format(module=module)], text=True
+            ).splitlines()
+            times.append(float(output[0]))
+        loaded = output[1] if len(output) > 1 and output[1] else "-"
+        print(f"imports ({module}): {min(times) * 1000:.1f}ms, loads {loaded}")
+
+
+BENCHMARKS = {
+    "cyk": lambda: (bench_cyk(), bench_cyk(processes=4)),
+    "artifacts": bench_artifacts,
+    "backends": bench_backends,
+    "generators": bench_generators,
+    "regex": bench_regex,
+    "imports": bench_imports,
+}
+
+
+def main(argv):
+    names = argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+import project.ecfg
+from project import artifacts
+from project.ecfg import ECFG
+from project.wcnf import cfg_to_wcnf, load_cfg
+
+CFG_TEXT = """
+S -> a S b S | $
+S -> A c
+A -> a
+"""
+
+
+def test_artifact_roundtrip(tmp_path):
+    artifact = artifacts.build_artifact(CFG_TEXT)
+    path = str(tmp_path / "grammar.json")
+    artifacts.save_artifact(path, artifact)
+    loaded = artifacts.load_artifact(path)
+
+    assert loaded.source_hash == artifact.source_hash
+    assert set(loaded.wcnf.productions) == set(artifact.wcnf.productions)
+    assert loaded.ecfg == artifact.ecfg
+
+    loaded_boxes = {box.var: box.dfa for box in loaded.rfa.boxes}
+    for box in artifact.rfa.boxes:
+        assert loaded_boxes[box.var].is_equivalent_to(box.dfa)
+
+    for var, matrices in artifact.rfa.get_matrices().items():
+        loaded_matrices = loaded.rfa.get_matrices()[var]
+        assert {label: m.nnz for label, m in matrices.items()} == {
+            label: m.nnz for label, m in loaded_matrices.items()
+        }
+
+
+def test_load_grammar_uses_artifact(tmp_path, monkeypatch):
+    source = tmp_path / "grammar.txt"
+    source.write_text(CFG_TEXT)
+
+    built = artifacts.load_grammar(str(source))
+    assert set(built.wcnf.productions) == set(
+        cfg_to_wcnf(load_cfg(str(source))).productions
+    )
+
+    def fail(*args):
+        raise AssertionError("grammar was converted again")
+
+    monkeypatch.setattr(artifacts, "build_artifact", fail)
+    monkeypatch.setattr(project.ecfg, "Regex", fail)
+    loaded = artifacts.load_grammar(str(source))
+    assert set(loaded.wcnf.productions) == set(built.wcnf.productions)
+
+
+def test_load_grammar_rebuilds_on_change(tmp_path):
+    source = tmp_path / "grammar.txt"
+    source.write_text("S -> a*")
+    artifacts.load_grammar(str(source), kind="ecfg")
+
+    source.write_text("S -> b*")
+    artifact = artifacts.load_grammar(str(source), kind="ecfg")
+
+    assert artifact.wcnf is None
+    assert artifact.ecfg == ECFG.from_text("S -> b*")
+    with open(str(source) + ".artifact.json") as file:
+        assert json.load(file)["source_hash"] == artifacts.get_source_hash("S -> b*")
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        artifacts.build_artifact(CFG_TEXT, kind="grammar")
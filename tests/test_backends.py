@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from cfpq_data import labeled_two_cycles_graph
+from pyformlang.cfg import CFG
+from scipy.sparse import random as sparse_random
+
+from project.cfpq import *
+
+
+def random_matrix(rows, cols, density, seed):
+    return sparse_random(
+        rows, cols, density=density, format="csr", random_state=seed
+    ).astype(bool)
+
+
+@pytest.mark.parametrize("shape", [(1, 1, 1), (10, 70, 5), (130, 64, 65)])
+@pytest.mark.parametrize("density", [0.0, 0.05, 0.5])
+def test_packed_operations(shape, density):
+    n, k, m = shape
+    a = random_matrix(n, k, density, 1)
+    b = random_matrix(k, m, density, 2)
+    packed_a, packed_b = PackedBoolMatrix.from_csr(a), PackedBoolMatrix.from_csr(b)
+    expected = (a @ b).toarray()
+
+    assert packed_a.nnz == a.nnz
+    assert np.array_equal(packed_a.to_array(), a.toarray())
+    assert np.array_equal((packed_a @ packed_b).to_array(), expected)
+    assert np.array_equal(packed_b.rmatmul_sparse(a).to_array(), expected)
+
+
+@pytest.mark.parametrize(
+    "backend", [SparseBackend(), DenseBackend(), AdaptiveBackend(0.1, 0.05)]
+)
+def test_matrix_alg_backends(backend):
+    graph = labeled_two_cycles_graph(20, 30, labels=("a", "b"))
+    cfg = CFG.from_text("S -> a S b S | $")
+
+    assert matrix_alg(graph, cfg, backend=backend) == matrix_alg(
+        graph, cfg, backend=SparseBackend()
+    )
+
+
+def test_adaptive_backend_switches():
+    backend = AdaptiveBackend(dense_fill=0.5, sparse_fill=0.1)
+    dense = random_matrix(10, 10, 0.8, 1)
+    sparse = random_matrix(10, 10, 0.05, 1)
+
+    assert isinstance(backend.from_csr(dense), PackedBoolMatrix)
+    assert backend.adapt(PackedBoolMatrix.from_csr(sparse)).nnz == sparse.nnz
+    assert not isinstance(
+        backend.adapt(PackedBoolMatrix.from_csr(sparse)), PackedBoolMatrix
+    )
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from cfpq_data import labeled_two_cycles_graph
+from pyformlang.cfg import CFG
+
+from project.cfpq import *
+
+DYCK = CFG.from_text("S -> a S b S | $")
+ANBN = CFG.from_text("S -> a S b | a b")
+
+ENGINES = [hellings, matrix_alg]
+
+
+def test_check():
+    budget = Budget(max_facts=10, max_nnz=20)
+
+    assert budget.check(facts=10, nnz=20) is None
+    assert budget.check(facts=11) == "facts"
+    assert budget.check(nnz=21) == "nnz"
+    budget.cancel()
+    assert budget.cancelled and budget.check() == "cancelled"
+
+
+def test_time_and_rss():
+    budget = Budget(time_limit=0.01)
+    budget.start()
+    time.sleep(0.02)
+
+    assert budget.check() == "time"
+    assert budget.elapsed >= 0.02
+    assert get_rss() > 0
+    assert Budget(max_rss=1).check() == "rss"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_unlimited(engine):
+    graph = labeled_two_cycles_graph(3, 2, labels=("a", "b"))
+
+    assert engine(graph, DYCK, budget=Budget()) == engine(graph, DYCK)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_max_facts(engine):
+    graph = labeled_two_cycles_graph(20, 30, labels=("a", "b"))
+    full = engine(graph, DYCK)
+
+    result = engine(graph, DYCK, budget=Budget(max_facts=100))
+
+    assert isinstance(result, PartialResult)
+    assert result.reason == "facts"
+    assert not result.progress.complete
+    assert 0 < len(result.result) < len(full)
+    assert result.result <= full
+
+
+def test_max_nnz():
+    graph = labeled_two_cycles_graph(20, 30, labels=("a", "b"))
+
+    result = matrix_alg(graph, DYCK, budget=Budget(max_nnz=200))
+
+    assert result.reason == "nnz"
+    assert result.result <= matrix_alg(graph, DYCK)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_cancel_from_thread(engine):
+    graph = labeled_two_cycles_graph(200, 300, labels=("a", "b"))
+    budget = Budget()
+    timer = threading.Timer(0.05, budget.cancel)
+    timer.start()
+
+    result = engine(graph, DYCK, budget=budget)
+    timer.cancel()
+
+    assert result.reason == "cancelled"
+    assert not result.progress.complete
+
+
+@pytest.mark.parametrize("exists", [exists_path_hellings, exists_path_matrix])
+def test_exists(exists):
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+    budget = Budget()
+    budget.cancel()
+
+    result = exists(graph, ANBN, [1], [3], "S", budget=budget)
+
+    assert result.reason == "cancelled"
+    assert not result.result.found
+    assert exists(graph, ANBN, [1], [3], "S", budget=Budget()).found
+
+
+def test_arun_cancel():
+    graph = labeled_two_cycles_graph(200, 300, labels=("a", "b"))
+    budget = Budget()
+
+    async def main():
+        task = asyncio.ensure_future(arun(budget, hellings, graph, DYCK, None, budget))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+
+    assert budget.cancelled
@@ -27,3 +27,29 @@ def test_wcfg(inp, exp):
     weak = wcnf.cfg_to_wcnf(wcnf.load_cfg(inp))
     expected = wcnf.load_cfg(exp)
     assert set(weak.productions) == set(expected.productions)
+
+
+def test_wcnf_shares_helper_variables():
+    g = wcnf.cfg.CFG.from_text(
+        """
+        S -> a B C D | b B C D
+        B -> a b
+        C -> c
+        D -> d
+        """
+    )
+    weak = wcnf.cfg_to_wcnf(g)
+
+    # "a" and "b" are wrapped once, "B C D" and "C D" are shared by both bodies
+    helpers = {var.value for var in weak.variables if "#CNF#" in var.value}
+    assert helpers == {"a#CNF#", "b#CNF#", "C#CNF#1", "C#CNF#2"}
+    assert all(len(prod.body) <= 2 for prod in weak.productions)
+
+
+def test_wcnf_report():
+    g = wcnf.load_cfg(file("input2"))
+    weak, before, after = wcnf.cfg_to_wcnf_report(g)
+
+    assert before == wcnf.get_grammar_size(g)
+    assert after == wcnf.GrammarSize(5, 1, 8)
+    assert set(weak.productions) == set(wcnf.load_cfg(file("expected2")).productions)
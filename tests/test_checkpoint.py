@@ -0,0 +1,73 @@
+import pytest
+from cfpq_data import labeled_two_cycles_graph
+from pyformlang.cfg import CFG
+
+from project.cfpq import *
+
+DYCK = CFG.from_text("S -> a S b S | $")
+ANBN = CFG.from_text("S -> a S b | a b")
+
+
+@pytest.fixture
+def graph():
+    return labeled_two_cycles_graph(20, 30, labels=("a", "b"))
+
+
+@pytest.mark.parametrize("backend", [SparseBackend(), DenseBackend()])
+def test_resume(tmp_path, graph, backend):
+    path = str(tmp_path / "dyck.npz")
+
+    partial = matrix_alg(
+        graph,
+        DYCK,
+        backend=backend,
+        budget=Budget(max_facts=500),
+        checkpoint=Checkpointer(path, every_seconds=None),
+    )
+    assert isinstance(partial, PartialResult)
+
+    checkpoint = Checkpointer(path, every_seconds=None)
+    state = checkpoint.load()
+    assert not state.complete and state.steps == partial.progress.steps
+
+    assert resume_matrix_alg(graph, DYCK, checkpoint, backend) == matrix_alg(
+        graph, DYCK
+    )
+    assert checkpoint.load().complete
+
+
+def test_periodic(tmp_path, graph):
+    checkpoint = Checkpointer(str(tmp_path / "dyck.npz"), None, every_steps=2)
+
+    full = matrix_alg(graph, DYCK, checkpoint=checkpoint)
+
+    assert checkpoint.saves > 1
+    state = checkpoint.load()
+    assert state.complete
+    assert resume_matrix_alg(graph, DYCK, checkpoint) == full
+
+
+def test_mismatch(tmp_path, graph):
+    checkpoint = Checkpointer(str(tmp_path / "dyck.npz"))
+    matrix_alg(graph, DYCK, checkpoint=checkpoint)
+
+    with pytest.raises(ValueError):
+        resume_matrix_alg(graph, ANBN, checkpoint)
+    with pytest.raises(ValueError):
+        resume_matrix_alg(labeled_two_cycles_graph(2, 3), DYCK, checkpoint)
+    with pytest.raises(ValueError):
+        matrix_alg(graph, DYCK, Derivations(), checkpoint=checkpoint, resume=True)
+
+
+def test_modified_graph(tmp_path, graph):
+    checkpoint = Checkpointer(str(tmp_path / "dyck.npz"))
+    matrix_alg(graph, DYCK, checkpoint=checkpoint)
+
+    with pytest.raises(ValueError):
+        resume_matrix_alg(graph, DYCK, checkpoint, order="rcm")
+
+    u, v, key, data = next(iter(graph.edges(keys=True, data=True)))
+    graph.remove_edge(u, v, key)
+    graph.add_edge(u, v, label="b" if data["label"] == "a" else "a")
+    with pytest.raises(ValueError):
+        resume_matrix_alg(graph, DYCK, checkpoint)
@@ -0,0 +1,136 @@
+import io
+import json
+import pickle
+
+import numpy as np
+import pytest
+from cfpq_data import labeled_two_cycles_graph
+from pyformlang.cfg import CFG
+
+from project.cfpq import matrix_alg
+from project.cli import *
+from project.graphs import two_cycles_arrays, write_compact
+from project.wcnf import save_cfg
+
+ANBN = CFG.from_text("S -> a S b | a b")
+
+QUERIES = [
+    '{"id": 1, "starts": [0, 1], "finals": [3, 4]}',
+    "",
+    '{"id": 2, "nonterminal": "S"}',
+    '{"id": 3, "starts": [100]}',
+    "not json",
+]
+
+
+def expected_pairs(graph, starts, finals):
+    facts = matrix_alg(graph, ANBN)
+    return {(u, v) for u, nt, v in facts if nt == "S" and u in starts and v in finals}
+
+
+@pytest.mark.parametrize("engine", ["matrix", "hellings"])
+@pytest.mark.parametrize("processes", [1, 2])
+def test_run_batch(engine, processes):
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+    batch = BatchEngine(graph, engine, ANBN)
+
+    results = list(run_batch(batch, QUERIES, processes))
+
+    assert [result["id"] for result in results] == [1, 2, 3, None]
+    assert {tuple(p) for p in results[0]["pairs"]} == expected_pairs(
+        graph, [0, 1], [3, 4]
+    )
+    nodes = set(graph.nodes)
+    assert {tuple(p) for p in results[1]["pairs"]} == expected_pairs(
+        graph, nodes, nodes
+    )
+    assert "error" in results[2] and "error" in results[3]
+
+
+def test_rpq():
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+    batch = BatchEngine(graph, "rpq")
+
+    result = answer_line(batch, '{"starts": [0], "finals": [1, 2, 3], "regex": "a*"}')
+
+    assert result["pairs"] == [[0, 1], [0, 2]]
+    assert "error" in answer_line(batch, '{"starts": [0]}')
+
+
+def test_main(tmp_path):
+    graph_path = str(tmp_path / "graph.bin")
+    write_compact(graph_path, two_cycles_arrays(2, 3, ("a", "b")))
+    cfg_path = str(tmp_path / "cfg.txt")
+    save_cfg(cfg_path, ANBN)
+    queries_path = tmp_path / "queries.jsonl"
+    queries_path.write_text("\n".join(QUERIES[:3]))
+    out_path = str(tmp_path / "out")
+
+    main([graph_path, "-g", cfg_path, "-q", str(queries_path), "-o", out_path])
+    with open(out_path) as file:
+        lines = [json.loads(line) for line in file]
+    main(
+        [
+            graph_path,
+            "-g",
+            cfg_path,
+            "-q",
+            str(queries_path),
+            "-o",
+            out_path,
+            "-f",
+            "npy",
+        ]
+    )
+    with open(out_path, "rb") as file:
+        arrays = [np.load(file) for _ in lines]
+
+    assert len(lines) == 2
+    for line, array in zip(lines, arrays):
+        assert array.tolist() == line["pairs"]
+
+
+def test_errors():
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+
+    with pytest.raises(ValueError):
+        BatchEngine(graph, "tensor", ANBN)
+    with pytest.raises(ValueError):
+        BatchEngine(graph, "matrix")
+    with pytest.raises(SystemExit):
+        main(["graph", "-e", "hellings"])
+
+
+def test_malformed_queries():
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+    batch = BatchEngine(graph, "matrix", ANBN)
+    lines = [
+        '{"id": 1, "starts": 5}',
+        '{"id": 2, "starts": [[0, 1]]}',
+        '{"id": 3, "nonterminal": 7}',
+        '{"id": 4, "starts": [0], "finals": [3]}',
+    ]
+
+    results = list(run_batch(batch, lines, processes=2))
+
+    assert [result["id"] for result in results] == [1, 2, 3, 4]
+    assert all("error" in result for result in results[:3])
+    assert results[3]["pairs"] == [[0, 3]]
+
+
+def test_arrays_require_integer_vertices():
+    with pytest.raises(ValueError):
+        write_arrays(io.BytesIO(), [{"id": 1, "pairs": [["x", "y"]]}])
+
+
+@pytest.mark.parametrize("engine", ["matrix", "hellings"])
+def test_spawn_workers(engine):
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+    batch = BatchEngine(graph, engine, ANBN)
+    lines = ['{"id": 1, "starts": [0], "finals": [3]}'] * 3
+
+    copy = pickle.loads(pickle.dumps(batch))
+    results = list(run_batch(batch, lines, processes=2, context="spawn"))
+
+    assert answer_line(copy, lines[0]) == results[0]
+    assert all(result["pairs"] == [[0, 3]] for result in results)
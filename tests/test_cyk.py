@@ -0,0 +1,48 @@
+import itertools
+
+import pytest
+from pyformlang.cfg import CFG
+
+from project.cyk import CYKGrammar, cyk, cyk_from_file, cyk_many
+
+GRAMMARS = [
+    "S -> a S b S | $",
+    "S -> a S b | a b",
+    """
+    S -> A B C
+    A -> a | $
+    B -> b | $
+    C -> c C | $
+    """,
+]
+
+
+@pytest.mark.parametrize("text", GRAMMARS)
+def test_cyk_same_as_pyformlang(text):
+    cfg = CFG.from_text(text)
+    grammar = CYKGrammar(cfg)
+
+    for n in range(6):
+        for word in itertools.product("abc", repeat=n):
+            assert grammar.accepts(word) == cfg.contains(word)
+
+
+def test_cyk_tokens():
+    cfg = CFG.from_text("S -> get P | post P body\nP -> / | / P")
+
+    assert cyk(cfg, ["get", "/", "/"])
+    assert cyk(cfg, ["post", "/", "body"])
+    assert not cyk(cfg, ["post", "/"])
+
+
+def test_cyk_from_file():
+    assert cyk_from_file("tests/cfgs/input0.txt", "aas")
+    assert not cyk_from_file("tests/cfgs/input0.txt", "")
+
+
+@pytest.mark.parametrize("processes", [None, 2])
+def test_cyk_many(processes):
+    words = ["", "ab", "ba", "aabb", "abab", "aab"] * 10
+    expected = [True, True, False, True, True, False] * 10
+
+    assert cyk_many(CFG.from_text(GRAMMARS[0]), words, processes) == expected
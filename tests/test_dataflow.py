@@ -0,0 +1,175 @@
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from project.language.dataflow import *
+
+
+def bind(pattern, uses, func, delay=0.0):
+    def evaluate(env):
+        time.sleep(delay)
+        return func(*[env[name] for name in uses])
+
+    return Statement("bind", pattern, uses, evaluate)
+
+
+def show(uses, func, delay=0.0):
+    return bind(None, uses, func, delay)._replace(kind="print")
+
+
+def test_pattern():
+    assert get_pattern_names(["a", ["b", "c"]]) == ["a", "b", "c"]
+    assert match_pattern(["a", ["b", "c"]], (1, (2, 3))) == {"a": 1, "b": 2, "c": 3}
+    with pytest.raises(ValueError):
+        match_pattern(["a", "b"], (1, 2, 3))
+
+
+def test_dependencies():
+    program = [
+        bind("x", [], lambda: 1),
+        bind("y", ["x"], lambda x: x),
+        bind("x", ["x", "y"], lambda x, y: x + y),
+        show(["x"], lambda x: x),
+    ]
+
+    assert get_dependencies(program) == [{}, {"x": 0}, {"x": 0, "y": 1}, {"x": 2}]
+    with pytest.raises(NameError):
+        get_dependencies([show(["z"], lambda z: z)])
+
+
+def test_concurrent():
+    # independent statements pass the barrier only if they are evaluated at the same time
+    barrier = threading.Barrier(3, timeout=10)
+
+    def meet(value):
+        barrier.wait()
+        return value
+
+    program = [
+        bind("g1", [], lambda: meet({1, 2})),
+        bind("g2", [], lambda: meet({2, 3})),
+        show([], lambda: meet("first")),
+        bind(["a", "b"], ["g1", "g2"], lambda g1, g2: (g1 & g2, g1 | g2)),
+        show(["a"], lambda a: a),
+        show(["b"], lambda b: b, 0.1),
+        show([], lambda: "last"),
+    ]
+    printed = []
+
+    result = run_statements(program, printed.append, max_workers=4)
+
+    assert result == printed == ["first", {2}, {1, 2, 3}, "last"]
+    assert not barrier.broken
+
+
+def test_error():
+    def fail():
+        raise RuntimeError("failed")
+
+    program = [
+        show([], lambda: 1, 0.1),
+        bind("x", [], fail),
+        show(["x"], lambda x: x),
+        show([], lambda: 2),
+    ]
+    printed = []
+
+    with pytest.raises(RuntimeError):
+        run_statements(program, printed.append)
+
+    assert printed == [1]
+
+
+def test_incremental():
+    calls = []
+
+    def program(edited: str):
+        def statement(text, pattern, uses, func):
+            def evaluate(env):
+                calls.append(text)
+                return func(*[env[name] for name in uses])
+
+            kind = "bind" if pattern is not None else "print"
+            return Statement(kind, pattern, uses, evaluate, text)
+
+        return [
+            statement("let g = load a", "g", [], lambda: {1, 2, 3}),
+            statement(edited, "r", [], lambda: {2, 3, 4}),
+            statement("let i = g & r", "i", ["g", "r"], lambda g, r: g & r),
+            statement("let n = g", "n", ["g"], lambda g: len(g)),
+            statement("print i", None, ["i"], lambda i: i),
+        ]
+
+    cache = StatementCache()
+    assert run_statements(program("let r = load b"), cache=cache) == [{2, 3}]
+    assert len(calls) == 5 and len(cache) == 5
+
+    calls.clear()
+    assert run_statements(program("let r = load b"), cache=cache) == [{2, 3}]
+    assert calls == [] and cache.hits == 5
+
+    calls.clear()
+    run_statements(program("let r = load c"), cache=cache)
+    assert sorted(calls) == ["let i = g & r", "let r = load c", "print i"]
+
+
+def test_cache_eviction():
+    cache = StatementCache(max_size=10, weigh=len)
+    cache.put("a", [0] * 4)
+    cache.put("b", [0] * 4)
+    assert cache.get("a") == (True, [0] * 4)
+
+    cache.put("c", [0] * 4)
+
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.weight == 8
+    assert cache.get("b") == (False, None)
+
+
+def test_failed_not_cached():
+    attempts = []
+
+    def fail():
+        attempts.append(1)
+        raise RuntimeError("failed")
+
+    cache = StatementCache()
+    program = [bind("x", [], fail)._replace(text="let x = fail")]
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            run_statements(program, cache=cache)
+
+    assert len(attempts) == 2 and len(cache) == 0
+
+
+def test_cache_weighs_bytes():
+    cache = StatementCache(max_size=get_size(np.zeros(1000)) + 100)
+    cache.put("small", np.zeros(10))
+    cache.put("large", np.zeros(1000))
+
+    assert "small" not in cache and "large" in cache
+    assert get_size({"x": np.zeros(1000)}) > get_size({"x": np.zeros(10)})
+
+
+def test_cache_copies_on_hit():
+    cache = StatementCache(copy=set)
+    cache.put("a", {1, 2})
+    cache.get("a")[1].add(3)
+
+    assert cache.get("a") == (True, {1, 2})
+
+
+def test_size_of_objects():
+    class Value:
+        def __init__(self, items):
+            self.items = items
+            self.module = sys
+            self.method = self.__init__
+
+    small, large = Value(list(range(10))), Value(list(range(10000)))
+
+    assert get_size(small) < 2000
+    assert 10 * get_size(small) < get_size(large)
@@ -0,0 +1,61 @@
+import pytest
+from cfpq_data import labeled_two_cycles_graph
+from pyformlang.cfg import CFG, Variable
+
+from project.cfpq import *
+
+DYCK = CFG.from_text("S -> a S b S | $")
+
+
+def check_path(graph, path, u, v):
+    for frm, label, to in path:
+        assert frm == u
+        assert label in {e["label"] for e in graph.get_edge_data(frm, to).values()}
+        u = to
+    assert u == v
+
+
+@pytest.mark.parametrize("shortest", [False, True])
+def test_hellings_paths(shortest):
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+    derivations = Derivations(shortest=shortest)
+    facts = hellings(graph, DYCK, derivations)
+
+    for u, nonterminal, v in facts:
+        path = derivations.get_path(u, nonterminal, v)
+        check_path(graph, path, u, v)
+        assert len(path) == derivations.length((u, nonterminal, v))
+        if nonterminal == "S":
+            assert DYCK.contains([label for _, label, _ in path])
+
+
+def test_hellings_shortest_path():
+    graph = labeled_two_cycles_graph(1, 1, labels=("a", "b"))
+    derivations = Derivations(shortest=True)
+    hellings(graph, DYCK, derivations)
+
+    assert derivations.get_path(0, "S", 0) == []
+    assert derivations.get_path(1, "S", 2) == [(1, "a", 0), (0, "b", 2)]
+
+
+def test_matrix_paths():
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+    derivations = Derivations()
+    facts = matrix_alg(graph, DYCK, derivations)
+
+    for u, nonterminal, v in facts:
+        path = derivations.get_path(u, nonterminal, v)
+        check_path(graph, path, u, v)
+        if nonterminal == Variable("S"):
+            assert DYCK.contains([label for _, label, _ in path])
+
+
+def test_derivations_budget():
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+    derivations = Derivations(max_facts=10)
+    facts = hellings(graph, DYCK, derivations)
+
+    assert len(derivations) == 10
+    assert len(facts) > 10
+    missing = [fact for fact in facts if fact not in derivations]
+    assert derivations.get_path(*missing[0]) is None
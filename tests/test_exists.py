@@ -0,0 +1,66 @@
+import pytest
+from cfpq_data import labeled_two_cycles_graph
+from pyformlang.cfg import CFG, Variable
+
+from project.cfpq import *
+from project.graphs import chain_arrays, to_networkx
+
+DYCK = CFG.from_text("S -> a S b S | $")
+ANBN = CFG.from_text("S -> a S b | a b")
+
+ENGINES = [exists_path_hellings, exists_path_matrix]
+
+
+@pytest.mark.parametrize("exists", ENGINES)
+@pytest.mark.parametrize(
+    "starts, finals, expected",
+    [
+        ([1], [3], True),
+        ([0, 1, 2], [1, 2], False),
+        ([2], [4, 5], True),
+        ([], [0, 1, 2, 3, 4, 5], False),
+    ],
+)
+def test_exists(exists, starts, finals, expected):
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+
+    result = exists(graph, ANBN, starts, finals, "S")
+
+    assert result.found == expected
+    if expected:
+        u, v = result.witness
+        assert u in starts and v in finals
+        assert (u, Variable("S"), v) in matrix_alg(graph, ANBN)
+    else:
+        assert result.witness is None and result.progress.complete
+
+
+@pytest.mark.parametrize("exists", ENGINES)
+def test_epsilon(exists):
+    graph = labeled_two_cycles_graph(1, 1)
+
+    assert exists(graph, DYCK, [2], [2], Variable("S")).found
+    assert not exists(graph, DYCK, [2], [1], Variable("S")).found
+
+
+@pytest.mark.parametrize("exists", ENGINES)
+def test_stops_early(exists):
+    graph = to_networkx(chain_arrays(100))
+    cfg = CFG.from_text("S -> S S | a")
+
+    full = len(hellings(graph, cfg))
+    result = exists(graph, cfg, [0], [1, 2], "S")
+
+    assert result.found and result.witness[0] == 0
+    assert not result.progress.complete
+    assert result.progress.facts < full
+
+
+def test_hellings_witness_path():
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+    derivations = Derivations()
+
+    result = exists_path_hellings(graph, ANBN, [1], [3, 4, 5], "S", derivations)
+
+    path = derivations.get_path(result.witness[0], "S", result.witness[1])
+    assert ANBN.contains([label for _, label, _ in path])
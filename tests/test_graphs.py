@@ -0,0 +1,79 @@
+import networkx as nt
+import numpy as np
+import pytest
+from cfpq_data import graph_from_csv, labeled_two_cycles_graph
+
+from project import graphs
+
+
+def edges(graph: nt.MultiDiGraph):
+    return sorted(graph.edges(data="label"))
+
+
+def test_two_cycles():
+    arrays = graphs.two_cycles_arrays(3, 4, labels=("x", "y"))
+    expected = labeled_two_cycles_graph(3, 4, labels=("x", "y"))
+
+    assert edges(graphs.to_networkx(arrays)) == edges(expected)
+    assert arrays.nodes_count == expected.number_of_nodes()
+
+
+def test_random_is_seeded():
+    a = graphs.random_arrays(100, 500, ("a", "b", "c"), seed=42, exponent=1.5)
+    b = graphs.random_arrays(100, 500, ("a", "b", "c"), seed=42, exponent=1.5)
+
+    assert np.array_equal(a.src, b.src) and np.array_equal(a.label, b.label)
+    assert len(a.src) == 500
+    assert a.src.max() < 100 and a.label.max() < 3
+
+
+def test_grid_and_chain():
+    grid = graphs.to_networkx(graphs.grid_arrays(2, 3))
+    assert edges(grid) == [
+        (0, 1, "right"),
+        (0, 3, "down"),
+        (1, 2, "right"),
+        (1, 4, "down"),
+        (2, 5, "down"),
+        (3, 4, "right"),
+        (4, 5, "right"),
+    ]
+
+    chain = graphs.to_networkx(graphs.chain_arrays(3, "next"))
+    assert edges(chain) == [(0, 1, "next"), (1, 2, "next")]
+
+
+@pytest.mark.parametrize(
+    "arrays",
+    [graphs.random_arrays(50, 200, seed=1), graphs.random_arrays(5, 0, seed=1)],
+)
+def test_compact_roundtrip(tmp_path, arrays):
+    path = str(tmp_path / "graph.cgraph")
+    graphs.write_compact(path, arrays)
+    loaded = graphs.read_compact(path)
+
+    assert loaded.nodes_count == arrays.nodes_count
+    assert loaded.labels == arrays.labels
+    for a, b in zip(loaded[1:4], arrays[1:4]):
+        assert np.array_equal(a, b)
+
+
+def test_write_csv_and_dot(tmp_path):
+    arrays = graphs.two_cycles_arrays(3, 2, labels=("Edge", "b c"))
+    expected = edges(graphs.to_networkx(arrays))
+
+    graphs.write_csv(str(tmp_path / "graph.csv"), graphs.two_cycles_arrays(3, 2))
+    assert edges(graph_from_csv(tmp_path / "graph.csv")) == edges(
+        graphs.to_networkx(graphs.two_cycles_arrays(3, 2))
+    )
+
+    graphs.write_dot(str(tmp_path / "graph.dot"), arrays, chunk_size=2)
+    assert "label=Edge" not in (tmp_path / "graph.dot").read_text()
+    dot = nt.drawing.nx_pydot.read_dot(str(tmp_path / "graph.dot"))
+    assert (
+        sorted(
+            (int(u), int(v), label.strip('"'))
+            for u, v, label in dot.edges(data="label")
+        )
+        == expected
+    )
@@ -0,0 +1,43 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def loaded_modules(code: str):
+    output = subprocess.check_output(
+        [sys.executable, "-c", f"{code}\nimport sys\nprint(' '.join(sys.modules))"],
+        text=True,
+    )
+    return set(output.split())
+
+
+@pytest.mark.parametrize(
+    "code, unwanted",
+    [
+        ("import project.cfpq", ["networkx", "scipy", "pyformlang"]),
+        ("from project.cfpq import Budget, PartialResult", ["networkx", "scipy"]),
+        ("import project.utils", ["cfpq_data", "pandas", "networkx", "scipy"]),
+        ("import project.graphs, project.stats", ["networkx", "pandas", "scipy"]),
+        ("from project.regex import compile_regex", ["scipy", "cfpq_data"]),
+        (
+            "from project.artifacts import build_artifact, load_artifact",
+            ["scipy", "cfpq_data"],
+        ),
+        ("import project.language.language", ["pydot"]),
+    ],
+)
+def test_lazy_imports(code, unwanted):
+    modules = loaded_modules(code)
+
+    assert not modules & set(unwanted)
+
+
+def test_exports():
+    import project.cfpq
+    from project.cfpq.hellings import hellings
+
+    assert project.cfpq.hellings is hellings
+    assert set(project.cfpq.__all__) <= set(dir(project.cfpq))
+    with pytest.raises(AttributeError):
+        project.cfpq.missing
@@ -0,0 +1,121 @@
+import networkx as nt
+import pytest
+from cfpq_data import labeled_two_cycles_graph
+from pyformlang.cfg import CFG
+
+from project.automata import get_dfa_from_regex
+from project.cfpq import hellings, query_graph_hellings, query_graph_matrix
+from project.ecfg import ECFG
+from project.projection import (
+    MAX_PROJECTIONS,
+    get_alphabet,
+    get_projection,
+    invalidate_projections,
+    project_graph,
+)
+
+
+def labels(graph):
+    return sorted(graph.edges(data="label"))
+
+
+def test_alphabet():
+    cfg = CFG.from_text("S -> a S b | epsilon\nS -> A\nA -> A c")
+
+    assert get_alphabet(cfg) == {"a", "b"}
+    assert get_alphabet(get_dfa_from_regex("x y* | z")) == {"x", "y", "z"}
+    assert get_alphabet(ECFG.from_text("S -> a S* | b").to_rfa()) == {"a", "b"}
+
+
+def test_projection_is_cached():
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+
+    projection = get_projection(graph, {"a"})
+
+    assert get_projection(graph, frozenset({"a"})) is projection
+    assert list(projection.nodes) == list(graph.nodes)
+    assert labels(projection) == [(0, 1, "a"), (1, 2, "a"), (2, 0, "a")]
+
+    graph.add_edge(1, 0, label="a")
+    assert get_projection(graph, {"a"}) is not projection
+    assert get_projection(graph, {"a"}).number_of_edges() == 4
+
+
+@pytest.mark.parametrize(
+    "prune, expected",
+    [
+        (None, 9),
+        ("degree", [(1, 2), (2, 3), (2, 6), (3, 4), (4, 7), (6, 2), (7, 4)]),
+        ("reachability", [(1, 2), (2, 3), (2, 6), (6, 2)]),
+    ],
+)
+def test_pruning(prune, expected):
+    graph = nt.MultiDiGraph()
+    graph.add_edges_from(
+        [(0, 1), (1, 2), (2, 3), (3, 4), (5, 1), (2, 6), (6, 2), (4, 7), (7, 4)],
+        label="a",
+    )
+    graph.add_edge(1, 0, label="b")
+
+    projection = project_graph(graph, {"a"}, [1], [3], prune=prune)
+
+    assert list(projection.nodes) == list(graph.nodes)
+    if prune is None:
+        assert projection.number_of_edges() == expected
+    else:
+        assert sorted(projection.edges()) == expected
+
+
+def test_unknown_pruning():
+    with pytest.raises(ValueError):
+        project_graph(labeled_two_cycles_graph(1, 1), {"a"}, prune="magic")
+
+
+def test_queries_on_projection():
+    graph = labeled_two_cycles_graph(3, 2, labels=("a", "b"))
+    graph.add_edge(4, 5, label="c")
+    cfg = CFG.from_text("S -> a S b | a b")
+    starts, finals = [0, 1, 2, 3], [0, 4, 5]
+
+    expected = {u: set() for u in starts}
+    for u, non, v in hellings(graph, cfg):
+        if non == "S" and u in starts and v in finals:
+            expected[u].add(v)
+
+    assert query_graph_hellings(graph, cfg, starts, finals, "S") == expected
+    assert query_graph_matrix(graph, cfg, starts, finals, "S") == expected
+
+
+def test_relabelled_graph():
+    graph = nt.MultiDiGraph()
+    graph.add_edge(0, 1, label="a")
+    graph.add_edge(1, 2, label="b")
+    cfg = CFG.from_text("S -> a b")
+
+    assert query_graph_hellings(graph, cfg, [0], [2], "S") == {0: {2}}
+
+    graph.remove_edge(1, 2)
+    graph.add_edge(1, 2, label="c")
+    invalidate_projections(graph)
+    assert query_graph_hellings(graph, cfg, [0], [2], "S") == {0: set()}
+    assert query_graph_matrix(graph, cfg, [0], [2], "S") == {0: set()}
+
+
+def test_verified_projection():
+    graph = nt.MultiDiGraph()
+    graph.add_edge(0, 1, label="a")
+    projection = get_projection(graph, {"a"})
+
+    graph.edges[0, 1, 0]["label"] = "b"
+    assert get_projection(graph, {"a"}) is projection
+    assert get_projection(graph, {"a"}, verify=True).number_of_edges() == 0
+
+
+def test_projections_are_bounded():
+    graph = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+
+    first = get_projection(graph, {"a"})
+    for label in range(MAX_PROJECTIONS):
+        get_projection(graph, {str(label)})
+
+    assert get_projection(graph, {"a"}) is not first
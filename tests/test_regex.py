@@ -0,0 +1,88 @@
+import pytest
+from pyformlang.regular_expression import Regex
+
+from project.ecfg import ECFG
+from project.regex import (
+    RegexCache,
+    compile_regex,
+    default_cache,
+    get_regex_key,
+    parse_regex,
+    to_dfa,
+)
+
+
+@pytest.mark.parametrize(
+    "regex",
+    [
+        "a",
+        "a b | c",
+        "a | b c",
+        "a* b",
+        "(a|b) c*",
+        "a+b",
+        "ab . cd*",
+        "(a b)* | $",
+        "a epsilon b",
+        "((a | b)* c)* | d d",
+        "",
+        "x\\.y z",
+    ],
+)
+def test_same_as_pyformlang(regex):
+    expected = Regex(regex).to_epsilon_nfa().minimize()
+    compiled = compile_regex(regex, RegexCache())
+
+    assert to_dfa(compiled).is_equivalent_to(expected)
+    assert compiled.states_count == max(len(expected.states), 1)
+
+
+def test_normalized_keys():
+    assert get_regex_key(parse_regex("a|b c")) == get_regex_key(
+        parse_regex("(a + (b . c))")
+    )
+    assert get_regex_key(parse_regex("a b")) != get_regex_key(parse_regex("ab"))
+    assert get_regex_key(parse_regex(Regex("a | b*"))) == get_regex_key(
+        parse_regex("a|b*")
+    )
+
+
+def test_large_alternation():
+    labels = [f"label{i}" for i in range(2000)]
+    compiled = compile_regex("(" + " | ".join(labels) + ")* end", RegexCache())
+
+    assert compiled.states_count == 2
+    assert len(compiled.delta) == len(labels) + 1
+    assert compiled.finals == [1]
+
+
+def test_lru_eviction():
+    cache = RegexCache(max_size=2)
+    first = cache.get("a")
+    cache.get("b")
+    assert cache.get(" a ") is first
+    cache.get("c")
+
+    assert len(cache) == 2
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_persistence(tmp_path):
+    path = str(tmp_path / "regex_cache.json")
+    cache = RegexCache(path=path)
+    compiled = cache.get("(a | b)* c")
+    cache.save()
+
+    loaded = RegexCache(path=path)
+    assert "(a|b)*.c" in loaded
+    assert loaded.get("(a|b)* c") == compiled
+    assert loaded.misses == 0
+
+
+def test_ecfg_boxes_use_cache():
+    rfa = ECFG.from_text("S -> a S b | $").to_rfa()
+    [box] = rfa.boxes
+
+    assert box.dfa.is_equivalent_to(Regex("a S b | $").to_epsilon_nfa())
+    assert Regex("a S b | $") in default_cache
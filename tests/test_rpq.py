@@ -0,0 +1,71 @@
+import random
+
+import networkx as nt
+import pytest
+from cfpq_data import labeled_two_cycles_graph
+
+from project.automata import get_dfa_from_regex
+from project.rpq import get_shortest_paths
+
+
+def brute_force_lengths(graph, regex, max_length):
+    dfa = get_dfa_from_regex(regex)
+    lengths = {}
+    paths = {(u, u, ()) for u in graph.nodes}
+    for length in range(max_length + 1):
+        for start, end, word in paths:
+            if (start, end) not in lengths and dfa.accepts(word):
+                lengths[(start, end)] = length
+        paths = {
+            (start, v, word + (label,))
+            for start, u, word in paths
+            for _, v, label in graph.out_edges(u, data="label")
+        }
+    return lengths
+
+
+def check_path(graph, regex, path, start, final):
+    u = start
+    for frm, label, to in path:
+        assert frm == u
+        assert label in {e["label"] for e in graph.get_edge_data(frm, to).values()}
+        u = to
+    assert u == final
+    assert get_dfa_from_regex(regex).accepts([label for _, label, _ in path])
+
+
+@pytest.mark.parametrize("regex", ["a* b", "(a b)*", "a | b b b", "b a* b"])
+def test_shortest_lengths(regex):
+    rng = random.Random(regex)
+    for _ in range(10):
+        graph = nt.MultiDiGraph()
+        graph.add_nodes_from(range(5))
+        for _ in range(rng.randint(0, 8)):
+            graph.add_edge(rng.randrange(5), rng.randrange(5), label=rng.choice("ab"))
+
+        result = get_shortest_paths(graph, regex)
+        expected = brute_force_lengths(graph, regex, 5)
+        assert {
+            pair: length for pair, length in result.lengths.items() if length <= 5
+        } == expected
+
+        for (start, final), length in result.lengths.items():
+            path = result.get_path(start, final)
+            assert len(path) == length
+            check_path(graph, regex, path, start, final)
+
+
+def test_start_final_vertices():
+    graph = labeled_two_cycles_graph(3, 2, labels=("a", "b"))
+    result = get_shortest_paths(graph, "a*", start_vertices=[1], final_vertices=[0, 5])
+
+    assert result.lengths == {(1, 0): 3}
+    assert result.get_path(1, 5) is None
+    assert result.get_path(1, 0) == [(1, "a", 2), (2, "a", 3), (3, "a", 0)]
+
+
+def test_max_length():
+    graph = labeled_two_cycles_graph(3, 2, labels=("a", "b"))
+    result = get_shortest_paths(graph, "a*", start_vertices=[1], max_length=2)
+
+    assert result.lengths == {(1, 1): 0, (1, 2): 1, (1, 3): 2}
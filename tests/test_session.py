@@ -0,0 +1,103 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cfpq_data import labeled_two_cycles_graph
+from pyformlang.cfg import CFG, Variable
+
+import project.session
+from project.cfpq import query_graph_matrix
+from project.rpq import get_shortest_paths
+from project.session import GraphSession, Query
+
+GRAPH = labeled_two_cycles_graph(2, 3, labels=("a", "b"))
+CFG_TEXT = """
+    S -> A B
+    S -> A S1
+    S1 -> S B
+    A -> a
+    B -> b
+"""
+
+
+def test_query_batch():
+    cfg = CFG.from_text(CFG_TEXT)
+    session = GraphSession(GRAPH)
+    queries = [
+        Query([0, 1, 2], [0, 3], Variable("S")),
+        Query([0], [0, 1, 2, 3, 4, 5], "S1"),
+        Query([1, 2], [4], "A"),
+    ]
+
+    answers = session.query(cfg, queries)
+    for query, answer in zip(queries, answers):
+        assert answer == query_graph_matrix(
+            GRAPH, cfg, *query[:2], Variable(query.start_nonterminal)
+        )
+
+
+def test_closure_is_cached(monkeypatch):
+    calls = []
+    original = project.session.matrix_closure
+
+    def counting(*args):
+        calls.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(project.session, "matrix_closure", counting)
+    session = GraphSession(GRAPH)
+    session.query(CFG.from_text(CFG_TEXT), [Query([0], [3], "S")])
+    session.query(CFG.from_text(CFG_TEXT), [Query([1], [3], "S")])
+
+    assert len(calls) == 1
+
+
+def test_async_queries_coalesce(monkeypatch):
+    calls = []
+    original = project.session.matrix_closure
+
+    def counting(*args):
+        calls.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(project.session, "matrix_closure", counting)
+    session = GraphSession(GRAPH)
+    cfg = CFG.from_text(CFG_TEXT)
+
+    async def run():
+        return await asyncio.gather(
+            *[session.aquery(cfg, Query([u], [0, 3], "S")) for u in range(4)]
+        )
+
+    answers = asyncio.run(run())
+    assert len(calls) == 1
+    assert answers == [{u: {0, 3}} for u in range(3)] + [{3: set()}]
+
+
+def test_query_rpq():
+    session = GraphSession(GRAPH)
+    for regex in ["a* b", "a b*", "(a | b)*"]:
+        expected = get_shortest_paths(GRAPH, regex, start_vertices=[0, 1])
+        answer = session.query_rpq(regex, [0, 1], GRAPH.nodes)
+        assert answer == {
+            u: {v for (s, v) in expected.lengths if s == u} for u in [0, 1]
+        }
+
+
+def test_independent_closures_are_concurrent(monkeypatch):
+    barrier = threading.Barrier(2, timeout=10)
+    original = project.session.matrix_closure
+
+    def meeting(*args):
+        # both grammars must be computed at the same time to pass the barrier
+        barrier.wait()
+        return original(*args)
+
+    monkeypatch.setattr(project.session, "matrix_closure", meeting)
+    session = GraphSession(GRAPH)
+    cfgs = [CFG.from_text(CFG_TEXT), CFG.from_text("S -> a S b | a b")]
+    with ThreadPoolExecutor(2) as executor:
+        closures = list(executor.map(session.closure, cfgs))
+
+    assert not barrier.broken
+    assert all(Variable("S") in closure for closure in closures)
@@ -0,0 +1,46 @@
+import pytest
+from cfpq_data import labeled_two_cycles_graph
+from pyformlang.cfg import CFG
+
+from project.cfpq import *
+from project.graphs import random_arrays, to_networkx
+
+GRAMMARS = [
+    CFG.from_text("S -> a S b S | $"),
+    CFG.from_text("S -> a S b | a b"),
+    CFG.from_text("S -> A B | S S\nA -> a | $\nB -> b B | b"),
+]
+
+
+@pytest.mark.parametrize("cfg", GRAMMARS)
+@pytest.mark.parametrize("workers", [1, 3])
+def test_pipes(cfg, workers):
+    graph = labeled_two_cycles_graph(4, 5, labels=("a", "b"))
+
+    assert sharded_matrix_alg(graph, cfg, workers) == matrix_alg(graph, cfg)
+
+
+def test_sockets():
+    graph = to_networkx(random_arrays(40, 120, ("a", "b"), seed=1))
+    cfg = GRAMMARS[0]
+
+    result = sharded_matrix_alg(graph, cfg, 2, SocketTransport(), order="bfs")
+
+    assert result == matrix_alg(graph, cfg)
+
+
+def test_row_blocks():
+    graph = labeled_two_cycles_graph(4, 5, labels=("a", "b"))
+    matrices = get_label_matrices(graph)
+
+    assert get_row_blocks(matrices, 10, 3)[::3] == [0, 10]
+    assert get_row_blocks({}, 0, 3) == [0, 0, 0, 0]
+    graph = labeled_two_cycles_graph(1, 1)
+    assert sharded_matrix_alg(graph, GRAMMARS[1], 4) == matrix_alg(graph, GRAMMARS[1])
+
+
+def test_remote_workers_require_key():
+    with pytest.raises(ValueError):
+        SocketTransport(spawn=False)
+
+    assert SocketTransport().authkey != SocketTransport().authkey
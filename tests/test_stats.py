@@ -0,0 +1,94 @@
+import networkx as nt
+import pytest
+from cfpq_data import graph_from_csv
+
+from project import graphs, stats
+
+
+def expected_stats(graph: nt.MultiDiGraph) -> stats.GraphStats:
+    labels = {}
+    for _, _, label in graph.edges(data="label"):
+        labels[label] = labels.get(label, 0) + 1
+
+    def histogram(degrees):
+        result = {}
+        for _, degree in degrees:
+            result[degree] = result.get(degree, 0) + 1
+        return result
+
+    co_occurrence = {}
+    for v in graph.nodes:
+        ins = {label for _, _, label in graph.in_edges(v, data="label")}
+        outs = {label for _, _, label in graph.out_edges(v, data="label")}
+        for a in ins:
+            for b in outs:
+                co_occurrence[(a, b)] = co_occurrence.get((a, b), 0) + 1
+
+    return stats.GraphStats(
+        graph.number_of_nodes(),
+        graph.number_of_edges(),
+        labels,
+        histogram(graph.out_degree),
+        histogram(graph.in_degree),
+        co_occurrence,
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_csv_stats(tmp_path, chunk_size):
+    path = str(tmp_path / "graph.csv")
+    graphs.write_csv(
+        path, graphs.random_arrays(50, 300, ("a", "b", "c"), seed=1, exponent=1.2)
+    )
+
+    assert stats.get_csv_stats(path, chunk_size) == expected_stats(graph_from_csv(path))
+
+
+def test_csv_stats_vertices(tmp_path):
+    path = tmp_path / "graph.csv"
+    path.write_text("0 1 a\n1 2 b\n2 0 a\n")
+
+    result = stats.get_csv_stats(str(path), chunk_size=2)
+
+    assert result.nodes_count == 3
+    assert result.label_counts == {"a": 2, "b": 1}
+    assert result.co_occurrence == {("a", "b"): 1, ("b", "a"): 1, ("a", "a"): 1}
+
+    for text in ["x y a\n", "0 1 a\n-1 0 b\n"]:
+        path.write_text(text)
+        with pytest.raises(ValueError):
+            stats.get_csv_stats(str(path), chunk_size=1)
+
+
+def test_compact_stats(tmp_path):
+    path = str(tmp_path / "graph.bin")
+    arrays = graphs.grid_arrays(3, 4)
+    graphs.write_compact(path, arrays)
+
+    result = stats.get_file_stats(path, chunk_size=5)
+
+    assert result == expected_stats(graphs.to_networkx(arrays))
+    assert result.co_occurrence[("right", "down")] == 6
+
+
+def test_compact_stats_isolated(tmp_path):
+    path = str(tmp_path / "graph.bin")
+    graphs.write_compact(
+        path, graphs.GraphArrays(*graphs.chain_arrays(3))._replace(nodes_count=5)
+    )
+
+    result = stats.get_compact_stats(path)
+
+    assert result.nodes_count == 5
+    assert result.out_degrees == {0: 3, 1: 2}
+    assert result.in_degrees == {0: 3, 1: 2}
+
+
+def test_many_labels(tmp_path):
+    path = str(tmp_path / "graph.bin")
+    arrays = graphs.random_arrays(30, 500, [f"l{i}" for i in range(70)], seed=2)
+    graphs.write_compact(path, arrays)
+
+    assert stats.get_compact_stats(path, chunk_size=64) == expected_stats(
+        graphs.to_networkx(arrays)
+    )
@@ -0,0 +1,81 @@
+import networkx as nt
+import pytest
+from cfpq_data import labeled_two_cycles_graph
+from pyformlang.cfg import CFG
+
+from project.cfpq import Derivations, hellings, matrix_alg
+from project.session import GraphSession
+from project.vertices import VertexMap
+
+DYCK = CFG.from_text("S -> a S b S | $")
+
+
+def named_graph() -> nt.MultiDiGraph:
+    graph = nt.relabel_nodes(
+        labeled_two_cycles_graph(2, 3, labels=("a", "b")),
+        {0: "hub", 1: 100, 2: ("x", 1), 3: "y", 4: -7, 5: 3000},
+    )
+    graph.add_node("alone")
+    return graph
+
+
+def test_identity_order():
+    vertices = VertexMap(["c", 10, "a"])
+
+    assert len(vertices) == 3
+    assert vertices.to_ids(["a", "c"]) == [2, 0]
+    assert vertices.to_nodes([1, 2]) == [10, "a"]
+    assert "c" in vertices and "b" not in vertices
+
+
+@pytest.mark.parametrize("order", ["rcm", "bfs"])
+def test_orders_are_permutations(order):
+    graph = named_graph()
+    vertices = VertexMap.from_graph(graph, order)
+
+    assert sorted(map(str, vertices.nodes)) == sorted(map(str, graph.nodes))
+    assert vertices.index == {node: i for i, node in enumerate(vertices.nodes)}
+
+
+def test_bfs_order():
+    graph = nt.MultiDiGraph()
+    graph.add_nodes_from(range(6))
+    graph.add_edges_from([(5, 0), (0, 3), (5, 2), (1, 4)], label="a")
+
+    assert VertexMap.from_graph(graph, "bfs").nodes == [0, 3, 5, 2, 1, 4]
+
+
+def test_unknown_order():
+    with pytest.raises(ValueError):
+        VertexMap.from_graph(named_graph(), "random")
+
+
+@pytest.mark.parametrize("order", [None, "rcm", "bfs"])
+def test_engines_on_arbitrary_vertices(order):
+    graph = named_graph()
+    expected = hellings(nt.convert_node_labels_to_integers(graph), DYCK)
+    nodes = list(graph.nodes)
+    expected = {(nodes[u], str(A), nodes[v]) for u, A, v in expected}
+
+    assert ("alone", "S", "alone") in expected
+    assert {(u, str(A), v) for u, A, v in hellings(graph, DYCK)} == expected
+    assert {
+        (u, A.value, v) for u, A, v in matrix_alg(graph, DYCK, order=order)
+    } == expected
+
+    session = GraphSession(graph, order)
+    assert session.query_rpq("a b", [("x", 1)], graph.nodes) == {("x", 1): {"y"}}
+
+
+def test_derivations_on_arbitrary_vertices():
+    graph = named_graph()
+    derivations = Derivations(shortest=True)
+    hellings(graph, DYCK, derivations)
+
+    assert derivations.get_path(("x", 1), "S", "y") == [
+        (("x", 1), "a", "hub"),
+        ("hub", "b", "y"),
+    ]
+    assert derivations.length((("x", 1), "S", "y")) == 2
+    assert derivations.get_path("alone", "S", "alone") == []
+    assert ("nowhere", "S", "hub") not in derivations